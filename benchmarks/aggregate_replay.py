@@ -0,0 +1,44 @@
+""" Benchmark replaying the hangman Game aggregate root
+
+run with: python -m benchmarks.aggregate_replay
+"""
+import re
+import timeit
+
+from example.hangman.domain.aggregate import Game
+from example.hangman.domain.events import GameStarted, LetterNotGuessed
+
+NUMBER_OF_EVENTS = 100000
+AGGREGATE_ROOT_ID = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+
+
+class RegexDispatchedGame(Game):
+    """ the Game with the name based dispatching used before the dispatch
+    table existed """
+
+    def apply_event(self, event):
+        method = "apply{0}".format(
+            re.sub('([A-Z]+)', r'_\1', event.__class__.__name__).lower()
+        )
+
+        self.__getattribute__(method)(event)
+
+
+def create_events():
+    events = [GameStarted(AGGREGATE_ROOT_ID, NUMBER_OF_EVENTS, 'word')]
+    events += [LetterNotGuessed(AGGREGATE_ROOT_ID, 'x') for _ in range(NUMBER_OF_EVENTS - 1)]
+    return events
+
+
+def main():
+    events = create_events()
+    print("replaying {} events on Game".format(NUMBER_OF_EVENTS))
+    for name, aggregate_class in [('regex dispatching', RegexDispatchedGame),
+                                  ('dispatch table', Game)]:
+        duration = min(timeit.repeat(
+            lambda: aggregate_class().initialize_state(events), number=1, repeat=5))
+        print("{:<18} {:.4f}s ({:.0f} events/s)".format(name, duration, NUMBER_OF_EVENTS / duration))
+
+
+if __name__ == '__main__':
+    main()
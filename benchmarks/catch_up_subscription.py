@@ -0,0 +1,61 @@
+""" Benchmark rebuilding a projection with a catch up subscription against
+reading the store sequentially
+
+run with: python -m benchmarks.catch_up_subscription
+"""
+import os
+import tempfile
+import time
+
+from esframework.event_handling.checkpoint import SqliteCheckpointStore
+from esframework.event_handling.event_listener import EventListener
+from esframework.event_handling.subscription import CatchUpSubscription
+from esframework.store.sqlite import SqliteStore
+from benchmarks.sqlite_store import EVENTS_PER_AGGREGATE, NUMBER_OF_AGGREGATES, create_streams
+
+PAGE_SIZE = 5000
+
+
+class CountingProjection(EventListener):
+    """ a projection which only counts the events per batch """
+
+    def __init__(self):
+        self.count = 0
+
+    def receive_batch(self, event_stream: list):
+        self.count += len(event_stream)
+
+
+def main():
+    total = NUMBER_OF_AGGREGATES * EVENTS_PER_AGGREGATE
+    with tempfile.TemporaryDirectory() as directory:
+        store = SqliteStore(os.path.join(directory, 'events.db'))
+        for aggregate_root_id, events in create_streams().items():
+            store.save(events, aggregate_root_id, 0)
+
+        started = time.perf_counter()
+        position = 0
+        page = store.read_all(position, PAGE_SIZE)
+        while page:
+            position = page[-1].get_position()
+            page = store.read_all(position, PAGE_SIZE)
+        read_duration = time.perf_counter() - started
+
+        subscription = CatchUpSubscription(
+            'benchmark', store, CountingProjection(),
+            SqliteCheckpointStore(os.path.join(directory, 'checkpoints.db')),
+            page_size=PAGE_SIZE, checkpoint_interval=PAGE_SIZE)
+        started = time.perf_counter()
+        subscription.catch_up()
+        catch_up_duration = time.perf_counter() - started
+        store.close()
+
+    print("{} events".format(total))
+    print("{:<24} {:.3f}s ({:>8.0f} events/s)".format(
+        'sequential read_all', read_duration, total / read_duration))
+    print("{:<24} {:.3f}s ({:>8.0f} events/s)".format(
+        'catch up subscription', catch_up_duration, total / catch_up_duration))
+
+
+if __name__ == '__main__':
+    main()
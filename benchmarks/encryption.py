@@ -0,0 +1,41 @@
+""" Benchmark encrypting and decrypting event payloads with the CBC codec and
+the authenticated (AEAD) GCM codec, which costs more per payload
+
+run with: python -m benchmarks.encryption
+"""
+import json
+import timeit
+
+from esframework.preprocessing.encryption import AESGCMCodec, EncryptingCodec
+
+NUMBER_OF_PAYLOADS = 10000
+ENCRYPTION_KEY = "5BnzddAoY36fAxnAyQQvJn3Ag5VqPAML"
+
+
+def main():
+    payloads = [
+        json.dumps({'aggregate_root_id': str(index), 'email': 'user{}@example.org'.format(index)})
+        for index in range(NUMBER_OF_PAYLOADS)
+    ]
+    payload_bytes = [payload.encode('utf-8') for payload in payloads]
+
+    cbc = EncryptingCodec(ENCRYPTION_KEY)
+    cbc_encrypted = [cbc.encrypt(payload) for payload in payloads]
+    gcm = AESGCMCodec(ENCRYPTION_KEY)
+    gcm_encrypted = [gcm.encrypt(payload) for payload in payload_bytes]
+
+    runs = [
+        ('EncryptingCodec encrypt', lambda: [cbc.encrypt(payload) for payload in payloads]),
+        ('EncryptingCodec decrypt', lambda: [cbc.decrypt(payload) for payload in cbc_encrypted]),
+        ('AESGCMCodec encrypt', lambda: [gcm.encrypt(payload) for payload in payload_bytes]),
+        ('AESGCMCodec decrypt', lambda: [gcm.decrypt(payload) for payload in gcm_encrypted]),
+    ]
+
+    print("{} payloads, AESGCMCodec adds authentication (AEAD), not speed".format(NUMBER_OF_PAYLOADS))
+    for name, run in runs:
+        duration = min(timeit.repeat(run, number=1, repeat=5))
+        print("{:<26} {:.4f}s".format(name, duration))
+
+
+if __name__ == '__main__':
+    main()
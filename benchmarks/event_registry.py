@@ -0,0 +1,57 @@
+""" Benchmark resolving event classes while replaying a stream
+
+run with: python -m benchmarks.event_registry
+"""
+import timeit
+
+from esframework import import_path
+from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
+from esframework.registry import EventRegistry
+from esframework.store import SQLStore
+
+NUMBER_OF_EVENTS = 10000
+
+
+def build_records():
+    """ builds unsaved event store records for a single aggregate root """
+    aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+    return [
+        SqlDomainRecord(
+            domain_event_id=str(version),
+            aggregate_root_id=aggregate_root_id,
+            aggregate_root_version=version,
+            domain_event_name='esframework.tests.assets.EventA',
+            domain_event_body={
+                'aggregate_root_id': aggregate_root_id,
+                'an_event_property': 'prop{}'.format(version)
+            },
+            correlation_id=aggregate_root_id,
+            causation_id=aggregate_root_id,
+        )
+        for version in range(1, NUMBER_OF_EVENTS + 1)
+    ]
+
+
+class ImportPathRegistry(EventRegistry):
+    """ resolves every name with import_path like before the registry """
+
+    def resolve(self, name: str) -> type:
+        return import_path(name)
+
+
+def main():
+    records = build_records()
+    stores = [
+        ('import_path per record', SQLStore(session=None, registry=ImportPathRegistry())),
+        ('cached registry lookup', SQLStore(session=None, registry=EventRegistry())),
+    ]
+
+    print("replaying {} events".format(NUMBER_OF_EVENTS))
+    for name, store in stores:
+        duration = min(timeit.repeat(
+            lambda: store.convert_to_domain_events(records), number=1, repeat=5))
+        print("{:<24} {:.4f}s".format(name, duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+""" Benchmark deserializing events through the event_versioning decorator
+
+run with: python -m benchmarks.event_versioning
+"""
+import timeit
+import tracemalloc
+
+from esframework.tests.assets import EventA
+
+NUMBER_OF_EVENTS = 10000
+
+
+def deserialize_all(payloads: list):
+    for payload in payloads:
+        EventA.deserialize(payload)
+
+
+def main():
+    payloads = [
+        {'aggregate_root_id': '61C99C6A-D7E8-4C2F-8290-97B3CFB360B6', 'an_event_property': str(index)}
+        for index in range(NUMBER_OF_EVENTS)
+    ]
+    deserialize_all(payloads)
+
+    duration = min(timeit.repeat(lambda: deserialize_all(payloads), number=1, repeat=5))
+
+    print("deserializing {} events: {:.4f}s".format(NUMBER_OF_EVENTS, duration))
+
+    tracemalloc.start()
+    deserialize_all(payloads)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("peak traced memory {} bytes".format(peak))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+""" Benchmark loading events with encrypted fields through a store, with
+and without caching aggregate root keys
+
+run with: python -m benchmarks.field_encryption
+"""
+import timeit
+
+from esframework.preprocessing.encryption import FieldEncryption
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore
+from esframework.store.sqlite import SqliteStore
+from esframework.tests.assets import EventWithPersonalData
+
+NUMBER_OF_AGGREGATE_ROOTS = 100
+EVENTS_PER_AGGREGATE_ROOT = 100
+
+
+def create_store(field_encryption: FieldEncryption = None) -> SqliteStore:
+    """ creates an in memory store with the events of every aggregate root """
+    store = SqliteStore(':memory:', field_encryption=field_encryption)
+    for version in range(1, EVENTS_PER_AGGREGATE_ROOT + 1):
+        for aggregate_root in range(NUMBER_OF_AGGREGATE_ROOTS):
+            aggregate_root_id = str(aggregate_root)
+            event = EventWithPersonalData(aggregate_root_id, 'user{}@example.org'.format(version))
+            event.set_aggregate_root_version(version)
+            store.save([event], aggregate_root_id)
+    return store
+
+
+def main():
+    key_store = InMemoryKeyStore()
+
+    def load(store):
+        return [store.load(str(aggregate_root)) for aggregate_root in range(NUMBER_OF_AGGREGATE_ROOTS)]
+
+    def read_all(store):
+        return store.read_all(0, NUMBER_OF_AGGREGATE_ROOTS * EVENTS_PER_AGGREGATE_ROOT)
+
+    runs = [
+        ('plain', create_store()),
+        ('encrypted, cache_size=1', create_store(FieldEncryption(key_store, cache_size=1))),
+        ('encrypted, cached keys', create_store(FieldEncryption(key_store))),
+    ]
+
+    print("{} aggregate roots with {} interleaved events, deserializing decrypts every email".format(
+        NUMBER_OF_AGGREGATE_ROOTS, EVENTS_PER_AGGREGATE_ROOT))
+    for name, store in runs:
+        load_duration = min(timeit.repeat(lambda: load(store), number=1, repeat=5))
+        read_all_duration = min(timeit.repeat(lambda: read_all(store), number=1, repeat=5))
+        print("{:<26} load {:.4f}s   read_all {:.4f}s".format(name, load_duration, read_all_duration))
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
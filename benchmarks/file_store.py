@@ -0,0 +1,25 @@
+""" Benchmark FileStore against InMemoryStore and SQLStore
+
+run with: python -m benchmarks.file_store
+"""
+import os
+import tempfile
+
+from benchmarks.sqlite_store import (
+    EVENTS_PER_AGGREGATE, NUMBER_OF_AGGREGATES, create_sql_store, run)
+from esframework.store import InMemoryStore
+from esframework.store.file import FileStore
+
+
+def main():
+    print("{} aggregates with {} events each".format(NUMBER_OF_AGGREGATES, EVENTS_PER_AGGREGATE))
+    with tempfile.TemporaryDirectory() as directory:
+        run('InMemory', InMemoryStore())
+        run('SQLStore', create_sql_store(os.path.join(directory, 'orm.db')))
+        file_store = FileStore(os.path.join(directory, 'segments'))
+        run('FileStore', file_store)
+        file_store.close()
+
+
+if __name__ == '__main__':
+    main()
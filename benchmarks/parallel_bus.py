@@ -0,0 +1,53 @@
+""" Benchmark delivering events to a listener doing I/O
+
+run with: python -m benchmarks.parallel_bus
+"""
+import time
+
+from esframework.event_handling.event_bus import BasicBus
+from esframework.event_handling.event_listener import EventListener
+from esframework.event_handling.parallel_bus import ParallelBus
+from esframework.tests.assets import EventA
+
+NUMBER_OF_AGGREGATES = 50
+EVENTS_PER_AGGREGATE = 10
+IO_LATENCY = 0.001
+
+
+class ReadModelListener(EventListener):
+    """ simulates writing a read model row per event """
+
+    def apply_event_a(self, domain_event: EventA):
+        time.sleep(IO_LATENCY)
+
+
+def create_event(aggregate_root_id: str, version: int) -> EventA:
+    event = EventA(aggregate_root_id, version)
+    event.set_correlation_id(aggregate_root_id)
+    return event
+
+
+def run(event_bus) -> float:
+    event_bus.subscribe(ReadModelListener())
+    started = time.perf_counter()
+    for version in range(EVENTS_PER_AGGREGATE):
+        event_bus.emit([
+            create_event('aggregate-{}'.format(aggregate), version)
+            for aggregate in range(NUMBER_OF_AGGREGATES)
+        ])
+    if isinstance(event_bus, ParallelBus):
+        event_bus.drain()
+        event_bus.shutdown()
+    return time.perf_counter() - started
+
+
+def main():
+    print("delivering {} events with {}ms latency per event".format(
+        NUMBER_OF_AGGREGATES * EVENTS_PER_AGGREGATE, IO_LATENCY * 1000))
+    print("{:<24} {:.4f}s".format('BasicBus', run(BasicBus())))
+    for lanes in (2, 4, 8):
+        print("{:<24} {:.4f}s".format('ParallelBus {} lanes'.format(lanes), run(ParallelBus(lanes))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+""" Benchmark rebuilding a projection with a growing number of workers
+
+run with: python -m benchmarks.parallel_rebuild
+"""
+import functools
+import hashlib
+import os
+import tempfile
+import time
+
+from esframework.projection import ParallelRebuild, PartitionedProjection
+from esframework.store.sqlite import SqliteStore
+from esframework.tests.assets import EventA
+from benchmarks.sqlite_store import EVENTS_PER_AGGREGATE, NUMBER_OF_AGGREGATES, create_streams
+
+
+class DigestProjection(PartitionedProjection):
+    """ a projection doing some cpu work per event """
+
+    def __init__(self):
+        self.__digests = {}
+
+    def apply_event_a(self, domain_event: EventA):
+        digest = domain_event.get_an_event_property().encode('utf-8')
+        for _ in range(200):
+            digest = hashlib.sha256(digest).digest()
+        self.__digests[domain_event.get_aggregate_root_id()] = digest
+
+    def get_state(self) -> dict:
+        return self.__digests
+
+    @classmethod
+    def merge(cls, states: list) -> dict:
+        merged = {}
+        for state in states:
+            merged.update(state)
+        return merged
+
+
+def main():
+    print("{} aggregates with {} events each".format(NUMBER_OF_AGGREGATES, EVENTS_PER_AGGREGATE))
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'events.db')
+        store = SqliteStore(database)
+        for aggregate_root_id, events in create_streams().items():
+            store.save(events, aggregate_root_id, 0)
+        store.close()
+
+        for number_of_workers in (1, 2, 4):
+            rebuild = ParallelRebuild(
+                functools.partial(SqliteStore, database), DigestProjection, number_of_workers)
+            started = time.perf_counter()
+            rebuild.run()
+            print("{} workers: {:.3f}s".format(number_of_workers, time.perf_counter() - started))
+            for report in rebuild.get_reports():
+                print("    {!r}".format(report))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+""" Benchmark mapping stored payloads with compiled and cached plans
+
+run with: python -m benchmarks.schema_mapper
+"""
+import timeit
+
+from esframework.preprocessing.schema import WeakSchemaMapper
+from esframework.tests.assets import EventAV4
+
+NUMBER_OF_EVENTS = 10000
+
+
+def main():
+    outdated = {
+        'aggregate_root_id': '61C99C6A-D7E8-4C2F-8290-97B3CFB360B6',
+        'an_event_property': 'foo',
+        'removed_property': 'bar',
+        'new_dict_prop': {'some_key_one': 'dict_value_one'},
+    }
+    mapper = WeakSchemaMapper()
+    current = mapper.map(outdated, EventAV4)
+
+    print("mapping {} payloads to EventAV4".format(NUMBER_OF_EVENTS))
+    for name, current_event_mapping in [('class dictionary', EventAV4.__dict__),
+                                        ('cached class plan', EventAV4)]:
+        for payload_name, payload in [('outdated', outdated), ('current', current)]:
+            duration = min(timeit.repeat(
+                lambda: mapper.map(payload, current_event_mapping), number=NUMBER_OF_EVENTS, repeat=5))
+            print("{:<18} {:<9} {:.4f}s".format(name, payload_name, duration))
+
+
+if __name__ == '__main__':
+    main()
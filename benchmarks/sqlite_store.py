@@ -0,0 +1,68 @@
+""" Benchmark SqliteStore against SQLStore on the same workload
+
+run with: python -m benchmarks.sqlite_store
+"""
+import os
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
+from esframework.store import SQLStore
+from esframework.store.sqlite import SqliteStore
+from esframework.tests.assets import EventA
+
+NUMBER_OF_AGGREGATES = 200
+EVENTS_PER_AGGREGATE = 50
+
+
+def create_streams():
+    """ creates the versioned event streams which will be stored """
+    streams = {}
+    for _ in range(NUMBER_OF_AGGREGATES):
+        aggregate_root_id = str(uuid.uuid4())
+        events = []
+        for version in range(1, EVENTS_PER_AGGREGATE + 1):
+            event = EventA(aggregate_root_id, 'prop{}'.format(version))
+            event.set_aggregate_root_version(version)
+            events.append(event)
+        streams[aggregate_root_id] = events
+    return streams
+
+
+def create_sql_store(database: str) -> SQLStore:
+    engine = create_engine('sqlite:///' + database)
+    SqlDomainRecord.metadata.create_all(engine)
+    return SQLStore(sessionmaker(bind=engine)())
+
+
+def run(name: str, store):
+    streams = create_streams()
+
+    started = time.perf_counter()
+    for aggregate_root_id, events in streams.items():
+        store.save(events, aggregate_root_id, 0)
+    save_duration = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for aggregate_root_id in streams:
+        store.load(aggregate_root_id)
+    load_duration = time.perf_counter() - started
+
+    total = NUMBER_OF_AGGREGATES * EVENTS_PER_AGGREGATE
+    print("{:<12} save {:.3f}s ({:>8.0f} events/s)   load {:.3f}s ({:>8.0f} events/s)".format(
+        name, save_duration, total / save_duration, load_duration, total / load_duration))
+
+
+def main():
+    print("{} aggregates with {} events each".format(NUMBER_OF_AGGREGATES, EVENTS_PER_AGGREGATE))
+    with tempfile.TemporaryDirectory() as directory:
+        run('SQLStore', create_sql_store(os.path.join(directory, 'orm.db')))
+        run('SqliteStore', SqliteStore(os.path.join(directory, 'raw.db')))
+
+
+if __name__ == '__main__':
+    main()
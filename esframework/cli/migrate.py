@@ -0,0 +1,287 @@
+""" Migrates the stored events to the latest schema """
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
+from esframework.event_handling.checkpoint import SqliteCheckpointStore
+from esframework.exceptions import UpcasterException
+from esframework.preprocessing.encryption import FieldEncryption, is_encrypted
+from esframework.preprocessing.encryption.keystore import SqliteKeyStore
+from esframework.preprocessing.schema import (
+    SchemaMapperFactory, get_schema_fingerprint, is_schema_versioned)
+from esframework.preprocessing.upcasting import UpcasterChain, upcaster_chain
+from esframework.registry import EventRegistry, event_registry
+from esframework.store import SQLStore
+
+
+class MigrationReport(object):
+    """ The number of scanned and changed events of a migration """
+
+    def __init__(self, scanned: int = 0, changed: int = 0):
+        self.__scanned = scanned
+        self.__changed = changed
+
+    def get_scanned(self) -> int:
+        return self.__scanned
+
+    def get_changed(self) -> int:
+        return self.__changed
+
+    def add(self, report: 'MigrationReport'):
+        self.__scanned += report.get_scanned()
+        self.__changed += report.get_changed()
+
+    def __repr__(self):
+        return "{} events scanned, {} events changed".format(self.__scanned, self.__changed)
+
+
+class EventMigration(object):
+    """ Rewrites the bodies of the stored events with the upcaster chain and
+    optionally a schema mapper, so they do not have to be migrated on every
+    replay anymore. Bodies mapped by the schema mapper get the fingerprint of
+    the current event class, so they are not mapped on read anymore. Only
+    events whose deserialize is decorated with event_versioning are mapped,
+    the bodies of other events are only upcasted.
+
+    The events are read in pages by position and the changed bodies of a page
+    are written back in one transaction. With a checkpoint database the
+    migration continues after the last written page when it is run again.
+    The aggregate root ids can be split in ranges which are migrated in
+    parallel processes, the migration is pickled to the workers so upcasters
+    have to be module level functions.
+
+    Encrypted fields are decrypted with field_encryption before upcasting
+    and mapping and encrypted again afterwards, without field_encryption
+    events with encrypted fields can only be mapped. Events of forgotten
+    aggregate roots are left as they are.
+    """
+
+    def __init__(self, database_url: str, name: str = 'default', page_size: int = 1000,
+                 upcasters: UpcasterChain = None, registry: EventRegistry = None,
+                 versioning_type: str = None, checkpoint_database: str = None,
+                 dry_run: bool = False, field_encryption: FieldEncryption = None):
+        self.__database_url = database_url
+        self.__name = name
+        self.__page_size = page_size
+        self.__upcasters = upcasters if upcasters is not None else upcaster_chain
+        self.__registry = registry if registry is not None else event_registry
+        self.__versioning_type = versioning_type
+        self.__checkpoint_database = checkpoint_database
+        self.__dry_run = dry_run
+        self.__field_encryption = field_encryption
+
+        if versioning_type is not None:
+            SchemaMapperFactory.factory(versioning_type)
+
+    def get_ranges(self, number_of_ranges: int) -> List[tuple]:
+        """ splits the stored aggregate root ids in ranges of about the same
+        size, a range includes its lower bound and excludes its upper bound """
+        session = self.__create_session()
+        aggregate_root_ids = [
+            row[0] for row in session.query(SqlDomainRecord.aggregate_root_id)
+            .distinct()
+            .order_by(SqlDomainRecord.aggregate_root_id)
+        ]
+        session.close()
+
+        bounds = sorted(set(
+            aggregate_root_ids[len(aggregate_root_ids) * index // number_of_ranges]
+            for index in range(1, number_of_ranges)
+            if aggregate_root_ids
+        ))
+        return list(zip([None] + bounds, bounds + [None]))
+
+    def run(self, number_of_workers: int = 1) -> MigrationReport:
+        """ migrates the event store, in parallel when there is more than one
+        worker """
+        report = MigrationReport()
+        if number_of_workers <= 1:
+            report.add(self.migrate_range(None, None))
+            return report
+
+        with ProcessPoolExecutor(max_workers=number_of_workers) as executor:
+            futures = [
+                executor.submit(self.migrate_range, lower, upper)
+                for lower, upper in self.get_ranges(number_of_workers)
+            ]
+            for future in futures:
+                report.add(future.result())
+
+        return report
+
+    def migrate_range(self, lower: str = None, upper: str = None) -> MigrationReport:
+        """ migrates the events of the aggregate roots from lower up to upper """
+        session = self.__create_session()
+        checkpoint_store = None
+        checkpoint_name = "migration:{}:{}:{}".format(self.__name, lower or '', upper or '')
+        position = 0
+        if self.__checkpoint_database is not None:
+            checkpoint_store = SqliteCheckpointStore(self.__checkpoint_database)
+            position = checkpoint_store.load(checkpoint_name)
+
+        scanned = 0
+        changed = 0
+        while True:
+            query = session.query(
+                SqlDomainRecord.position,
+                SqlDomainRecord.aggregate_root_id,
+                SqlDomainRecord.domain_event_name,
+                SqlDomainRecord.domain_event_body,
+                SqlDomainRecord.schema_version,
+                SqlDomainRecord.schema_fingerprint,
+            ).filter(SqlDomainRecord.position > position)
+            if lower is not None:
+                query = query.filter(SqlDomainRecord.aggregate_root_id >= lower)
+            if upper is not None:
+                query = query.filter(SqlDomainRecord.aggregate_root_id < upper)
+            rows = query.order_by(SqlDomainRecord.position).limit(self.__page_size).all()
+            if not rows:
+                break
+
+            updates = []
+            for record_position, aggregate_root_id, domain_event_name, domain_event_body, \
+                    schema_version, schema_fingerprint in rows:
+                schema_version = schema_version or 1
+                event_data, new_schema_version = self.migrate(
+                    domain_event_name, schema_version, domain_event_body, aggregate_root_id)
+                new_schema_fingerprint = schema_fingerprint
+                if self.__is_mapped(domain_event_name):
+                    new_schema_fingerprint = get_schema_fingerprint(
+                        self.__registry.resolve(domain_event_name))
+
+                if event_data != domain_event_body or new_schema_version != schema_version or \
+                        new_schema_fingerprint != schema_fingerprint:
+                    updates.append({
+                        'position': record_position,
+                        'domain_event_body': event_data,
+                        'schema_version': new_schema_version,
+                        'schema_fingerprint': new_schema_fingerprint,
+                    })
+
+            scanned += len(rows)
+            changed += len(updates)
+            position = rows[-1][0]
+
+            if not self.__dry_run:
+                session.bulk_update_mappings(SqlDomainRecord, updates)
+                session.commit()
+                if checkpoint_store is not None:
+                    checkpoint_store.save(checkpoint_name, position)
+
+        session.close()
+        if checkpoint_store is not None:
+            checkpoint_store.close()
+        return MigrationReport(scanned, changed)
+
+    def migrate(self, domain_event_name: str, schema_version: int, event_data: dict,
+                aggregate_root_id: str = None) -> tuple:
+        """ returns the migrated body and its schema version """
+        encrypted_fields = [
+            field_name for field_name, value in event_data.items() if is_encrypted(value)]
+        if not encrypted_fields:
+            return self.__migrate(domain_event_name, schema_version, event_data)
+
+        upcaster = self.__upcasters.get_upcaster(
+            domain_event_name, schema_version,
+            self.__registry.resolve(domain_event_name).schema_version)
+        if self.__field_encryption is None:
+            if upcaster is not None:
+                raise UpcasterException(
+                    "{} has encrypted fields, upcasting it needs field encryption".format(
+                        domain_event_name))
+            return self.__migrate(domain_event_name, schema_version, event_data)
+
+        if self.__field_encryption.get_codec(aggregate_root_id) is None:
+            return event_data, schema_version
+
+        decrypted_data = self.__field_encryption.decrypt(event_data, aggregate_root_id, lazy=False)
+        migrated_data, new_schema_version = self.__migrate(
+            domain_event_name, schema_version, dict(decrypted_data))
+        if migrated_data == decrypted_data and new_schema_version == schema_version:
+            return event_data, schema_version
+
+        encrypted_fields = set(encrypted_fields).union(
+            self.__registry.resolve(domain_event_name).encrypted_fields)
+        return self.__field_encryption.encrypt(
+            migrated_data, encrypted_fields, aggregate_root_id), new_schema_version
+
+    def __migrate(self, domain_event_name: str, schema_version: int, event_data: dict) -> tuple:
+        target_version = self.__registry.resolve(domain_event_name).schema_version
+        upcaster = self.__upcasters.get_upcaster(domain_event_name, schema_version, target_version)
+        if upcaster is not None:
+            event_data = upcaster(event_data)
+            schema_version = target_version
+
+        if self.__is_mapped(domain_event_name):
+            mapper = SchemaMapperFactory.factory(self.__versioning_type)
+            event_data = dict(mapper.map(event_data, self.__registry.resolve(domain_event_name)))
+
+        return event_data, schema_version
+
+    def __is_mapped(self, domain_event_name: str) -> bool:
+        """ returns if the bodies of an event are mapped by the schema mapper """
+        return self.__versioning_type is not None and \
+            is_schema_versioned(self.__registry.resolve(domain_event_name))
+
+    def get_schema_fingerprint_report(self) -> List[tuple]:
+        """ returns the fingerprint distribution of the event store """
+        session = self.__create_session()
+        report = SQLStore(session, registry=self.__registry).get_schema_fingerprint_report()
+        session.close()
+        return report
+
+    def __create_session(self):
+        return sessionmaker(bind=create_engine(self.__database_url))()
+
+
+def main(arguments: List[str] = None):
+    parser = argparse.ArgumentParser(description=EventMigration.__doc__.split('\n')[0].strip())
+    parser.add_argument('database_url', help="sqlalchemy url of the event store")
+    parser.add_argument('--name', default='default', help="name of the migration checkpoints")
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of aggregate root id ranges migrated in parallel")
+    parser.add_argument('--mapper', dest='versioning_type',
+                        help="versioning type of the schema mapper to apply, e.g. weak-schema")
+    parser.add_argument('--checkpoints', dest='checkpoint_database',
+                        help="sqlite database for resuming the migration")
+    parser.add_argument('--keys', dest='key_database',
+                        help="sqlite key store for migrating encrypted fields")
+    parser.add_argument('--import', dest='modules', action='append', default=[],
+                        help="module registering upcasters, can be repeated")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="only count the events which would change")
+    parser.add_argument('--report', action='store_true',
+                        help="only report the number of events per schema fingerprint")
+    options = parser.parse_args(arguments)
+
+    for module in options.modules:
+        importlib.import_module(module)
+
+    field_encryption = None
+    if options.key_database is not None:
+        field_encryption = FieldEncryption(SqliteKeyStore(options.key_database))
+
+    migration = EventMigration(
+        options.database_url, name=options.name, page_size=options.page_size,
+        versioning_type=options.versioning_type,
+        checkpoint_database=options.checkpoint_database, dry_run=options.dry_run,
+        field_encryption=field_encryption)
+
+    if options.report:
+        report = migration.get_schema_fingerprint_report()
+        for domain_event_name, schema_fingerprint, count, current in report:
+            print("{:<60} {:<40} {:>10} {}".format(
+                domain_event_name, schema_fingerprint or '-', count,
+                'current' if current else 'legacy'))
+        return report
+
+    report = migration.run(options.workers)
+
+    print("{}{!r}".format("dry run: " if options.dry_run else "", report))
+    return report
@@ -0,0 +1,66 @@
+""" Upgrades an existing SQL event store to the current table layout """
+import argparse
+from typing import List
+
+from sqlalchemy import create_engine, inspect
+
+from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
+
+TABLE = SqlDomainRecord.__tablename__
+OLD_TABLE = TABLE + '_upgrade'
+
+COPIED_COLUMNS = (
+    'domain_event_id', 'aggregate_root_id', 'aggregate_root_version', 'domain_event_name',
+    'domain_event_body', 'store_date', 'event_date', 'correlation_id', 'causation_id',
+    'event_metadata',
+)
+
+
+def upgrade_event_store(engine) -> List[str]:
+    """ brings an event_store table created by an older version up to date
+    and returns the applied steps. Tables without the position column are
+    rebuilt, their events get positions in the order of their store date and
+    version. The steps run in one transaction, databases without
+    transactional DDL, like MySQL, should be backed up first """
+    steps = []
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        if TABLE not in inspector.get_table_names():
+            SqlDomainRecord.__table__.create(connection)
+            return ['create table']
+
+        columns = {column['name'] for column in inspector.get_columns(TABLE)}
+        if 'position' not in columns:
+            copied_columns = ', '.join(COPIED_COLUMNS)
+            connection.execute("ALTER TABLE {} RENAME TO {}".format(TABLE, OLD_TABLE))
+            SqlDomainRecord.__table__.create(connection)
+            connection.execute(
+                "INSERT INTO {table} ({columns}, schema_version) SELECT {columns}, 1 FROM {old_table} "
+                "ORDER BY store_date, aggregate_root_id, aggregate_root_version".format(
+                    table=TABLE, columns=copied_columns, old_table=OLD_TABLE))
+            connection.execute("DROP TABLE {}".format(OLD_TABLE))
+            return ['add position']
+
+        if 'schema_version' not in columns:
+            connection.execute(
+                "ALTER TABLE {} ADD COLUMN schema_version INTEGER NOT NULL DEFAULT 1".format(TABLE))
+            steps.append('add schema_version')
+
+        if 'schema_fingerprint' not in columns:
+            connection.execute(
+                "ALTER TABLE {} ADD COLUMN schema_fingerprint VARCHAR(40)".format(TABLE))
+            connection.execute(
+                "CREATE INDEX ix_{0}_schema_fingerprint ON {0} (schema_fingerprint)".format(TABLE))
+            steps.append('add schema_fingerprint')
+
+    return steps
+
+
+def main(arguments: List[str] = None) -> List[str]:
+    parser = argparse.ArgumentParser(description=upgrade_event_store.__doc__.split('\n')[0].strip())
+    parser.add_argument('database_url', help="sqlalchemy url of the event store")
+    options = parser.parse_args(arguments)
+
+    steps = upgrade_event_store(create_engine(options.database_url))
+    print("applied: {}".format(', '.join(steps)) if steps else "event store is up to date")
+    return steps
@@ -7,7 +7,8 @@ Base = declarative_base()
 class SqlDomainRecord(Base):
     __tablename__ = 'event_store'
 
-    domain_event_id = Column(String(length=36), primary_key=True, nullable=False)
+    position = Column(Integer, primary_key=True, autoincrement=True)
+    domain_event_id = Column(String(length=36), unique=True, nullable=False)
     aggregate_root_id = Column(String(length=36), nullable=False)
     aggregate_root_version = Column(Integer, nullable=False)
     domain_event_name = Column(String(length=255), nullable=False)
@@ -17,11 +18,18 @@ class SqlDomainRecord(Base):
     correlation_id = Column(String(length=36), nullable=False)
     causation_id = Column(String(length=36), nullable=False)
     event_metadata = Column(JSON, nullable=False)
+    schema_version = Column(Integer, nullable=False, default=1)
+    schema_fingerprint = Column(String(length=40), nullable=True, index=True)
 
-    UniqueConstraint('aggregate_root_id', 'version', name='uix_1')
+    __table_args__ = (
+        UniqueConstraint('aggregate_root_id', 'aggregate_root_version',
+                         name='uix_aggregate_root_version'),
+        {'sqlite_autoincrement': True},
+    )
 
     def __repr__(self):
         return "<EventStoreRecord(" \
+               "position='%s', " \
                "domain_event_id='%s', " \
                "aggregate_root_id='%s', " \
                "aggregate_root_version='%s'" \
@@ -32,8 +40,28 @@ class SqlDomainRecord(Base):
                "correlation_id='%s'" \
                "causation_id='%s'" \
                "event_metadata='%s'" \
+               "schema_version='%s'" \
+               "schema_fingerprint='%s'" \
                ")>" % \
-               (self.domain_event_id, self.aggregate_root_id, self.aggregate_root_version,
+               (self.position, self.domain_event_id, self.aggregate_root_id, self.aggregate_root_version,
                 self.domain_event_name, self.domain_event_body, self.store_date,
                 self.event_date, self.correlation_id, self.causation_id,
-                self.event_metadata)
+                self.event_metadata, self.schema_version, self.schema_fingerprint)
+
+
+class SqlSnapshotRecord(Base):
+    __tablename__ = 'snapshot_store'
+
+    aggregate_root_id = Column(String(length=36), primary_key=True, nullable=False)
+    aggregate_root_version = Column(Integer, primary_key=True, nullable=False)
+    snapshot_state = Column(JSON, nullable=False)
+    store_date = Column(String(length=50), nullable=False)
+
+    def __repr__(self):
+        return "<SnapshotStoreRecord(" \
+               "aggregate_root_id='%s', " \
+               "aggregate_root_version='%s'" \
+               "store_date='%s'" \
+               ")>" % \
+               (self.aggregate_root_id, self.aggregate_root_version,
+                self.store_date)
@@ -1,12 +1,13 @@
 """ Imports """
 import abc
+import copy
 import datetime
+import functools
 import re
-from typing import Union
+from typing import Iterable, List, Union
 
-from typing import List
-
-from esframework.exceptions import DomainEventException
+from esframework.exceptions import (
+    AggregateRootOutOfSyncError, DomainEventException, SnapshotException, UnhandledEventException)
 
 
 class Event(object, metaclass=abc.ABCMeta):
@@ -16,6 +17,7 @@ class Event(object, metaclass=abc.ABCMeta):
     __event_date = datetime.datetime.now().isoformat()
     __event_id = None
     __metadata = list()
+    __position = None
     __version = None
 
     def __init__(self):
@@ -24,6 +26,7 @@ class Event(object, metaclass=abc.ABCMeta):
         self.__event_date = datetime.datetime.now().isoformat()
         self.__event_id = None
         self.__metadata = list()
+        self.__position = None
         self.__version = None
 
     def get_aggregate_root_version(self) -> int:
@@ -66,6 +69,16 @@ class Event(object, metaclass=abc.ABCMeta):
             raise DomainEventException("Event id can only be set once!")
         self.__event_id = event_id
 
+    def get_position(self) -> int:
+        """ returns the position of this event in the global event log """
+        return self.__position
+
+    def set_position(self, position: int):
+        """ sets the position of this event in the global event log """
+        if self.__position is not None:
+            raise DomainEventException("Position can only be set once!")
+        self.__position = position
+
     def get_event_date(self) -> str:
         """ returns the date of event creation. note this is not stored date """
         return self.__event_date
@@ -98,7 +111,14 @@ class Event(object, metaclass=abc.ABCMeta):
 
 
 class DomainEvent(Event):
-    """ Abstract event class with serialize and deserialize method """
+    """ Abstract event class with serialize and deserialize method. The schema
+    version of the serialized body is stored with every event and has to be
+    raised when an upcaster for the old body is registered. The keys of the
+    serialized body listed in encrypted_fields are encrypted by stores with
+    field encryption """
+
+    schema_version = 1
+    encrypted_fields = ()
 
     @abc.abstractmethod
     def serialize(self):
@@ -112,15 +132,112 @@ class DomainEvent(Event):
         raise NotImplementedError('an event must be deserializable')
 
 
+class Snapshot(object):
+    """ The state of an aggregate root at a certain version """
+
+    def __init__(self, aggregate_root_id: str, aggregate_root_version: int, state: dict):
+        self.__aggregate_root_id = aggregate_root_id
+        self.__aggregate_root_version = aggregate_root_version
+        self.__state = state
+
+    def get_aggregate_root_id(self) -> str:
+        """ returns the id of the aggregate root this snapshot belongs to """
+        return self.__aggregate_root_id
+
+    def get_aggregate_root_version(self) -> int:
+        """ returns the version of the aggregate root at snapshot time """
+        return self.__aggregate_root_version
+
+    def get_state(self) -> dict:
+        """ returns the captured state of the aggregate root """
+        return self.__state
+
+
+@functools.lru_cache(maxsize=None)
+def get_apply_method_name(event_class: type) -> str:
+    """ returns the name of the method applying an event class by convention,
+    EventA is applied by apply_event_a """
+    return "apply{0}".format(
+        re.sub('([A-Z]+)', r'_\1', event_class.__name__).lower()
+    )
+
+
+def handles(*event_classes: type):
+    """ decorator to explicitly mark a method as the handler of one or more
+    event classes instead of relying on the apply_<event_name> convention """
+    def decorator(method):
+        method.handled_events = event_classes
+        return method
+
+    return decorator
+
+
+def collect_event_handlers(cls: type) -> dict:
+    """ returns the event classes mapped to the names of the methods of a
+    class marked with @handles, including the ones of its parents """
+    event_handlers = {}
+    for klass in reversed(cls.__mro__):
+        for name, attribute in vars(klass).items():
+            for event_class in getattr(attribute, 'handled_events', ()):
+                event_handlers[event_class] = name
+
+    return event_handlers
+
+
+def find_event_handler(cls: type, event_handlers: dict, event_class: type, base_class: type):
+    """ returns the function of cls handling an event class or None. Handlers
+    marked with @handles win over the naming convention and handlers of parent
+    event classes are used when there is no handler for the event class itself.
+    Methods of the base class are never used as handler """
+    for klass in event_class.__mro__:
+        if klass in (DomainEvent, Event, object):
+            break
+
+        name = event_handlers.get(klass)
+        if name is None and not hasattr(base_class, get_apply_method_name(klass)):
+            name = get_apply_method_name(klass)
+
+        if name is not None and callable(getattr(cls, name, None)):
+            return getattr(cls, name)
+
+    return None
+
+
 class AggregateRoot(object):
     """ A base aggregate root class with basics already implemented """
     __loaded_aggregate_root_version = 0
     __uncommitted_events = []
+    __event_handlers = {}
+    __dispatch_table = {}
 
     def __init__(self):
         self.__loaded_aggregate_root_version = 0
         self.__uncommitted_events = []
 
+    def __init_subclass__(cls, **kwargs):
+        """ collects the methods marked with @handles once per class, the
+        dispatch table itself is filled when an event class is first seen """
+        super().__init_subclass__(**kwargs)
+        cls.__event_handlers = collect_event_handlers(cls)
+        cls.__dispatch_table = {}
+
+    @classmethod
+    def get_event_handler(cls, event_class: type):
+        """ returns the function applying an event class and keeps it in the
+        dispatch table of the aggregate root class """
+        try:
+            return cls.__dispatch_table[event_class]
+        except KeyError:
+            pass
+
+        handler = find_event_handler(cls, cls.__event_handlers, event_class, AggregateRoot)
+        if handler is None:
+            raise UnhandledEventException(
+                "{0} cannot apply {1}".format(cls.__name__, event_class.__name__))
+
+        cls.__dispatch_table[event_class] = handler
+        return handler
+
     def apply(self, event: DomainEvent):
         """ Apply an event and put it to the uncommitted events list """
         event_version = self.__loaded_aggregate_root_version + len(self.__uncommitted_events) + 1
@@ -131,11 +248,12 @@ class AggregateRoot(object):
 
     def apply_event(self, event):
         """ applies the actual event """
-        method = "apply{0}".format(
-            re.sub('([A-Z]+)', r'_\1', event.__class__.__name__).lower()
-        )
+        try:
+            handler = self.__dispatch_table[event.__class__]
+        except KeyError:
+            handler = self.get_event_handler(event.__class__)
 
-        self.__getattribute__(method)(event)
+        handler(self, event)
 
     def get_uncommitted_events(self) -> List[DomainEvent]:
         """ returns the list of uncommitted events """
@@ -145,18 +263,72 @@ class AggregateRoot(object):
         """ clear the list of uncommitted events """
         self.__uncommitted_events = []
 
-    def initialize_state(self, list_of_events: List[DomainEvent]):
+    def mark_events_committed(self):
+        """ the uncommitted events are stored and become part of the loaded
+        version of the aggregate root """
+        self.__loaded_aggregate_root_version += len(self.__uncommitted_events)
+        self.__uncommitted_events = []
+
+    def initialize_state(self, list_of_events: Iterable[DomainEvent]):
         """ initializes the default state of the aggregate root based on the
-        list of incoming events
+        incoming events, which can be a list or a lazy stream from the store
         """
         for event in list_of_events:
             self.apply_event(event)
             self.__loaded_aggregate_root_version += 1
 
+    def catch_up(self, list_of_events: Iterable[DomainEvent]):
+        """ applies the events stored after the loaded version, so an
+        aggregate root kept in memory can be brought up to date """
+        if self.__uncommitted_events:
+            raise AggregateRootOutOfSyncError(
+                "Cannot catch up an aggregate root with uncommitted events")
+
+        for event in list_of_events:
+            event_version = event.get_aggregate_root_version()
+            if event_version is not None and \
+                    event_version != self.__loaded_aggregate_root_version + 1:
+                raise AggregateRootOutOfSyncError(
+                    "Event version {0} does not follow aggregate root version {1}".format(
+                        event_version, self.__loaded_aggregate_root_version))
+
+            self.apply_event(event)
+            self.__loaded_aggregate_root_version += 1
+
     def get_aggregate_root_version(self) -> int:
         """ returns the initialized state version """
         return self.__loaded_aggregate_root_version
 
+    def create_snapshot(self) -> Snapshot:
+        """ creates a snapshot of the loaded state of the aggregate root """
+        if self.__uncommitted_events:
+            raise SnapshotException(
+                "Cannot snapshot an aggregate root with uncommitted events")
+
+        return Snapshot(
+            self.get_aggregate_root_id(),
+            self.__loaded_aggregate_root_version,
+            self.get_snapshot_state())
+
+    def restore_snapshot(self, snapshot: Snapshot):
+        """ restores the state and version of the aggregate root from a
+        snapshot, events after the snapshot version can be applied on top
+        """
+        self.set_snapshot_state(copy.deepcopy(snapshot.get_state()))
+        self.__loaded_aggregate_root_version = snapshot.get_aggregate_root_version()
+
+    def get_snapshot_state(self) -> dict:
+        """ returns the state to put in a snapshot, override this when the
+        aggregate root holds state which cannot simply be copied """
+        return copy.deepcopy({
+            key: value for key, value in self.__dict__.items()
+            if not key.startswith('_AggregateRoot__')
+        })
+
+    def set_snapshot_state(self, state: dict):
+        """ sets the state taken from a snapshot """
+        self.__dict__.update(state)
+
     @abc.abstractmethod
     def get_aggregate_root_id(self):
         """ Every aggregate should have a function to get the aggregate id """
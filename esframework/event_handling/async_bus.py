@@ -0,0 +1,192 @@
+""" Event bus delivering events to listeners on asyncio queues """
+import asyncio
+import inspect
+import logging
+from typing import List
+
+from esframework.domain import DomainEvent
+from esframework.event_handling.event_bus import EventBus
+from esframework.event_handling.event_listener import EventListener
+from esframework.exceptions import EventBusException
+
+BLOCK = 'block'
+DROP_OLDEST = 'drop-oldest'
+ERROR = 'error'
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBus(EventBus):
+    """ A bus which queues events per listener and delivers them from an
+    asyncio task per listener, so emitting does not wait for the listeners.
+    Every listener gets its events in the emitted order and its apply methods
+    can be coroutines.
+
+    When the queue of a listener is full the backpressure policy decides:
+    'block' waits for room, emit cannot wait so it schedules the events to be
+    queued in order as soon as there is room, 'drop-oldest' drops the oldest
+    queued event and 'error' raises an EventBusException before any event of
+    the stream is queued. emit and publish must be called from the event loop.
+    """
+
+    def __init__(self, max_queue_size: int = 1000, backpressure: str = BLOCK,
+                 error_handler=None):
+        if backpressure not in (BLOCK, DROP_OLDEST, ERROR):
+            raise EventBusException("Unknown backpressure policy: {}".format(backpressure))
+
+        if max_queue_size < 1:
+            raise EventBusException("Queue size must be at least 1")
+
+        self.__max_queue_size = max_queue_size
+        self.__backpressure = backpressure
+        self.__error_handler = error_handler
+        self.__listeners = []
+        self.__queues = {}
+        self.__workers = {}
+        self.__blocked = None
+        self.__dropped_events = 0
+        self.__closed = False
+
+    def get_event_listeners(self) -> List[EventListener]:
+        return self.__listeners
+
+    def get_dropped_events(self) -> int:
+        """ returns the number of events dropped by the drop-oldest policy """
+        return self.__dropped_events
+
+    def get_queue_sizes(self) -> dict:
+        """ returns the number of queued events per listener """
+        return {listener: queue.qsize() for listener, queue in self.__queues.items()}
+
+    def subscribe(self, event_listener: EventListener):
+        if not isinstance(event_listener, EventListener):
+            raise EventBusException("Only classes based on EventListener can subscribe")
+        self.__listeners.append(event_listener)
+
+    def unsubscribe(self, event_listener: EventListener):
+        """ unsubscribes a listener, events still queued for it are dropped """
+        if not isinstance(event_listener, EventListener):
+            raise EventBusException("Only classes based on EventListener can unsubscribe")
+        try:
+            self.__listeners.remove(event_listener)
+        except ValueError:
+            raise EventBusException("Cannot unsubscribe non existing listener from list")
+
+        self.__queues.pop(event_listener, None)
+        worker = self.__workers.pop(event_listener, None)
+        if worker is not None:
+            worker.cancel()
+
+    def emit(self, event_stream: List[DomainEvent]):
+        """ queues the events without waiting for the listeners """
+        routed = self.__route(event_stream)
+        if self.__backpressure == DROP_OLDEST:
+            for queue, item in routed:
+                if queue.full():
+                    queue.get_nowait()
+                    queue.task_done()
+                    self.__dropped_events += 1
+                queue.put_nowait(item)
+            return
+
+        if self.__blocked is None and self.__has_room(routed):
+            for queue, item in routed:
+                queue.put_nowait(item)
+        elif self.__backpressure == ERROR:
+            raise EventBusException("Event queue of listener is full")
+        else:
+            self.__blocked = asyncio.ensure_future(self.__put_after(self.__blocked, routed))
+
+    async def publish(self, event_stream: List[DomainEvent]):
+        """ queues the events and waits for room in full queues when the
+        backpressure policy is block """
+        if self.__backpressure != BLOCK:
+            self.emit(event_stream)
+            return
+
+        routed = self.__route(event_stream)
+        while self.__blocked is not None:
+            await asyncio.shield(self.__blocked)
+        for queue, item in routed:
+            await queue.put(item)
+
+    async def drain(self):
+        """ waits until all queued events are delivered """
+        while self.__blocked is not None:
+            await asyncio.shield(self.__blocked)
+        await asyncio.gather(*(queue.join() for queue in list(self.__queues.values())))
+
+    async def shutdown(self):
+        """ delivers the queued events and stops the listener tasks """
+        self.__closed = True
+        await self.drain()
+
+        workers = list(self.__workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        self.__queues = {}
+        self.__workers = {}
+
+    def __route(self, event_stream: List[DomainEvent]) -> list:
+        """ validates the stream and returns the queue and item for every
+        listener handling an event """
+        if self.__closed:
+            raise EventBusException("Cannot emit on a bus which is shut down")
+
+        if not isinstance(event_stream, list):
+            raise EventBusException("event stream must be a list")
+
+        routed = []
+        for domain_event in event_stream:
+            if not isinstance(domain_event, DomainEvent):
+                raise EventBusException("domain event must be of type DomainEvent")
+
+            for listener in self.__listeners:
+                receiver = listener.get_receiver(domain_event.__class__)
+                if receiver is not None:
+                    routed.append((self.__get_queue(listener), (receiver, domain_event)))
+
+        return routed
+
+    @staticmethod
+    def __has_room(routed: list) -> bool:
+        """ returns if every queue has room for the items routed to it """
+        needed = {}
+        for queue, _ in routed:
+            needed[queue] = needed.get(queue, 0) + 1
+        return all(queue.maxsize - queue.qsize() >= count for queue, count in needed.items())
+
+    async def __put_after(self, blocked, routed: list):
+        """ queues routed items after the items blocked before them """
+        if blocked is not None:
+            await blocked
+        for queue, item in routed:
+            await queue.put(item)
+        if self.__blocked is asyncio.current_task():
+            self.__blocked = None
+
+    def __get_queue(self, listener: EventListener) -> asyncio.Queue:
+        """ returns the queue of a listener, starting its task on first use """
+        queue = self.__queues.get(listener)
+        if queue is None:
+            queue = asyncio.Queue(maxsize=self.__max_queue_size)
+            self.__queues[listener] = queue
+            self.__workers[listener] = asyncio.ensure_future(self.__deliver(listener, queue))
+        return queue
+
+    async def __deliver(self, listener: EventListener, queue: asyncio.Queue):
+        while True:
+            receiver, domain_event = await queue.get()
+            try:
+                result = receiver(domain_event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as exception:
+                if self.__error_handler is not None:
+                    self.__error_handler(listener, domain_event, exception)
+                else:
+                    logger.exception("Listener %r failed on %r", listener, domain_event)
+            finally:
+                queue.task_done()
@@ -0,0 +1,63 @@
+""" Checkpoints of subscriptions reading the event store """
+import abc
+import sqlite3
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS subscription_checkpoint (
+        subscription_name VARCHAR(255) NOT NULL PRIMARY KEY,
+        position INTEGER NOT NULL
+    )
+"""
+
+
+class CheckpointStore(object, metaclass=abc.ABCMeta):
+    """ Abstract class for storing the position a subscription has handled """
+
+    @abc.abstractmethod
+    def load(self, subscription_name: str) -> int:
+        """ returns the stored position or 0 when there is no checkpoint """
+        raise NotImplementedError('Every checkpoint store must have an load method.')
+
+    @abc.abstractmethod
+    def save(self, subscription_name: str, position: int):
+        """ Should be implemented by child class for saving to storage """
+        raise NotImplementedError('Every checkpoint store must have an save method.')
+
+
+class InMemoryCheckpointStore(CheckpointStore):
+    """ An in memory checkpoint store """
+
+    def __init__(self):
+        self.__checkpoints = {}
+
+    def load(self, subscription_name: str) -> int:
+        return self.__checkpoints.get(subscription_name, 0)
+
+    def save(self, subscription_name: str, position: int):
+        self.__checkpoints[subscription_name] = position
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    """ A checkpoint store on top of the sqlite3 module, it can share the
+    database file of a SqliteStore or a read model """
+
+    def __init__(self, database: str):
+        self.__connection = sqlite3.connect(database, check_same_thread=False)
+        self.__connection.execute(CREATE_TABLE)
+
+    def close(self):
+        """ closes the underlying sqlite3 connection """
+        self.__connection.close()
+
+    def load(self, subscription_name: str) -> int:
+        row = self.__connection.execute(
+            "SELECT position FROM subscription_checkpoint WHERE subscription_name = ?",
+            (subscription_name,)).fetchone()
+        return row[0] if row is not None else 0
+
+    def save(self, subscription_name: str, position: int):
+        with self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO subscription_checkpoint "
+                "(subscription_name, position) VALUES (?, ?)",
+                (subscription_name, position))
@@ -27,10 +27,14 @@ class EventBus(object, metaclass=abc.ABCMeta):
 
 
 class BasicBus(EventBus):
-    """ A very simple bus without fancy stuff """
+    """ A very simple bus without fancy stuff, events are only delivered to
+    the listeners handling them. Listeners implementing receive_batch get the
+    whole stream in one call after the events are delivered to the others """
 
     def __init__(self):
         self.__listeners = []
+        self.__routes = {}
+        self.__batch_receivers = None
 
     def get_event_listeners(self) -> List[EventListener]:
         return self.__listeners
@@ -40,6 +44,8 @@ class BasicBus(EventBus):
         if not isinstance(event_listener, EventListener):
             raise EventBusException("Only classes based on EventListener can subscribe")
         self.__listeners.append(event_listener)
+        self.__routes = {}
+        self.__batch_receivers = None
 
     def unsubscribe(self, event_listener: EventListener):
         if not isinstance(event_listener, EventListener):
@@ -48,6 +54,34 @@ class BasicBus(EventBus):
             self.__listeners.remove(event_listener)
         except ValueError:
             raise EventBusException("Cannot unsubscribe non existing listener from list")
+        self.__routes = {}
+        self.__batch_receivers = None
+
+    def get_receivers(self, event_class: type) -> list:
+        """ returns the receivers of the listeners handling an event class one
+        at a time, the routes are cached until the listeners change """
+        try:
+            return self.__routes[event_class]
+        except KeyError:
+            receivers = []
+            for listener in self.__listeners:
+                if listener.get_batch_receiver() is not None:
+                    continue
+                receiver = listener.get_receiver(event_class)
+                if receiver is not None:
+                    receivers.append(receiver)
+
+            self.__routes[event_class] = receivers
+            return receivers
+
+    def get_batch_receivers(self) -> list:
+        """ returns the receive_batch methods of the listeners implementing it """
+        if self.__batch_receivers is None:
+            self.__batch_receivers = [
+                listener.get_batch_receiver() for listener in self.__listeners
+                if listener.get_batch_receiver() is not None
+            ]
+        return self.__batch_receivers
 
     def emit(self, event_stream: List[DomainEvent]):
         if not isinstance(event_stream, list):
@@ -56,5 +90,9 @@ class BasicBus(EventBus):
         for domain_event in event_stream:
             if not isinstance(domain_event, DomainEvent):
                 raise EventBusException("domain event must be of type DomainEvent")
-            for listener in self.__listeners:
-                listener.receive(domain_event)
+            for receiver in self.get_receivers(domain_event.__class__):
+                receiver(domain_event)
+
+        if event_stream:
+            for batch_receiver in self.get_batch_receivers():
+                batch_receiver(event_stream)
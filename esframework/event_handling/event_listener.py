@@ -1,19 +1,138 @@
 """ Event listeners for event busses """
-import re
-from esframework.domain import DomainEvent
+import threading
+import time
+
+from esframework.domain import DomainEvent, collect_event_handlers, find_event_handler
 from esframework.exceptions import EventListenerException
 
 
 class EventListener(object):
-    """ A base class for listening to events """
+    """ A base class for listening to events. Events are handled by methods
+    named apply_<event_name> or methods marked with @handles """
+
+    __event_handlers = {}
+    __dispatch_table = {}
+
+    def __init_subclass__(cls, **kwargs):
+        """ collects the methods marked with @handles once per class """
+        super().__init_subclass__(**kwargs)
+        cls.__event_handlers = collect_event_handlers(cls)
+        cls.__dispatch_table = {}
+
+    @classmethod
+    def get_event_handler(cls, event_class: type):
+        """ returns the function handling an event class or None when the
+        listener is not interested in it """
+        try:
+            return cls.__dispatch_table[event_class]
+        except KeyError:
+            handler = find_event_handler(cls, cls.__event_handlers, event_class, EventListener)
+            cls.__dispatch_table[event_class] = handler
+            return handler
+
+    def get_receiver(self, event_class: type):
+        """ returns the callable a bus should deliver events of an event class
+        to or None. Listeners overriding receive get every event """
+        if type(self).receive is not EventListener.receive:
+            return self.receive
+
+        handler = self.get_event_handler(event_class)
+        if handler is not None:
+            return handler.__get__(self, type(self))
+
+        if self.get_batch_receiver() is not None:
+            return self.__receive_as_batch
+        return None
+
+    def get_batch_receiver(self):
+        """ returns receive_batch when this listener overrides it, busses
+        prefer it and hand such a listener every emitted stream """
+        if type(self).receive_batch is not EventListener.receive_batch:
+            return self.receive_batch
+        return None
 
     def receive(self, domain_event: DomainEvent):
         if not isinstance(domain_event, DomainEvent):
             raise EventListenerException("Incoming event is not a domain event")
 
-        method = "apply{0}".format(
-            re.sub('([A-Z]+)', r'_\1', domain_event.__class__.__name__).lower()
-        )
+        handler = self.get_event_handler(domain_event.__class__)
+        if handler is not None:
+            return handler(self, domain_event)
+
+    def receive_batch(self, event_stream: list):
+        """ receives the events of one emit, by default they are received one
+        at a time """
+        for domain_event in event_stream:
+            self.receive(domain_event)
+
+    def __receive_as_batch(self, domain_event: DomainEvent):
+        self.receive_batch([domain_event])
+
+
+class BatchingEventListener(EventListener):
+    """ Wraps a listener and coalesces the events of several emits into one
+    receive_batch call. A batch is flushed when it holds max_batch_size
+    events or, when max_wait is given, max_wait seconds after its first event
+    arrived. A batch flushed on time is delivered from a timer thread """
+
+    def __init__(self, event_listener: EventListener, max_batch_size: int = 100,
+                 max_wait: float = None):
+        if not isinstance(event_listener, EventListener):
+            raise EventListenerException("Only classes based on EventListener can be batched")
+
+        if max_batch_size < 1:
+            raise EventListenerException("Batch size must be at least 1")
+
+        self.__event_listener = event_listener
+        self.__max_batch_size = max_batch_size
+        self.__max_wait = max_wait
+        self.__lock = threading.RLock()
+        self.__batch = []
+        self.__batch_started = None
+        self.__timer = None
+
+    def get_event_listener(self) -> EventListener:
+        return self.__event_listener
+
+    def get_pending_events(self) -> int:
+        """ returns the number of events waiting for the next flush """
+        with self.__lock:
+            return len(self.__batch)
+
+    def receive_batch(self, event_stream: list):
+        with self.__lock:
+            for domain_event in event_stream:
+                if not isinstance(domain_event, DomainEvent):
+                    raise EventListenerException("Incoming event is not a domain event")
+
+            if not self.__batch:
+                self.__batch_started = time.monotonic()
+                self.__start_timer()
+
+            self.__batch.extend(event_stream)
+            if len(self.__batch) >= self.__max_batch_size or self.__is_expired():
+                self.flush()
+
+    def flush(self):
+        """ hands the buffered events to the wrapped listener """
+        with self.__lock:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+
+            batch, self.__batch = self.__batch, []
+            self.__batch_started = None
+            if batch:
+                self.__event_listener.receive_batch(batch)
+
+    def __is_expired(self) -> bool:
+        return self.__max_wait is not None and \
+            time.monotonic() - self.__batch_started >= self.__max_wait
+
+    def __start_timer(self):
+        if self.__max_wait is None:
+            return
 
-        if hasattr(self.__class__, method) and callable(getattr(self.__class__, method)):
-            self.__getattribute__(method)(domain_event)
+        self.__timer = threading.Timer(self.__max_wait, self.flush)
+        self.__timer.daemon = True
+        self.__timer.start()
@@ -0,0 +1,123 @@
+""" Event bus delivering events to listeners on a pool of threads """
+import logging
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List
+
+from esframework.domain import DomainEvent
+from esframework.event_handling.event_bus import BasicBus
+from esframework.exceptions import EventBusException
+
+logger = logging.getLogger(__name__)
+
+
+def get_correlation_id(domain_event: DomainEvent) -> str:
+    """ returns the correlation id of an event, the stores set it to the
+    aggregate root id """
+    return domain_event.get_correlation_id()
+
+
+class ParallelBus(BasicBus):
+    """ A bus which delivers events on single threaded lanes. Events are
+    routed to a lane by a hash of their partition key, by default their
+    correlation id which the stores set to the aggregate root id, so the
+    events of one aggregate root are delivered in order while the events of
+    other aggregate roots are delivered at the same time. Listeners can
+    therefore be called from several threads and have to be thread safe """
+
+    def __init__(self, number_of_lanes: int = 4, error_handler=None,
+                 partition_key=get_correlation_id):
+        if number_of_lanes < 1:
+            raise EventBusException("A parallel bus needs at least 1 lane")
+
+        super().__init__()
+        self.__lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix='esframework-lane-{}'.format(lane))
+            for lane in range(number_of_lanes)
+        ]
+        self.__error_handler = error_handler
+        self.__partition_key = partition_key
+        self.__lock = threading.Lock()
+        self.__queue_depths = [0] * number_of_lanes
+        self.__pending = set()
+        self.__closed = False
+
+    def get_lane(self, partition_key) -> int:
+        """ returns the lane delivering the events of a partition key """
+        return zlib.crc32(str(partition_key).encode('utf-8')) % len(self.__lanes)
+
+    def get_queue_depths(self) -> List[int]:
+        """ returns the number of events waiting for delivery per lane """
+        with self.__lock:
+            return list(self.__queue_depths)
+
+    def emit(self, event_stream: List[DomainEvent]):
+        """ hands the events to their lanes without waiting for delivery, the
+        stream is validated before any event is handed to a lane """
+        if self.__closed:
+            raise EventBusException("Cannot emit on a bus which is shut down")
+
+        if not isinstance(event_stream, list):
+            raise EventBusException("event stream must be a list")
+
+        batch_receivers = self.get_batch_receivers()
+        deliveries = {}
+        for domain_event in event_stream:
+            if not isinstance(domain_event, DomainEvent):
+                raise EventBusException("domain event must be of type DomainEvent")
+
+            receivers = self.get_receivers(domain_event.__class__)
+            if receivers or batch_receivers:
+                partition_key = self.__partition_key(domain_event)
+                if partition_key is None:
+                    raise EventBusException("domain event has no partition key to pick a lane")
+                lane = self.get_lane(partition_key)
+                deliveries.setdefault(lane, []).append((receivers, domain_event))
+
+        for lane, delivery in deliveries.items():
+            with self.__lock:
+                self.__queue_depths[lane] += len(delivery)
+                future = self.__lanes[lane].submit(self.__deliver, lane, delivery, batch_receivers)
+                self.__pending.add(future)
+            future.add_done_callback(self.__discard)
+
+    def drain(self, timeout: float = None):
+        """ waits until the emitted events are delivered """
+        with self.__lock:
+            pending = list(self.__pending)
+        wait(pending, timeout=timeout)
+
+    def shutdown(self, wait_for_delivery: bool = True):
+        """ stops the lanes, by default after delivering the emitted events """
+        self.__closed = True
+        for lane in self.__lanes:
+            lane.shutdown(wait=wait_for_delivery)
+
+    def __discard(self, future):
+        with self.__lock:
+            self.__pending.discard(future)
+
+    def __deliver(self, lane: int, delivery: list, batch_receivers: list):
+        """ delivers the events of a lane, listeners implementing
+        receive_batch get the events of this lane in one call """
+        for receivers, domain_event in delivery:
+            for receiver in receivers:
+                self.__call(receiver, domain_event)
+
+        if batch_receivers:
+            event_stream = [domain_event for _, domain_event in delivery]
+            for batch_receiver in batch_receivers:
+                self.__call(batch_receiver, event_stream)
+
+        with self.__lock:
+            self.__queue_depths[lane] -= len(delivery)
+
+    def __call(self, receiver, payload):
+        try:
+            receiver(payload)
+        except Exception as exception:
+            if self.__error_handler is not None:
+                self.__error_handler(receiver, payload, exception)
+            else:
+                logger.exception("Receiver %r failed on %r", receiver, payload)
@@ -0,0 +1,112 @@
+""" Subscriptions delivering the events of the store to a listener """
+import threading
+from typing import List
+
+from esframework.domain import DomainEvent
+from esframework.event_handling.checkpoint import CheckpointStore
+from esframework.event_handling.event_bus import EventBus
+from esframework.event_handling.event_listener import EventListener
+from esframework.exceptions import EventListenerException
+from esframework.store import Store
+
+
+class CatchUpSubscription(EventListener):
+    """ Delivers every event of the store to a listener in the order of their
+    position. The subscription first reads the store in pages from its
+    checkpoint and then follows the events emitted on a bus. A live stream
+    which does not continue at the current position, for example because the
+    positions are not known yet, makes the subscription read the store again,
+    so no event is skipped or delivered twice.
+
+    The listener gets every page through receive_batch and the checkpoint is
+    committed after every checkpoint_interval events. After a crash the events
+    since the last checkpoint are delivered again.
+    """
+
+    def __init__(self, name: str, store: Store, event_listener: EventListener,
+                 checkpoint_store: CheckpointStore, page_size: int = 1000,
+                 checkpoint_interval: int = 1000):
+        if not isinstance(event_listener, EventListener):
+            raise EventListenerException("Only classes based on EventListener can subscribe")
+
+        self.__name = name
+        self.__store = store
+        self.__event_listener = event_listener
+        self.__checkpoint_store = checkpoint_store
+        self.__page_size = page_size
+        self.__checkpoint_interval = checkpoint_interval
+        self.__lock = threading.RLock()
+        self.__position = checkpoint_store.load(name)
+        self.__committed_position = self.__position
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_position(self) -> int:
+        """ returns the position of the last delivered event """
+        return self.__position
+
+    def start(self, event_bus: EventBus) -> int:
+        """ subscribes to a bus for live events and catches up with the store,
+        returns the number of events delivered while catching up """
+        event_bus.subscribe(self)
+        return self.catch_up()
+
+    def stop(self, event_bus: EventBus):
+        """ unsubscribes from the bus and commits the checkpoint """
+        event_bus.unsubscribe(self)
+        self.commit()
+
+    def catch_up(self) -> int:
+        """ delivers the events stored after the current position, returns the
+        number of delivered events """
+        with self.__lock:
+            delivered = 0
+            while True:
+                page = self.__store.read_all(self.__position, self.__page_size)
+                if not page:
+                    break
+
+                self.__deliver(page)
+                delivered += len(page)
+                if len(page) < self.__page_size:
+                    break
+
+            self.commit()
+            return delivered
+
+    def reset(self):
+        """ moves the subscription back to the start of the store, the next
+        catch up delivers every event again """
+        with self.__lock:
+            self.__position = 0
+            self.commit()
+
+    def commit(self):
+        """ stores the current position as checkpoint """
+        with self.__lock:
+            if self.__committed_position != self.__position:
+                self.__checkpoint_store.save(self.__name, self.__position)
+                self.__committed_position = self.__position
+
+    def receive_batch(self, event_stream: List[DomainEvent]):
+        """ delivers live events which continue at the current position and
+        reads the store for anything else """
+        with self.__lock:
+            positions = [domain_event.get_position() for domain_event in event_stream]
+            if None not in positions:
+                if all(position <= self.__position for position in positions):
+                    return
+                expected = list(range(self.__position + 1, self.__position + 1 + len(positions)))
+                if positions == expected:
+                    self.__deliver(event_stream)
+                    return
+
+            self.catch_up()
+
+    def __deliver(self, event_stream: List[DomainEvent]):
+        self.__event_listener.receive_batch(event_stream)
+        self.__position = event_stream[-1].get_position()
+
+        if self.__position - self.__committed_position >= self.__checkpoint_interval:
+            self.commit()
@@ -48,3 +48,19 @@ class EventListenerException(Exception):
 
 class SchemaMapperException(Exception):
     """ An exception class when errors occur in a schema mapper class """
+
+
+class SnapshotException(Exception):
+    """ An exception class when errors occur while snapshotting """
+
+
+class UnhandledEventException(Exception):
+    """ An exception class when an aggregate root cannot apply an event """
+
+
+class ProjectionException(Exception):
+    """ An exception class when errors occur while rebuilding projections """
+
+
+class UpcasterException(Exception):
+    """ An exception class when errors occur while upcasting stored events """
@@ -1,26 +1,24 @@
 """ File for Codec simular like tooling """
 import base64
+import json
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Iterable
+
 from Crypto import Random
 from Crypto.Cipher import AES
 from Crypto.Hash import SHA256
 
 from esframework.exceptions import EncryptionCodecError
+from esframework.preprocessing.encryption.keystore import KeyStore
 
 
 class EncryptingCodec(object):
 
     def __init__(self, encryption_key=None, iv=None):
-        if encryption_key is None:
-            raise EncryptionCodecError("Missing encryption key")
-
-        if len(encryption_key) != 32:
-            raise EncryptionCodecError(
-                "Encryption key does not have the correct length of 32 characters.")
-
         self.__encoding = 'utf-8'
-        encryption_key = encryption_key.encode(self.__encoding)
-
-        self.__encryption_key = SHA256.new(encryption_key).digest()
+        self.__encryption_key = derive_key(encryption_key)
         self.__iv = Random.new().read(AES.block_size)
 
         if iv is not None:
@@ -45,3 +43,221 @@ class EncryptingCodec(object):
         if data[-padding:] != bytes([padding]) * padding:  # Python 2.x: chr(padding) * padding
             raise ValueError("Invalid padding...")
         return data[:-padding].decode(self.__encoding)
+
+
+def derive_key(encryption_key) -> bytes:
+    """ validates an encryption key of 32 characters or bytes and derives the
+    AES-256 key from it """
+    if encryption_key is None:
+        raise EncryptionCodecError("Missing encryption key")
+
+    if len(encryption_key) != 32:
+        raise EncryptionCodecError(
+            "Encryption key does not have the correct length of 32 characters.")
+
+    if isinstance(encryption_key, str):
+        encryption_key = encryption_key.encode('utf-8')
+    return SHA256.new(bytes(encryption_key)).digest()
+
+
+class AESGCMCodec(object):
+    """ An authenticated (AEAD) codec using AES in GCM mode, for payloads
+    which must not be tampered with. It is not faster than the EncryptingCodec,
+    a GCM cipher is bound to its nonce so one is set up per message. The key
+    is derived once, every message gets a random nonce and is stored as nonce,
+    cipher text and tag. Bytes, bytearrays and memoryviews are accepted without copying them
+    first and bytes are returned, text is encoded as utf-8. A tampered message
+    or wrong key raises an EncryptionCodecError instead of returning garbage.
+    Associated data, like the aggregate root id, is authenticated but not
+    stored, so it has to be given again to decrypt """
+
+    NONCE_SIZE = 12
+    TAG_SIZE = 16
+
+    def __init__(self, encryption_key=None):
+        self.__encryption_key = derive_key(encryption_key)
+
+    def encrypt(self, plain_data, associated_data: bytes = None, nonce: bytes = None) -> bytes:
+        """ encrypts text or bytes, the nonce should only be given in tests """
+        if nonce is None:
+            nonce = Random.get_random_bytes(self.NONCE_SIZE)
+        return self.__encrypt(plain_data, associated_data, nonce)
+
+    def decrypt(self, encrypted_data, associated_data: bytes = None) -> bytes:
+        """ decrypts and verifies a message created by encrypt """
+        encrypted_data = memoryview(encrypted_data)
+        if len(encrypted_data) < self.NONCE_SIZE + self.TAG_SIZE:
+            raise EncryptionCodecError("Encrypted data is too short")
+
+        cipher = AES.new(self.__encryption_key, AES.MODE_GCM,
+                         nonce=encrypted_data[:self.NONCE_SIZE], mac_len=self.TAG_SIZE)
+        if associated_data is not None:
+            cipher.update(associated_data)
+
+        try:
+            return cipher.decrypt_and_verify(
+                encrypted_data[self.NONCE_SIZE:-self.TAG_SIZE], encrypted_data[-self.TAG_SIZE:])
+        except ValueError:
+            raise EncryptionCodecError("Encrypted data could not be authenticated")
+
+    def __encrypt(self, plain_data, associated_data: bytes, nonce) -> bytes:
+        if isinstance(plain_data, str):
+            plain_data = plain_data.encode('utf-8')
+
+        cipher = AES.new(self.__encryption_key, AES.MODE_GCM, nonce=nonce, mac_len=self.TAG_SIZE)
+        if associated_data is not None:
+            cipher.update(associated_data)
+
+        cipher_text, tag = cipher.encrypt_and_digest(plain_data)
+        return b''.join((nonce, cipher_text, tag))
+
+
+ENCRYPTED_PREFIX = '__encrypted__:'
+
+
+def is_encrypted(value) -> bool:
+    """ returns if a value of a serialized body is an encrypted field """
+    return type(value) is str and value.startswith(ENCRYPTED_PREFIX)
+
+
+class FieldEncryption(object):
+    """ Encrypts the fields of serialized bodies with the key of their
+    aggregate root. Keys come from a key store and the codecs derived from
+    them are kept in a least recently used cache of cache_size aggregate
+    roots, so the key store and the key derivation are not hit for every
+    event. Fields of an aggregate root whose key is deleted read as None.
+
+    The aggregate root id and the field name are authenticated with every
+    field, so a value cannot be copied to another field or aggregate root """
+
+    def __init__(self, key_store: KeyStore, cache_size: int = 1024):
+        if cache_size < 1:
+            raise ValueError('cache_size must be a positive number')
+
+        self.__key_store = key_store
+        self.__cache_size = cache_size
+        self.__codecs = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """ the cached codecs and the lock are not pickled, so a field
+        encryption can be handed to worker processes """
+        state = self.__dict__.copy()
+        state['_FieldEncryption__codecs'] = OrderedDict()
+        del state['_FieldEncryption__lock']
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def get_codec(self, aggregate_root_id: str, create: bool = False) -> AESGCMCodec:
+        """ returns the codec of an aggregate root, None when it has no key
+        unless create is given """
+        with self.__lock:
+            codec = self.__codecs.get(aggregate_root_id)
+            if codec is not None:
+                self.__codecs.move_to_end(aggregate_root_id)
+                return codec
+
+        if create:
+            encryption_key = self.__key_store.create(aggregate_root_id)
+        else:
+            encryption_key = self.__key_store.load(aggregate_root_id)
+        if encryption_key is None:
+            return None
+
+        codec = AESGCMCodec(encryption_key)
+        with self.__lock:
+            self.__codecs[aggregate_root_id] = codec
+            if len(self.__codecs) > self.__cache_size:
+                self.__codecs.popitem(last=False)
+        return codec
+
+    def forget(self, aggregate_root_id: str):
+        """ deletes the key of an aggregate root, other processes using the
+        same key store keep their cached codec until it is evicted. Snapshots
+        are only forgotten when the snapshot store encrypts them with the same
+        field encryption, DefaultRepository.forget also evicts the aggregate
+        root from its cache """
+        with self.__lock:
+            self.__codecs.pop(aggregate_root_id, None)
+        self.__key_store.delete(aggregate_root_id)
+
+    def encrypt(self, event_body: dict, field_names: Iterable[str], aggregate_root_id: str) -> dict:
+        """ returns a copy of a serialized body with the given fields encrypted """
+        field_names = [field_name for field_name in field_names if field_name in event_body]
+        if not field_names:
+            return event_body
+
+        event_body = dict(event_body)
+        for field_name in field_names:
+            event_body[field_name] = self.encrypt_field(event_body[field_name], field_name, aggregate_root_id)
+        return event_body
+
+    def encrypt_field(self, value, field_name: str, aggregate_root_id: str) -> str:
+        """ encrypts a single value which can be serialized to json """
+        codec = self.get_codec(aggregate_root_id, create=True)
+        encrypted_data = codec.encrypt(
+            json.dumps(value), self.__get_associated_data(aggregate_root_id, field_name))
+        return ENCRYPTED_PREFIX + base64.b64encode(encrypted_data).decode('ascii')
+
+    def decrypt(self, event_body: dict, aggregate_root_id: str, lazy: bool = True) -> Mapping:
+        """ returns a body decrypting its encrypted fields when they are read,
+        or a new dict with every field decrypted when lazy is false. Bodies
+        without encrypted fields are returned as is """
+        for value in event_body.values():
+            if is_encrypted(value):
+                encrypted_body = EncryptedBody(event_body, self, aggregate_root_id)
+                return encrypted_body if lazy else dict(encrypted_body)
+        return event_body
+
+    def decrypt_field(self, value: str, field_name: str, aggregate_root_id: str):
+        """ decrypts the value of a single field """
+        codec = self.get_codec(aggregate_root_id)
+        if codec is None:
+            return None
+
+        plain_data = codec.decrypt(
+            base64.b64decode(value[len(ENCRYPTED_PREFIX):]),
+            self.__get_associated_data(aggregate_root_id, field_name))
+        return json.loads(plain_data.decode('utf-8'))
+
+    @staticmethod
+    def __get_associated_data(aggregate_root_id: str, field_name: str) -> bytes:
+        return '{}:{}'.format(aggregate_root_id, field_name).encode('utf-8')
+
+
+class EncryptedBody(Mapping):
+    """ A read only serialized body which decrypts an encrypted field the first
+    time it is read, fields which are never read are never decrypted. A
+    deserialize method usually reads every field, so loading an event
+    decrypts all of its encrypted fields once; only fields the deserialize
+    method skips are left encrypted """
+
+    def __init__(self, event_body: dict, field_encryption: FieldEncryption, aggregate_root_id: str):
+        self.__event_body = event_body
+        self.__field_encryption = field_encryption
+        self.__aggregate_root_id = aggregate_root_id
+        self.__decrypted = {}
+
+    def __getitem__(self, field_name: str):
+        value = self.__event_body[field_name]
+        if not is_encrypted(value):
+            return value
+
+        try:
+            return self.__decrypted[field_name]
+        except KeyError:
+            value = self.__field_encryption.decrypt_field(value, field_name, self.__aggregate_root_id)
+            self.__decrypted[field_name] = value
+            return value
+
+    def __iter__(self):
+        return iter(self.__event_body)
+
+    def __len__(self) -> int:
+        return len(self.__event_body)
+
+    def __repr__(self):
+        return "<EncryptedBody({})>".format(list(self.__event_body))
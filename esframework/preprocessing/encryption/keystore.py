@@ -0,0 +1,92 @@
+""" Key stores holding an encryption key per aggregate root """
+import abc
+import sqlite3
+
+from Crypto import Random
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS aggregate_root_key (
+        aggregate_root_id VARCHAR(36) NOT NULL PRIMARY KEY,
+        encryption_key BLOB NOT NULL
+    )
+"""
+
+KEY_SIZE = 32
+
+
+class KeyStore(object, metaclass=abc.ABCMeta):
+    """ Abstract class for storing the encryption keys of aggregate roots.
+    Deleting the key of an aggregate root makes its encrypted fields
+    unreadable, which forgets the data without rewriting the event store """
+
+    @abc.abstractmethod
+    def load(self, aggregate_root_id: str) -> bytes:
+        """ returns the key of an aggregate root or None when it has no key """
+        raise NotImplementedError('Every key store must have an load method.')
+
+    @abc.abstractmethod
+    def create(self, aggregate_root_id: str) -> bytes:
+        """ returns the key of an aggregate root, creating it when it has none """
+        raise NotImplementedError('Every key store must have an create method.')
+
+    @abc.abstractmethod
+    def delete(self, aggregate_root_id: str):
+        """ deletes the key of an aggregate root """
+        raise NotImplementedError('Every key store must have an delete method.')
+
+
+class InMemoryKeyStore(KeyStore):
+    """ An in memory key store """
+
+    def __init__(self):
+        self.__keys = {}
+
+    def load(self, aggregate_root_id: str) -> bytes:
+        return self.__keys.get(aggregate_root_id)
+
+    def create(self, aggregate_root_id: str) -> bytes:
+        return self.__keys.setdefault(aggregate_root_id, Random.get_random_bytes(KEY_SIZE))
+
+    def delete(self, aggregate_root_id: str):
+        self.__keys.pop(aggregate_root_id, None)
+
+
+class SqliteKeyStore(KeyStore):
+    """ A key store on top of the sqlite3 module, the keys should be kept in
+    another database than the events they protect """
+
+    def __init__(self, database: str):
+        self.__database = database
+        self.__connection = sqlite3.connect(database, check_same_thread=False)
+        self.__connection.execute(CREATE_TABLE)
+
+    def __getstate__(self) -> dict:
+        """ only the database is pickled, the copy opens its own connection """
+        return {'database': self.__database}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state['database'])
+
+    def close(self):
+        """ closes the underlying sqlite3 connection """
+        self.__connection.close()
+
+    def load(self, aggregate_root_id: str) -> bytes:
+        row = self.__connection.execute(
+            "SELECT encryption_key FROM aggregate_root_key WHERE aggregate_root_id = ?",
+            (aggregate_root_id,)).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def create(self, aggregate_root_id: str) -> bytes:
+        with self.__connection:
+            self.__connection.execute(
+                "INSERT OR IGNORE INTO aggregate_root_key "
+                "(aggregate_root_id, encryption_key) VALUES (?, ?)",
+                (aggregate_root_id, Random.get_random_bytes(KEY_SIZE)))
+        return self.load(aggregate_root_id)
+
+    def delete(self, aggregate_root_id: str):
+        with self.__connection:
+            self.__connection.execute(
+                "DELETE FROM aggregate_root_key WHERE aggregate_root_id = ?",
+                (aggregate_root_id,))
@@ -1,4 +1,9 @@
 import abc
+import functools
+import hashlib
+import json
+from collections.abc import Mapping
+
 from esframework.exceptions import SchemaMapperException
 
 
@@ -10,31 +15,98 @@ class SchemaMapper(object, metaclass=abc.ABCMeta):
         raise NotImplementedError("Schema processors must implement map method")
 
 
-class WeakSchemaMapper(SchemaMapper):
+def is_mapping(value) -> bool:
+    """ returns if a value is a mapping, checking for a dict first because the
+    abstract base class check is slow """
+    return type(value) is dict or isinstance(value, Mapping)
 
-    def map(self, existing_data: dict, current_event_mapping: dict, cleaning: bool = True) -> dict:
-        """ mapping serialized data to the properties of the event """
-        new_data = existing_data.copy()
-        properties = current_event_mapping
 
-        if cleaning:
-            properties = self.fetch_event_properties_from_event(current_event_mapping)
+class MappingPlan(object):
+    """ The compiled mapping of a schema: the keys to keep, the defaults of
+    missing keys and the plans of nested dictionaries """
 
-        for property_name, value in existing_data.items():
-            if property_name not in properties.keys():
-                del(new_data[property_name])
-                continue
+    __slots__ = ('keys', 'defaults', 'nested')
+
+    def __init__(self, properties: Mapping):
+        self.keys = frozenset(properties.keys())
+        self.defaults = tuple(properties.items())
+        self.nested = tuple(
+            (property_name, MappingPlan(value))
+            for property_name, value in properties.items()
+            if isinstance(value, dict)
+        )
+
+    def matches(self, existing_data: Mapping) -> bool:
+        """ returns if the data already has exactly the keys of this schema """
+        if existing_data.keys() != self.keys:
+            return False
 
-        for property_name, value in properties.items():
-            if property_name not in existing_data.keys():
+        for property_name, plan in self.nested:
+            value = existing_data[property_name]
+            if not is_mapping(value) or not plan.matches(value):
+                return False
+
+        return True
+
+    def apply(self, existing_data: Mapping) -> Mapping:
+        """ maps the data to this schema, data which already matches the
+        schema is returned as is """
+        if self.matches(existing_data):
+            return existing_data
+
+        keys = self.keys
+        new_data = {
+            property_name: value
+            for property_name, value in existing_data.items()
+            if property_name in keys
+        }
+
+        for property_name, value in self.defaults:
+            if property_name not in new_data:
                 new_data[property_name] = value
-                continue
 
-            if isinstance(value, dict) and property_name in existing_data:
-                new_data[property_name] = self.map(existing_data[property_name], value, cleaning=False)
+        for property_name, plan in self.nested:
+            if property_name in existing_data and is_mapping(new_data[property_name]):
+                new_data[property_name] = plan.apply(new_data[property_name])
 
         return new_data
 
+
+class WeakSchemaMapper(SchemaMapper):
+    """ Maps data to the private properties of an event class, unknown keys are
+    dropped and missing keys get the default of the class. The mapping plan of
+    an event class is compiled once and cached by the class, a dictionary is
+    compiled on every call because its defaults can change """
+
+    def __init__(self):
+        self.__plans = {}
+
+    def map(self, existing_data: Mapping, current_event_mapping, cleaning: bool = True) -> Mapping:
+        """ mapping serialized data to the properties of the event, the event
+        mapping is the dictionary of the event class or the class itself """
+        return self.get_plan(current_event_mapping, cleaning).apply(existing_data)
+
+    def get_plan(self, current_event_mapping, cleaning: bool = True) -> MappingPlan:
+        """ returns the cached mapping plan of an event class or compiles the
+        plan of a dictionary """
+        if not isinstance(current_event_mapping, type):
+            return self.compile_plan(current_event_mapping, cleaning)
+
+        key = (current_event_mapping, cleaning)
+        try:
+            return self.__plans[key]
+        except KeyError:
+            plan = self.compile_plan(current_event_mapping.__dict__, cleaning)
+            self.__plans[key] = plan
+            return plan
+
+    def compile_plan(self, current_event_mapping: Mapping, cleaning: bool = True) -> MappingPlan:
+        """ compiles the mapping plan of an event class dictionary """
+        properties = current_event_mapping
+        if cleaning:
+            properties = self.fetch_event_properties_from_event(current_event_mapping)
+        return MappingPlan(properties)
+
     def fetch_event_properties_from_event(self, current_event_mapping: dict) -> dict:
         """ returns a dictionary with all the class properties of the event """
         event_properties = dict()
@@ -58,24 +130,79 @@ class WeakSchemaMapper(SchemaMapper):
         return property_name[property_name.find('__')+2:]
 
 
+class PassthroughSchemaMapper(SchemaMapper):
+    """ Returns the data as is, used for data which is known to match the
+    current schema """
+
+    def map(self, existing_data: Mapping, current_event_mapping=None, cleaning: bool = True) -> Mapping:
+        return existing_data
+
+
+def describe_schema(properties: Mapping) -> list:
+    """ returns the sorted property names of a schema with the names of
+    nested dictionaries """
+    return [
+        [property_name, describe_schema(value) if isinstance(value, dict) else None]
+        for property_name, value in sorted(properties.items())
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema_fingerprint(event_class: type) -> str:
+    """ returns a fingerprint of the schema of an event class: its schema
+    version and the names of its private properties including nested keys """
+    properties = WeakSchemaMapper().fetch_event_properties_from_event(event_class.__dict__)
+    schema = [getattr(event_class, 'schema_version', 1), describe_schema(properties)]
+    return hashlib.sha1(json.dumps(schema).encode('utf-8')).hexdigest()
+
+
+def is_schema_versioned(event_class: type) -> bool:
+    """ returns if the deserialize method of an event class is decorated with
+    event_versioning and accepts a schema_mapper """
+    return getattr(event_class.deserialize, 'schema_versioned', False)
+
+
 class SchemaMapperFactory(object):
+    """ A registry of shared mapper instances per versioning type, mappers are
+    reused for every event so they must not keep state per call """
 
-    @staticmethod
-    def factory(version_type: str) -> WeakSchemaMapper:
-        """ builds a schema wapper and will return it """
-        if version_type == 'weak-schema': return WeakSchemaMapper()
-        raise SchemaMapperException('Versioning type does not exist')
+    __mappers = {'weak-schema': WeakSchemaMapper(), 'passthrough': PassthroughSchemaMapper()}
+
+    @classmethod
+    def register(cls, version_type: str, mapper: SchemaMapper):
+        """ registers the mapper of a versioning type """
+        if not isinstance(mapper, SchemaMapper):
+            raise SchemaMapperException('Mapper must be based on SchemaMapper')
+        cls.__mappers[version_type] = mapper
+
+    @classmethod
+    def unregister(cls, version_type: str):
+        """ removes the mapper of a versioning type """
+        cls.__mappers.pop(version_type, None)
+
+    @classmethod
+    def factory(cls, version_type: str) -> SchemaMapper:
+        """ returns the shared mapper of a versioning type """
+        try:
+            return cls.__mappers[version_type]
+        except KeyError:
+            raise SchemaMapperException('Versioning type does not exist')
 
 
 def event_versioning(versioning_type: str):
-    """ this function is here to allow schema mapping with a simple decorator """
-    """ this should make the actual implementation for developers a lot easier """
+    """ decorates the deserialize method of an event to map the stored data
+    with the mapper of a versioning type. The mapper is resolved once, so the
+    versioning type must be registered before the event class is defined. A
+    store can pass another schema_mapper, for example to skip mapping data
+    which matches the current schema """
+    mapper = SchemaMapperFactory.factory(versioning_type)
+
     def event_mapping(deserialize):
-        def wrapper(*args):
-            mapper = (SchemaMapperFactory.factory(versioning_type),)
-            newargs = args+mapper
-            return deserialize(*newargs)
+        @functools.wraps(deserialize)
+        def wrapper(*args, schema_mapper: SchemaMapper = None):
+            return deserialize(*args, schema_mapper or mapper)
 
+        wrapper.schema_versioned = True
         return wrapper
 
     return event_mapping
@@ -0,0 +1,91 @@
+""" Upcasting of stored event bodies to the current schema version """
+from esframework.exceptions import UpcasterException
+
+
+def compose(upcasters: list):
+    """ composes upcasters into a single function """
+    if len(upcasters) == 1:
+        return upcasters[0]
+
+    def upcast(event_data: dict) -> dict:
+        for upcaster in upcasters:
+            event_data = upcaster(event_data)
+        return event_data
+
+    return upcast
+
+
+class UpcasterChain(object):
+    """ Upcasters keyed by the stored event name and the schema version they
+    upcast from. An upcaster is a function taking the stored body of version
+    n and returning the body of version n + 1, it can rename, split and merge
+    fields. Bodies are upcasted to the schema_version of the current event
+    class, the upcasters in between are composed once and events stored at
+    the current version cost a single dict lookup """
+
+    def __init__(self):
+        self.__upcasters = {}
+        self.__composed = {}
+
+    def __getstate__(self) -> dict:
+        """ the composed upcasters are closures, they are composed again after
+        unpickling so a chain of module level functions can be pickled """
+        state = self.__dict__.copy()
+        state['_UpcasterChain__composed'] = {}
+        return state
+
+    def register(self, event_name: str, from_version: int, upcaster=None):
+        """ registers an upcaster from a schema version, without an upcaster it
+        returns a decorator """
+        if upcaster is None:
+            return lambda function: self.register(event_name, from_version, function)
+
+        if (event_name, from_version) in self.__upcasters:
+            raise UpcasterException(
+                "{} already has an upcaster from version {}".format(event_name, from_version))
+
+        self.__upcasters[(event_name, from_version)] = upcaster
+        self.__composed = {}
+        return upcaster
+
+    def get_upcaster(self, event_name: str, schema_version: int, target_version: int):
+        """ returns the composed upcaster from a schema version to the target
+        version, the schema_version of the event class, or None when the body
+        is already at the target version. Raises an UpcasterException when
+        the upcasters do not reach the target version """
+        key = (event_name, schema_version, target_version)
+        try:
+            return self.__composed[key]
+        except KeyError:
+            upcaster = self.__compose(event_name, schema_version, target_version)
+            self.__composed[key] = upcaster
+            return upcaster
+
+    def upcast(self, event_name: str, schema_version: int, event_data: dict,
+               target_version: int) -> dict:
+        """ upcasts a stored body to the target schema version """
+        upcaster = self.get_upcaster(event_name, schema_version, target_version)
+        if upcaster is None:
+            return event_data
+        return upcaster(event_data)
+
+    def __compose(self, event_name: str, schema_version: int, target_version: int):
+        if schema_version > target_version:
+            raise UpcasterException(
+                "{} is stored at version {} which is newer than version {}".format(
+                    event_name, schema_version, target_version))
+
+        upcasters = []
+        for version in range(schema_version, target_version):
+            upcaster = self.__upcasters.get((event_name, version))
+            if upcaster is None:
+                raise UpcasterException(
+                    "{} has no upcaster from version {}".format(event_name, version))
+            upcasters.append(upcaster)
+
+        if not upcasters:
+            return None
+        return compose(upcasters)
+
+
+upcaster_chain = UpcasterChain()
@@ -0,0 +1,151 @@
+""" Projections which can be rebuilt in parallel """
+import abc
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from esframework.event_handling.event_listener import EventListener
+from esframework.exceptions import ProjectionException
+
+
+def get_partition(aggregate_root_id, number_of_partitions: int) -> int:
+    """ returns the partition of an aggregate root by a hash of its id """
+    return zlib.crc32(str(aggregate_root_id).encode('utf-8')) % number_of_partitions
+
+
+class PartitionedProjection(EventListener, metaclass=abc.ABCMeta):
+    """ A projection whose state can be built per partition of aggregate
+    roots and merged afterwards. Every partition gets a new instance, the
+    events of an aggregate root are received in version order but there is no
+    order between aggregate roots """
+
+    @abc.abstractmethod
+    def get_state(self):
+        """ returns the picklable state built by this partition """
+        raise NotImplementedError('Every partitioned projection must have an get_state method.')
+
+    @classmethod
+    @abc.abstractmethod
+    def merge(cls, states: list):
+        """ merges the states of all partitions into the rebuilt projection """
+        raise NotImplementedError('Every partitioned projection must have an merge method.')
+
+
+class PartitionReport(object):
+    """ The throughput of one partition of a rebuild """
+
+    def __init__(self, partition: int, aggregate_roots: int, events: int,
+                 duration: float, worker: int):
+        self.__partition = partition
+        self.__aggregate_roots = aggregate_roots
+        self.__events = events
+        self.__duration = duration
+        self.__worker = worker
+
+    def get_partition(self) -> int:
+        return self.__partition
+
+    def get_aggregate_roots(self) -> int:
+        return self.__aggregate_roots
+
+    def get_events(self) -> int:
+        return self.__events
+
+    def get_duration(self) -> float:
+        return self.__duration
+
+    def get_worker(self) -> int:
+        """ returns the process id of the worker """
+        return self.__worker
+
+    def get_events_per_second(self) -> float:
+        if not self.__duration:
+            return 0.0
+        return self.__events / self.__duration
+
+    def __repr__(self):
+        return "partition {}: {} aggregate roots, {} events in {:.3f}s ({:.0f} events/s)".format(
+            self.__partition, self.__aggregate_roots, self.__events,
+            self.__duration, self.get_events_per_second())
+
+
+def rebuild_partition(store_factory, projection_class: type, partition: int,
+                      aggregate_root_ids: List[str], batch_size: int) -> tuple:
+    """ replays the streams of a partition into a new projection, this runs in
+    a worker process so every argument has to be picklable """
+    started = time.perf_counter()
+    store = store_factory()
+    projection = projection_class()
+    events = 0
+
+    try:
+        for start in range(0, len(aggregate_root_ids), batch_size):
+            batch = aggregate_root_ids[start:start + batch_size]
+            streams = store.load_many(batch)
+            for aggregate_root_id in batch:
+                event_stream = streams.get(aggregate_root_id, [])
+                if event_stream:
+                    projection.receive_batch(event_stream)
+                    events += len(event_stream)
+    finally:
+        store.close()
+
+    report = PartitionReport(partition, len(aggregate_root_ids), events,
+                             time.perf_counter() - started, os.getpid())
+    return projection.get_state(), report
+
+
+class ParallelRebuild(object):
+    """ Rebuilds a partitioned projection from the store in worker processes.
+    The aggregate roots are partitioned by a hash of their id, every worker
+    replays one partition with its own store from store_factory, a picklable
+    callable like functools.partial(SqliteStore, path), and the states of the
+    partitions are merged by the projection class. Every store is closed when
+    its partition is replayed. Stores which do not support multiple
+    processes, like the FileStore which recovers and rewrites its files when
+    it is opened, cannot be used """
+
+    def __init__(self, store_factory, projection_class: type, number_of_workers: int = None,
+                 batch_size: int = 500):
+        if not isinstance(projection_class, type) or \
+                not issubclass(projection_class, PartitionedProjection):
+            raise ProjectionException("Projection class must be based on PartitionedProjection")
+
+        self.__store_factory = store_factory
+        self.__projection_class = projection_class
+        self.__number_of_workers = number_of_workers or os.cpu_count() or 1
+        self.__batch_size = batch_size
+        self.__reports = []
+
+    def get_reports(self) -> List[PartitionReport]:
+        """ returns the reports of the partitions of the last run """
+        return self.__reports
+
+    def run(self):
+        """ rebuilds the projection and returns the merged state """
+        store = self.__store_factory()
+        try:
+            if not store.supports_multiple_processes:
+                raise ProjectionException("A {} cannot be shared by worker processes".format(
+                    store.__class__.__name__))
+            aggregate_root_ids = store.get_aggregate_root_ids()
+        finally:
+            store.close()
+
+        partitions = [[] for _ in range(self.__number_of_workers)]
+        for aggregate_root_id in aggregate_root_ids:
+            partitions[get_partition(aggregate_root_id, self.__number_of_workers)].append(
+                aggregate_root_id)
+
+        with ProcessPoolExecutor(max_workers=self.__number_of_workers) as executor:
+            futures = [
+                executor.submit(rebuild_partition, self.__store_factory, self.__projection_class,
+                                partition, aggregate_root_ids, self.__batch_size)
+                for partition, aggregate_root_ids in enumerate(partitions)
+            ]
+            results = [future.result() for future in futures]
+
+        self.__reports = [report for _, report in results]
+        return self.__projection_class.merge([state for state, _ in results])
@@ -0,0 +1,46 @@
+""" Registry for resolving stored class names """
+from esframework import import_path
+
+
+class EventRegistry(object):
+    """ Maps the names stored in the event store to classes. Names are
+    resolved once with import_path and cached afterwards, so resolving a name
+    on the hot path is a single dict lookup. Aggregate root class names can be
+    resolved with the same registry """
+
+    def __init__(self):
+        self.__classes = {}
+
+    def register(self, event_class: type, name: str = None) -> type:
+        """ registers a class under its fully qualified name or under the given
+        name, returns the class so it can be used as a decorator """
+        if name is None:
+            name = event_class.__module__ + "." + event_class.__qualname__
+
+        self.__classes[name] = event_class
+        return event_class
+
+    def alias(self, name: str, event_class):
+        """ lets an old name resolve to a moved or renamed class, the class
+        can be given as a class or a dotted path """
+        if isinstance(event_class, str):
+            event_class = self.resolve(event_class)
+
+        self.__classes[name] = event_class
+
+    def resolve(self, name: str) -> type:
+        """ returns the class for a name, unknown names are imported and
+        cached """
+        try:
+            return self.__classes[name]
+        except KeyError:
+            event_class = import_path(name)
+            self.__classes[name] = event_class
+            return event_class
+
+    def is_registered(self, name: str) -> bool:
+        """ returns if a name is already known by the registry """
+        return name in self.__classes
+
+
+event_registry = EventRegistry()
@@ -1,12 +1,19 @@
 """ Imports """
 import abc
+import logging
+import time
+from typing import Dict, List
 
-from esframework import import_path
 from esframework.domain import AggregateRoot
 from esframework.event_handling.event_bus import EventBus
 from esframework.exceptions import AggregateRootIdNotFoundError, AggregateRootOutOfSyncError, RepositoryException
+from esframework.registry import EventRegistry, event_registry
+from esframework.repository.cache import AggregateCache
+from esframework.snapshotting import SnapshotPolicy, SnapshotStore
 from esframework.store import Store
 
+logger = logging.getLogger(__name__)
+
 
 class Repository(object, metaclass=abc.ABCMeta):
     """
@@ -16,17 +23,42 @@ class Repository(object, metaclass=abc.ABCMeta):
     _aggregate_root_class = None
     _store = None
     _eventbus = None
-
-    def __init__(self, aggregate_root_class: str, store: Store, eventbus: EventBus):
+    _snapshot_store = None
+    _snapshot_policy = None
+    _registry = None
+    _aggregate_cache = None
+
+    def __init__(self, aggregate_root_class: str, store: Store, eventbus: EventBus,
+                 snapshot_store: SnapshotStore = None, snapshot_policy: SnapshotPolicy = None,
+                 registry: EventRegistry = None, aggregate_cache: AggregateCache = None):
         if not isinstance(store, Store):
             raise RepositoryException("Store parameter is not type Store!")
 
         if not isinstance(eventbus, EventBus):
             raise RepositoryException("Eventbus parameter is not of type EventBus!")
 
+        if snapshot_store is not None and not isinstance(snapshot_store, SnapshotStore):
+            raise RepositoryException("Snapshot store parameter is not of type SnapshotStore!")
+
+        if snapshot_policy is not None and not isinstance(snapshot_policy, SnapshotPolicy):
+            raise RepositoryException("Snapshot policy parameter is not of type SnapshotPolicy!")
+
+        if snapshot_policy is not None and snapshot_store is None:
+            raise RepositoryException("Snapshot policy requires a snapshot store!")
+
+        if registry is not None and not isinstance(registry, EventRegistry):
+            raise RepositoryException("Registry parameter is not of type EventRegistry!")
+
+        if aggregate_cache is not None and not isinstance(aggregate_cache, AggregateCache):
+            raise RepositoryException("Aggregate cache parameter is not of type AggregateCache!")
+
         self._aggregate_root_class = aggregate_root_class
         self._store = store
         self._eventbus = eventbus
+        self._snapshot_store = snapshot_store
+        self._snapshot_policy = snapshot_policy
+        self._registry = registry if registry is not None else event_registry
+        self._aggregate_cache = aggregate_cache
 
     @abc.abstractmethod
     def load(self, aggregate_root_id: str):
@@ -43,41 +75,126 @@ class DefaultRepository(Repository):
     """ Default repository """
 
     def load(self, aggregate_root_id: str) -> AggregateRoot:
+        """ Returns the cached aggregate root brought up to date with the store
+        or rebuilds it when it is not cached """
+        if self._aggregate_cache is None:
+            return self.rebuild(aggregate_root_id)
+
+        aggregate_root = self._aggregate_cache.get(aggregate_root_id)
+        if aggregate_root is not None:
+            """ a cached aggregate root with uncommitted events was changed
+            without being saved, so it cannot be trusted anymore """
+            if not aggregate_root.get_uncommitted_events():
+                try:
+                    return self.refresh(aggregate_root)
+                except AggregateRootOutOfSyncError:
+                    pass
+            self._aggregate_cache.remove(aggregate_root_id)
+
+        aggregate_root = self.rebuild(aggregate_root_id)
+        self._aggregate_cache.put(aggregate_root_id, aggregate_root)
+        return aggregate_root
+
+    def rebuild(self, aggregate_root_id: str) -> AggregateRoot:
         """ Try to find the eventstream from the store and initialize the start
-        state of the aggregate root
+        state of the aggregate root. When a snapshot exists only the events
+        after the snapshot are replayed. A snapshot taken according to the
+        snapshot policy which cannot be saved is logged, the rebuilt aggregate
+        root is returned anyway
         """
 
-        aggregate_root_class = import_path(self._aggregate_root_class)
+        aggregate_root_class = self._registry.resolve(self._aggregate_root_class)
         aggregate_root = aggregate_root_class()
-        aggregate_root.initialize_state(self._store.load(aggregate_root_id))
+
+        snapshot = None
+        if self._snapshot_store is not None:
+            snapshot = self._snapshot_store.load(aggregate_root_id)
+
+        started = time.perf_counter()
+        if snapshot is None:
+            event_stream = self._store.stream(aggregate_root_id)
+        else:
+            aggregate_root.restore_snapshot(snapshot)
+            event_stream = self._store.stream(
+                aggregate_root_id, snapshot.get_aggregate_root_version() + 1)
+
+        aggregate_root.initialize_state(event_stream)
+
+        if self._snapshot_policy is not None:
+            replayed_events = aggregate_root.get_aggregate_root_version()
+            if snapshot is not None:
+                replayed_events -= snapshot.get_aggregate_root_version()
+
+            if self._snapshot_policy.should_snapshot(
+                    aggregate_root, replayed_events, time.perf_counter() - started):
+                try:
+                    self._snapshot_store.save(aggregate_root.create_snapshot())
+                except Exception:
+                    logger.exception("Snapshot of aggregate root %s failed", aggregate_root_id)
+
+        return aggregate_root
+
+    def load_many(self, aggregate_root_ids: List[str]) -> Dict[str, AggregateRoot]:
+        """ Loads multiple aggregate roots with a single call to the store,
+        the streams are replayed from the start without using snapshots
+        """
+        aggregate_root_class = self._registry.resolve(self._aggregate_root_class)
+        event_streams = self._store.load_many(aggregate_root_ids)
+
+        aggregate_roots = {}  # aggregate_roots: Dict[str, AggregateRoot]
+        for aggregate_root_id in aggregate_root_ids:
+            if aggregate_root_id not in event_streams:
+                raise AggregateRootIdNotFoundError(
+                    'Aggregate root id does not exist: {}'.format(
+                        aggregate_root_id),
+                )
+
+            aggregate_root = aggregate_root_class()
+            aggregate_root.initialize_state(event_streams[aggregate_root_id])
+            aggregate_roots[aggregate_root_id] = aggregate_root
+
+        return aggregate_roots
+
+    def refresh(self, aggregate_root: AggregateRoot) -> AggregateRoot:
+        """ Applies the events stored after the version of an already loaded
+        aggregate root, without replaying the complete stream """
+        aggregate_root.catch_up(self._store.load_from(
+            aggregate_root.get_aggregate_root_id(),
+            aggregate_root.get_aggregate_root_version()))
         return aggregate_root
 
+    def forget(self, aggregate_root_id: str):
+        """ Deletes the encryption key of an aggregate root so its encrypted
+        fields, and snapshots encrypted with the same field encryption, can
+        not be read anymore, and evicts it from the aggregate cache """
+        field_encryption = self._store.get_field_encryption()
+        if field_encryption is None:
+            raise RepositoryException("Store has no field encryption to forget an aggregate root")
+
+        field_encryption.forget(aggregate_root_id)
+        if self._aggregate_cache is not None:
+            self._aggregate_cache.remove(aggregate_root_id)
+
     def save(self, aggregate_root: AggregateRoot):
-        """ Get the uncommitted and append it to the eventstream in the store
+        """ Get the uncommitted and append it to the eventstream in the store,
+        the store rejects the events when the aggregate root is outdated
         """
 
+        aggregate_root_id = aggregate_root.get_aggregate_root_id()
         uncommitted_events = aggregate_root.get_uncommitted_events()
 
         try:
-            aggr_from_store = self.load(aggregate_root.get_aggregate_root_id())
-            if not self.is_outdated(
-                    aggr_from_store.get_aggregate_root_version(),
-                    uncommitted_events[0].get_aggregate_root_version()):
-                self._store.save(uncommitted_events,
-                                 aggregate_root.get_aggregate_root_id())
-                self._eventbus.emit(uncommitted_events)
-            else:
-                raise AggregateRootOutOfSyncError(
-                    "Aggregate root in store is newer then current aggregate")
-        except AggregateRootIdNotFoundError:
-            """ no risk of conflicts here """
             self._store.save(uncommitted_events,
-                             aggregate_root.get_aggregate_root_id())
-            self._eventbus.emit(uncommitted_events)
-        finally:
+                             aggregate_root_id,
+                             aggregate_root.get_aggregate_root_version())
+        except Exception:
             aggregate_root.clear_uncommitted_events()
+            if self._aggregate_cache is not None:
+                self._aggregate_cache.remove(aggregate_root_id)
+            raise
+
+        aggregate_root.mark_events_committed()
+        if self._aggregate_cache is not None:
+            self._aggregate_cache.put(aggregate_root_id, aggregate_root)
 
-    def is_outdated(self, version_from_store: int, current_version: int) -> bool:
-        """ if the first uncommitted event -1 is not equal to the version in the
-         store then the aggregate is out of sync """
-        return (current_version - 1) != version_from_store
+        self._eventbus.emit(uncommitted_events)
@@ -0,0 +1,98 @@
+""" Caching of loaded aggregate roots """
+import pickle
+import sys
+from collections import OrderedDict
+
+from esframework.domain import AggregateRoot
+from esframework.exceptions import RepositoryException
+
+
+def estimate_size(aggregate_root: AggregateRoot) -> int:
+    """ estimates the number of bytes an aggregate root holds by pickling its
+    snapshot state """
+    try:
+        return len(pickle.dumps(aggregate_root.get_snapshot_state(), pickle.HIGHEST_PROTOCOL))
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return sys.getsizeof(aggregate_root.__dict__)
+
+
+class AggregateCache(object):
+    """ A least recently used cache of aggregate roots bounded by the number
+    of aggregate roots and/or their estimated size in bytes. Sizes are only
+    estimated when max_bytes is set, and an aggregate root which is put again
+    at the same version keeps its previous estimate.
+
+    The cache hands out the cached instance itself, callers which change it
+    without saving, or whose save fails, must remove it from the cache; the
+    DefaultRepository does so """
+
+    def __init__(self, max_items: int = None, max_bytes: int = None, size_estimator=estimate_size):
+        if max_items is None and max_bytes is None:
+            raise RepositoryException("Aggregate cache needs max_items or max_bytes")
+
+        self.__max_items = max_items
+        self.__max_bytes = max_bytes
+        self.__size_estimator = size_estimator
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def get(self, aggregate_root_id: str):
+        """ returns the cached aggregate root or None """
+        entry = self.__entries.get(aggregate_root_id)
+        if entry is None:
+            self.__misses += 1
+            return None
+
+        self.__hits += 1
+        self.__entries.move_to_end(aggregate_root_id)
+        return entry[0]
+
+    def put(self, aggregate_root_id: str, aggregate_root: AggregateRoot):
+        """ adds or updates an aggregate root and evicts the least recently
+        used ones when the cache is full """
+        entry = self.__entries.get(aggregate_root_id)
+        self.remove(aggregate_root_id)
+
+        version = aggregate_root.get_aggregate_root_version()
+        if self.__max_bytes is None:
+            size = 0
+        elif entry is not None and entry[0] is aggregate_root and entry[2] == version:
+            size = entry[1]
+        else:
+            size = self.__size_estimator(aggregate_root)
+        self.__entries[aggregate_root_id] = (aggregate_root, size, version)
+        self.__bytes += size
+
+        while len(self.__entries) > 1 and self.__is_full():
+            _, (_, evicted_size, _) = self.__entries.popitem(last=False)
+            self.__bytes -= evicted_size
+            self.__evictions += 1
+
+    def remove(self, aggregate_root_id: str):
+        """ removes an aggregate root from the cache """
+        entry = self.__entries.pop(aggregate_root_id, None)
+        if entry is not None:
+            self.__bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get_size_in_bytes(self) -> int:
+        """ returns the estimated size of all cached aggregate roots """
+        return self.__bytes
+
+    def get_hits(self) -> int:
+        return self.__hits
+
+    def get_misses(self) -> int:
+        return self.__misses
+
+    def get_evictions(self) -> int:
+        return self.__evictions
+
+    def __is_full(self) -> bool:
+        return (self.__max_items is not None and len(self.__entries) > self.__max_items) or \
+               (self.__max_bytes is not None and self.__bytes > self.__max_bytes)
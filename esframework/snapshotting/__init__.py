@@ -0,0 +1,137 @@
+""" Snapshotting of aggregate roots """
+import abc
+import datetime
+
+from esframework.data_sources.sqlalchemy.models import SqlSnapshotRecord
+from esframework.domain import AggregateRoot, Snapshot
+from esframework.exceptions import SnapshotException
+from esframework.preprocessing.encryption import FieldEncryption, is_encrypted
+
+
+class SnapshotStore(object, metaclass=abc.ABCMeta):
+    """ Abstract class for storing snapshots of aggregate roots """
+
+    @abc.abstractmethod
+    def load(self, aggregate_root_id: str):
+        """ returns the latest snapshot or None when there is no snapshot """
+        raise NotImplementedError('Every snapshot store must have an load method.')
+
+    @abc.abstractmethod
+    def save(self, snapshot: Snapshot):
+        """ Should be implemented by child class for saving to storage """
+        raise NotImplementedError('Every snapshot store must have an save method.')
+
+
+class InMemorySnapshotStore(SnapshotStore):
+    """ An in memory snapshot store """
+
+    def __init__(self):
+        self.__store = {}
+
+    def load(self, aggregate_root_id: str):
+        """ returns the latest snapshot from memory """
+        return self.__store.get(aggregate_root_id)
+
+    def save(self, snapshot: Snapshot):
+        """ stores the snapshot when it is newer then the current one """
+        current = self.__store.get(snapshot.get_aggregate_root_id())
+        if current is not None and \
+                current.get_aggregate_root_version() >= snapshot.get_aggregate_root_version():
+            return
+
+        self.__store[snapshot.get_aggregate_root_id()] = snapshot
+
+
+class SQLSnapshotStore(SnapshotStore):
+    """ A snapshot store for storing in SQL databases. With field encryption
+    the whole state is encrypted with the key of its aggregate root, so
+    forgetting the key also forgets the snapshots """
+
+    ENCRYPTED_STATE = 'snapshot_state'
+
+    def __init__(self, session, field_encryption: FieldEncryption = None):
+        self.__session = session
+        self.__field_encryption = field_encryption
+
+    def load(self, aggregate_root_id: str):
+        """ returns the latest snapshot from the database """
+        record = self.__session.query(SqlSnapshotRecord) \
+            .filter_by(aggregate_root_id=aggregate_root_id) \
+            .order_by(SqlSnapshotRecord.aggregate_root_version.desc()) \
+            .first()
+
+        if record is None:
+            return None
+
+        state = record.snapshot_state
+        if is_encrypted(state):
+            if self.__field_encryption is None:
+                raise SnapshotException("Snapshot is encrypted but the store has no field encryption")
+            state = self.__field_encryption.decrypt_field(
+                state, self.ENCRYPTED_STATE, record.aggregate_root_id)
+            if state is None:
+                return None
+
+        return Snapshot(
+            record.aggregate_root_id,
+            record.aggregate_root_version,
+            state)
+
+    def save(self, snapshot: Snapshot):
+        """ saves a snapshot to the database, the session is rolled back when
+        the snapshot cannot be saved """
+        state = snapshot.get_state()
+        if self.__field_encryption is not None:
+            state = self.__field_encryption.encrypt_field(
+                state, self.ENCRYPTED_STATE, snapshot.get_aggregate_root_id())
+
+        try:
+            self.__session.merge(SqlSnapshotRecord(
+                aggregate_root_id=snapshot.get_aggregate_root_id(),
+                aggregate_root_version=snapshot.get_aggregate_root_version(),
+                snapshot_state=state,
+                store_date=datetime.datetime.now().isoformat()
+            ))
+            self.__session.commit()
+        except Exception:
+            self.__session.rollback()
+            raise
+
+
+class SnapshotPolicy(object, metaclass=abc.ABCMeta):
+    """ Decides when the repository should take a snapshot """
+
+    @abc.abstractmethod
+    def should_snapshot(self, aggregate_root: AggregateRoot,
+                        replayed_events: int, replay_duration: float) -> bool:
+        """ called after loading an aggregate root with the number of events
+        replayed on top of the last snapshot and the time it took in seconds
+        """
+        raise NotImplementedError('Every snapshot policy must implement should_snapshot')
+
+
+class EveryNEventsPolicy(SnapshotPolicy):
+    """ Snapshot when more then n events had to be replayed """
+
+    def __init__(self, number_of_events: int):
+        if number_of_events < 1:
+            raise SnapshotException("Number of events must be at least 1")
+        self.__number_of_events = number_of_events
+
+    def should_snapshot(self, aggregate_root: AggregateRoot,
+                        replayed_events: int, replay_duration: float) -> bool:
+        return replayed_events >= self.__number_of_events
+
+
+class ReplayDurationPolicy(SnapshotPolicy):
+    """ Snapshot when replaying events took longer then x milliseconds """
+
+    def __init__(self, milliseconds: float):
+        if milliseconds < 0:
+            raise SnapshotException("Replay duration cannot be negative")
+        self.__milliseconds = milliseconds
+
+    def should_snapshot(self, aggregate_root: AggregateRoot,
+                        replayed_events: int, replay_duration: float) -> bool:
+        return replayed_events > 0 and \
+            replay_duration * 1000 >= self.__milliseconds
@@ -2,16 +2,30 @@
 import abc
 import datetime
 import uuid
-from typing import List
+from typing import Dict, Iterator, List
 
-from esframework import (get_fully_qualified_path_name, import_path)
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from esframework import get_fully_qualified_path_name
 from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
 from esframework.domain import DomainEvent
-from esframework.exceptions import AggregateRootIdNotFoundError
+from esframework.exceptions import AggregateRootIdNotFoundError, AggregateRootOutOfSyncError, DomainEventException
+from esframework.preprocessing.encryption import FieldEncryption
+from esframework.preprocessing.schema import (
+    SchemaMapperFactory, get_schema_fingerprint, is_schema_versioned)
+from esframework.preprocessing.upcasting import UpcasterChain, upcaster_chain
+from esframework.registry import EventRegistry, event_registry
 
 
 class Store(object):
-    """ Abstract class for a storing event streams """
+    """ Abstract class for a storing event streams, supports_multiple_processes
+    tells if stores of the same events can be opened by several processes at
+    once """
+
+    supports_multiple_processes = True
+
+    __field_encryption = None
 
     @abc.abstractmethod
     def load(self, aggregate_root_id: str):
@@ -19,24 +33,129 @@ class Store(object):
         raise NotImplementedError('Every repository must have an load method.')
 
     @abc.abstractmethod
-    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str):
-        """ Should be implemented by child class for saving to storage """
+    def load_from(self, aggregate_root_id: str, after_version: int):
+        """ Should be implemented by child class for loading the events after
+        a given version from storage """
+        raise NotImplementedError('Every repository must have an load_from method.')
+
+    @abc.abstractmethod
+    def stream(self, aggregate_root_id: str, from_version: int = None,
+               batch_size: int = 1000):
+        """ Should be implemented by child class for lazily loading events
+        from storage, starting at from_version when it is given """
+        raise NotImplementedError('Every repository must have an stream method.')
+
+    @abc.abstractmethod
+    def load_many(self, aggregate_root_ids: List[str]):
+        """ Should be implemented by child class for loading the streams of
+        multiple aggregate roots at once, unknown ids are left out """
+        raise NotImplementedError('Every repository must have an load_many method.')
+
+    @abc.abstractmethod
+    def read_all(self, after_position: int = 0, limit: int = 1000):
+        """ Should be implemented by child class for reading a page of the
+        events of all aggregate roots in the order they were stored """
+        raise NotImplementedError('Every repository must have an read_all method.')
+
+    @abc.abstractmethod
+    def get_aggregate_root_ids(self):
+        """ Should be implemented by child class for listing the ids of all
+        stored aggregate roots """
+        raise NotImplementedError('Every repository must have an get_aggregate_root_ids method.')
+
+    @abc.abstractmethod
+    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str,
+             expected_version: int = None):
+        """ Should be implemented by child class for saving to storage. When
+        expected_version is given the stream must be appended right after
+        that version or AggregateRootOutOfSyncError is raised """
         raise NotImplementedError('Every repository must have an save method.')
 
-    def encrypt(self):
+    def close(self):
+        """ releases the connections and files of the store, stores without
+        them do not have to implement it """
         pass
 
-    def decrypt(self):
-        pass
+    def assign_causation_ids(self, event_stream: List[DomainEvent]) -> List[str]:
+        """ generates the ids of the events in a stream and sets the causation
+        id of the events without one, the first event is caused by itself and
+        every next event by the one before it """
+        domain_event_ids = []  # domain_event_ids: List[str]
+        causation_id = None
+
+        for domain_event in event_stream:
+
+            domain_event_id = str(uuid.uuid4())
+            if domain_event.get_causation_id() is None and causation_id is None:
+                domain_event.set_causation_id(domain_event_id)
+            elif domain_event.get_causation_id() is None:
+                domain_event.set_causation_id(causation_id)
+
+            domain_event_ids.append(domain_event_id)
+            causation_id = domain_event_id
+
+        return domain_event_ids
+
+    def check_positions(self, event_stream: List[DomainEvent]):
+        """ raises when an event of the stream already has a position, stores
+        which set the position of saved events call this before they change
+        anything, so a rejected stream is not stored partially """
+        for domain_event in event_stream:
+            if domain_event.get_position() is not None:
+                raise DomainEventException(
+                    "Event already has position {}, stored events cannot be saved again".format(
+                        domain_event.get_position()))
+
+    def assign_correlation_ids(self, event_stream: List[DomainEvent], aggregate_root_id: str):
+        """ sets the correlation id of the events without one to the
+        aggregate root id, like the stored events get when they are loaded """
+        for domain_event in event_stream:
+            if domain_event.get_correlation_id() is None:
+                domain_event.set_correlation_id(aggregate_root_id)
+
+    def get_field_encryption(self) -> FieldEncryption:
+        """ returns the field encryption of this store or None """
+        return self.__field_encryption
+
+    def set_field_encryption(self, field_encryption: FieldEncryption):
+        """ sets the field encryption used for the encrypted_fields of events """
+        self.__field_encryption = field_encryption
+
+    def encrypt(self, domain_event: DomainEvent, event_body: dict, aggregate_root_id: str) -> dict:
+        """ encrypts the fields of a serialized body which are listed in the
+        encrypted_fields of its event """
+        if self.__field_encryption is None or not domain_event.encrypted_fields:
+            return event_body
+        return self.__field_encryption.encrypt(
+            event_body, domain_event.encrypted_fields, aggregate_root_id)
+
+    def decrypt(self, event_body: dict, aggregate_root_id: str, lazy: bool = True):
+        """ returns a serialized body which decrypts its encrypted fields
+        when they are read, or a plain dict with every field decrypted when
+        lazy is false, for example because an upcaster changes the body. The
+        event itself holds plain values, so every field its deserialize
+        method reads is decrypted when the event is loaded """
+        if self.__field_encryption is None:
+            return event_body
+        return self.__field_encryption.decrypt(event_body, aggregate_root_id, lazy)
 
 
 class InMemoryStore(Store):
-    """ An in memory event store """
+    """ An in memory event store, the events are kept as they are so fields
+    cannot be encrypted """
 
     __store = {}
+    __log = []
 
     def __init__(self):
         self.__store = {}
+        self.__log = []
+
+    def set_field_encryption(self, field_encryption: FieldEncryption):
+        """ raises because the events are not serialized, so there are no
+        fields to encrypt """
+        if field_encryption is not None:
+            raise ValueError('InMemoryStore does not serialize events and cannot encrypt fields')
 
     def load(self, aggregate_root_id: str) -> List[DomainEvent]:
         """ Load stream from memory """
@@ -48,76 +167,260 @@ class InMemoryStore(Store):
 
         return self.__store[aggregate_root_id]
 
-    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str):
+    def load_from(self, aggregate_root_id: str, after_version: int) -> List[DomainEvent]:
+        """ Load the part of the stream after a version from memory """
+        return self.__store.get(aggregate_root_id, [])[after_version:]
+
+    def stream(self, aggregate_root_id: str, from_version: int = None,
+               batch_size: int = 1000) -> Iterator[DomainEvent]:
+        """ Yield the stream from memory """
+        if from_version is None:
+            event_stream = self.load(aggregate_root_id)
+        else:
+            event_stream = self.load_from(aggregate_root_id, from_version - 1)
+
+        for domain_event in event_stream:
+            yield domain_event
+
+    def load_many(self, aggregate_root_ids: List[str]) -> Dict[str, List[DomainEvent]]:
+        """ Load the streams of multiple aggregate roots from memory """
+        return {
+            aggregate_root_id: list(self.__store[aggregate_root_id])
+            for aggregate_root_id in aggregate_root_ids
+            if aggregate_root_id in self.__store
+        }
+
+    def read_all(self, after_position: int = 0, limit: int = 1000) -> List[DomainEvent]:
+        """ Read a page of the global event log from memory """
+        return self.__log[after_position:after_position + limit]
+
+    def get_aggregate_root_ids(self) -> List[str]:
+        """ List the aggregate root ids in memory """
+        return list(self.__store)
+
+    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str,
+             expected_version: int = None):
         """ Store / Append stream to memory """
+        if expected_version is not None and \
+                len(self.__store.get(aggregate_root_id, [])) != expected_version:
+            raise AggregateRootOutOfSyncError(
+                "Aggregate root in store is newer then current aggregate")
+
+        self.check_positions(event_stream)
+        self.assign_correlation_ids(event_stream, aggregate_root_id)
 
         """ overwriting the event stream is not ok """
         if aggregate_root_id not in self.__store:
-            self.__store[aggregate_root_id] = event_stream
+            self.__store[aggregate_root_id] = list(event_stream)
         else:
             self.__store[aggregate_root_id] += event_stream
 
+        for domain_event in event_stream:
+            self.__log.append(domain_event)
+            domain_event.set_position(len(self.__log))
+
 
 class SQLStore(Store):
     """ A store for storing in SQL databases """
 
-    def __init__(self, session):
+    def __init__(self, session, insert_batch_size: int = None, registry: EventRegistry = None,
+                 upcasters: UpcasterChain = None, field_encryption: FieldEncryption = None):
+        """ insert_batch_size optionally splits very large streams into
+        multiple insert statements of insert_batch_size events, a stream is
+        always appended in a single transaction so it is stored completely or
+        not at all. Event names are resolved through the shared event registry
+        and bodies are upcasted by the shared upcaster chain unless others are
+        given. Without field_encryption the encrypted_fields of events are
+        stored in plain text """
+        if insert_batch_size is not None and insert_batch_size < 1:
+            raise ValueError('insert_batch_size must be a positive number')
+
         self.__session = session
+        self.__insert_batch_size = insert_batch_size
+        self.__registry = registry if registry is not None else event_registry
+        self.__upcasters = upcasters if upcasters is not None else upcaster_chain
+        self.__schema_fingerprints = {}
+        self.__passthrough_mapper = SchemaMapperFactory.factory('passthrough')
+        self.set_field_encryption(field_encryption)
 
     def load(self, aggregate_root_id: str) -> List[DomainEvent]:
         """ load a stream of DomainEvents from the database """
-        records = self.__session.query(SqlDomainRecord) \
-            .filter_by(aggregate_root_id=aggregate_root_id) \
+        return list(self.stream(aggregate_root_id))
+
+    def load_from(self, aggregate_root_id: str, after_version: int) -> List[DomainEvent]:
+        """ load the DomainEvents after a version from the database """
+        return list(self.stream(aggregate_root_id, after_version + 1))
+
+    def stream(self, aggregate_root_id: str, from_version: int = None,
+               batch_size: int = 1000) -> Iterator[DomainEvent]:
+        """ yields the DomainEvents of an aggregate root while fetching the
+        records from the database in batches of batch_size """
+        query = self.__session.query(SqlDomainRecord) \
+            .filter(SqlDomainRecord.aggregate_root_id == aggregate_root_id)
+
+        if from_version is not None:
+            query = query.filter(SqlDomainRecord.aggregate_root_version >= from_version)
+
+        records = query \
             .order_by(SqlDomainRecord.aggregate_root_version) \
-            .all()
+            .yield_per(batch_size)
 
-        if not records:
+        found = False
+        for record in records:
+            found = True
+            yield self.convert_to_domain_event(record)
+
+        if not found and from_version is None:
             raise AggregateRootIdNotFoundError(
                 'Aggregate root id does not exist: {}'.format(
                     aggregate_root_id),
                 )
 
+    def load_many(self, aggregate_root_ids: List[str]) -> Dict[str, List[DomainEvent]]:
+        """ loads the streams of multiple aggregate roots with a single query
+        and groups the DomainEvents per aggregate root """
+        streams = {}  # streams: Dict[str, List[DomainEvent]]
+        if not aggregate_root_ids:
+            return streams
+
+        records = self.__session.query(SqlDomainRecord) \
+            .filter(SqlDomainRecord.aggregate_root_id.in_(set(aggregate_root_ids))) \
+            .order_by(SqlDomainRecord.aggregate_root_id, SqlDomainRecord.aggregate_root_version) \
+            .all()
+
+        for record in records:
+            streams.setdefault(record.aggregate_root_id, []).append(
+                self.convert_to_domain_event(record))
+
+        return streams
+
+    def read_all(self, after_position: int = 0, limit: int = 1000) -> List[DomainEvent]:
+        """ reads a page of DomainEvents of all aggregate roots ordered by
+        their position in the event store """
+        records = self.__session.query(SqlDomainRecord) \
+            .filter(SqlDomainRecord.position > after_position) \
+            .order_by(SqlDomainRecord.position) \
+            .limit(limit) \
+            .all()
+
         return self.convert_to_domain_events(records)
 
-    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str):
-        """ saves a stream of DomainEvents to the database """
-        causation_id = None
-        for domain_event in event_stream:
+    def get_aggregate_root_ids(self) -> List[str]:
+        """ lists the distinct aggregate root ids in the event store """
+        rows = self.__session.query(SqlDomainRecord.aggregate_root_id) \
+            .distinct() \
+            .order_by(SqlDomainRecord.aggregate_root_id) \
+            .all()
 
-            domain_event_id = str(uuid.uuid4())
-            if domain_event.get_causation_id() is None and causation_id is None:
-                domain_event.set_causation_id(domain_event_id)
-            elif domain_event.get_causation_id() is None:
-                domain_event.set_causation_id(causation_id)
+        return [row[0] for row in rows]
 
-            event = SqlDomainRecord(
-                domain_event_id=domain_event_id,
-                aggregate_root_id=aggregate_root_id,
-                aggregate_root_version=domain_event.get_aggregate_root_version(),
-                domain_event_name=get_fully_qualified_path_name(domain_event),
-                domain_event_body=domain_event.serialize(),
-                store_date=datetime.datetime.now().isoformat(),
-                event_date=domain_event.get_event_date(),
-                correlation_id=aggregate_root_id,
-                causation_id=domain_event.get_causation_id(),
-                event_metadata={}
-            )
+    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str,
+             expected_version: int = None):
+        """ saves a stream of DomainEvents to the database with a bulk
+        insert and a single commit. Concurrent writes are detected by the
+        unique index on aggregate_root_id and aggregate_root_version """
+        if expected_version is not None and event_stream and \
+                event_stream[0].get_aggregate_root_version() != expected_version + 1:
+            raise AggregateRootOutOfSyncError(
+                "Event stream does not start after the expected version")
+
+        records = self.convert_to_records(event_stream, aggregate_root_id)
+        if not records:
+            return
 
-            self.__session.add(event)
+        insert_batch_size = self.__insert_batch_size or len(records)
+        try:
+            for offset in range(0, len(records), insert_batch_size):
+                self.__session.bulk_insert_mappings(
+                    SqlDomainRecord, records[offset:offset + insert_batch_size])
             self.__session.commit()
-            causation_id = domain_event_id
+        except IntegrityError:
+            self.__session.rollback()
+            raise AggregateRootOutOfSyncError(
+                "Aggregate root in store is newer then current aggregate")
+        except Exception:
+            self.__session.rollback()
+            raise
+
+    def convert_to_records(self, event_stream: List[DomainEvent], aggregate_root_id: str) -> List[dict]:
+        """ converts a stream of DomainEvents to rows for the event store """
+        domain_event_ids = self.assign_causation_ids(event_stream)
+        self.assign_correlation_ids(event_stream, aggregate_root_id)
+        store_date = datetime.datetime.now().isoformat()
+
+        return [
+            {
+                'domain_event_id': domain_event_id,
+                'aggregate_root_id': aggregate_root_id,
+                'aggregate_root_version': domain_event.get_aggregate_root_version(),
+                'domain_event_name': get_fully_qualified_path_name(domain_event),
+                'domain_event_body': self.encrypt(domain_event, domain_event.serialize(), aggregate_root_id),
+                'store_date': store_date,
+                'event_date': domain_event.get_event_date(),
+                'correlation_id': aggregate_root_id,
+                'causation_id': domain_event.get_causation_id(),
+                'event_metadata': {},
+                'schema_version': domain_event.schema_version,
+                'schema_fingerprint': get_schema_fingerprint(domain_event.__class__),
+            }
+            for domain_event_id, domain_event in zip(domain_event_ids, event_stream)
+        ]
+
+    def is_current_schema(self, event_class: type, schema_fingerprint: str) -> bool:
+        """ returns if a body with a fingerprint was stored with the current
+        schema of a versioned event class, so it does not need mapping """
+        try:
+            current_fingerprint = self.__schema_fingerprints[event_class]
+        except KeyError:
+            current_fingerprint = None
+            if is_schema_versioned(event_class):
+                current_fingerprint = get_schema_fingerprint(event_class)
+            self.__schema_fingerprints[event_class] = current_fingerprint
+
+        return current_fingerprint is not None and current_fingerprint == schema_fingerprint
+
+    def get_schema_fingerprint_report(self) -> List[tuple]:
+        """ returns the number of stored events per event name and schema
+        fingerprint and if that fingerprint is the current one, events without
+        a fingerprint or with an old one are legacy data which is mapped on
+        every read """
+        rows = self.__session.query(
+            SqlDomainRecord.domain_event_name,
+            SqlDomainRecord.schema_fingerprint,
+            func.count(SqlDomainRecord.position),
+        ).group_by(SqlDomainRecord.domain_event_name, SqlDomainRecord.schema_fingerprint) \
+            .order_by(SqlDomainRecord.domain_event_name, SqlDomainRecord.schema_fingerprint) \
+            .all()
+
+        report = []
+        for domain_event_name, schema_fingerprint, count in rows:
+            try:
+                event_class = self.__registry.resolve(domain_event_name)
+                current = schema_fingerprint == get_schema_fingerprint(event_class)
+            except ImportError:
+                current = False
+            report.append((domain_event_name, schema_fingerprint, count, current))
+        return report
 
     def convert_to_domain_events(self, records: List[SqlDomainRecord]) -> List[DomainEvent]:
         """ converts a stream SqlDomainRecords to a stream of DomainEvents """
-        domain_events = []  # domain_events: List[DomainEvent]
+        return [self.convert_to_domain_event(record) for record in records]
 
-        for record in records:
-            event_class = import_path(record.domain_event_name)
-            event = event_class.deserialize(record.domain_event_body)
-            event.set_event_id(record.domain_event_id)
-            event.set_causation_id(record.causation_id)
-            event.set_aggregate_root_version(record.aggregate_root_version)
-            event.set_correlation_id(record.correlation_id)
-            domain_events.append(event)
-
-        return domain_events
+    def convert_to_domain_event(self, record: SqlDomainRecord) -> DomainEvent:
+        """ converts a SqlDomainRecord to a DomainEvent """
+        event_class = self.__registry.resolve(record.domain_event_name)
+        upcaster = self.__upcasters.get_upcaster(
+            record.domain_event_name, record.schema_version or 1, event_class.schema_version)
+        event_data = self.decrypt(record.domain_event_body, record.aggregate_root_id, upcaster is None)
+        if upcaster is not None:
+            event = event_class.deserialize(upcaster(event_data))
+        elif self.is_current_schema(event_class, record.schema_fingerprint):
+            event = event_class.deserialize(event_data, schema_mapper=self.__passthrough_mapper)
+        else:
+            event = event_class.deserialize(event_data)
+        event.set_event_id(record.domain_event_id)
+        event.set_causation_id(record.causation_id)
+        event.set_aggregate_root_version(record.aggregate_root_version)
+        event.set_correlation_id(record.correlation_id)
+        event.set_position(record.position)
+        return event
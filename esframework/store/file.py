@@ -0,0 +1,314 @@
+""" An append only event store on segment files """
+import datetime
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Dict, Iterator, List
+
+from esframework import get_fully_qualified_path_name
+from esframework.domain import DomainEvent
+from esframework.exceptions import AggregateRootIdNotFoundError, AggregateRootOutOfSyncError
+from esframework.preprocessing.encryption import FieldEncryption
+from esframework.preprocessing.upcasting import UpcasterChain, upcaster_chain
+from esframework.registry import EventRegistry, event_registry
+from esframework.store import Store
+
+HEADER = struct.Struct('>II')
+SEGMENT_NAME = 'segment-{:06d}.log'
+INDEX_NAME = 'index.log'
+
+
+class FileStore(Store):
+    """ A store which appends events to length prefixed segment files.
+
+    Every record is a header with the payload length and crc32 followed by the
+    json payload. The events of one save are written as a batch, a batch which
+    was not completely written is cut off when the store is opened again. An
+    index of the global log and the positions per aggregate root is kept in
+    memory, records are read through mmap. The index is persisted next to the
+    segments as an append only log, every flush appends one json line with
+    the records indexed since the previous flush and the new checkpoint.
+    The store is meant for a single process.
+    """
+
+    supports_multiple_processes = False
+
+    def __init__(self, directory: str, max_segment_size: int = 64 * 1024 * 1024,
+                 fsync: bool = False, index_flush_interval: int = 1000,
+                 registry: EventRegistry = None, upcasters: UpcasterChain = None,
+                 field_encryption: FieldEncryption = None):
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.__directory = directory
+        self.__max_segment_size = max_segment_size
+        self.__fsync = fsync
+        self.__index_flush_interval = index_flush_interval
+        self.__registry = registry if registry is not None else event_registry
+        self.__upcasters = upcasters if upcasters is not None else upcaster_chain
+        self.set_field_encryption(field_encryption)
+
+        self.__log = []  # __log: List[tuple] (segment, offset) per position
+        self.__aggregates = {}  # __aggregates: Dict[str, List[int]]
+        self.__maps = {}  # __maps: Dict[int, mmap.mmap]
+        self.__unflushed_entries = []  # __unflushed_entries: List[tuple] (segment, offset, id)
+        self.__unflushed_saves = 0
+
+        self.__segment, self.__offset = self.__load_index()
+        self.__recover()
+        self.__writer = open(self.__segment_path(self.__segment), 'ab')
+
+    def close(self):
+        """ persists the index and closes all files """
+        self.flush_index()
+        self.__writer.close()
+        for segment_map in self.__maps.values():
+            segment_map.close()
+        self.__maps = {}
+
+    def flush_index(self):
+        """ appends the records indexed since the last flush to the index,
+        records written after the last flush are recovered by scanning the
+        segments when the store is opened """
+        if self.__unflushed_entries:
+            with open(os.path.join(self.__directory, INDEX_NAME), 'a') as index_file:
+                index_file.write(json.dumps({
+                    'checkpoint': [self.__segment, self.__offset],
+                    'entries': self.__unflushed_entries,
+                }) + '\n')
+                index_file.flush()
+                if self.__fsync:
+                    os.fsync(index_file.fileno())
+            self.__unflushed_entries = []
+        self.__unflushed_saves = 0
+
+    def load(self, aggregate_root_id: str) -> List[DomainEvent]:
+        """ load a stream of DomainEvents from the segments """
+        return list(self.stream(aggregate_root_id))
+
+    def load_from(self, aggregate_root_id: str, after_version: int) -> List[DomainEvent]:
+        """ load the DomainEvents after a version from the segments """
+        return list(self.stream(aggregate_root_id, after_version + 1))
+
+    def stream(self, aggregate_root_id: str, from_version: int = None,
+               batch_size: int = 1000) -> Iterator[DomainEvent]:
+        """ yields the DomainEvents of an aggregate root, only the records of
+        this aggregate root are read """
+        if aggregate_root_id not in self.__aggregates:
+            if from_version is None:
+                raise AggregateRootIdNotFoundError(
+                    'Aggregate root id does not exist: {}'.format(
+                        aggregate_root_id),
+                )
+            return
+
+        positions = self.__aggregates[aggregate_root_id]
+        for position in positions[max((from_version or 1) - 1, 0):]:
+            yield self.__read(position)
+
+    def load_many(self, aggregate_root_ids: List[str]) -> Dict[str, List[DomainEvent]]:
+        """ loads the streams of multiple aggregate roots """
+        return {
+            aggregate_root_id: self.load(aggregate_root_id)
+            for aggregate_root_id in aggregate_root_ids
+            if aggregate_root_id in self.__aggregates
+        }
+
+    def read_all(self, after_position: int = 0, limit: int = 1000) -> List[DomainEvent]:
+        """ reads a page of DomainEvents of all aggregate roots in the order
+        they were appended """
+        last_position = min(after_position + limit, len(self.__log))
+        return [
+            self.__read(position)
+            for position in range(after_position + 1, last_position + 1)
+        ]
+
+    def get_aggregate_root_ids(self) -> List[str]:
+        """ lists the aggregate root ids in the index """
+        return list(self.__aggregates)
+
+    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str,
+             expected_version: int = None):
+        """ appends a stream of DomainEvents as one batch to the active
+        segment """
+        positions = self.__aggregates.get(aggregate_root_id, [])
+        if expected_version is not None and len(positions) != expected_version:
+            raise AggregateRootOutOfSyncError(
+                "Aggregate root in store is newer then current aggregate")
+
+        if not event_stream:
+            return
+
+        self.check_positions(event_stream)
+        if self.__offset >= self.__max_segment_size:
+            self.__roll_over()
+
+        domain_event_ids = self.assign_causation_ids(event_stream)
+        self.assign_correlation_ids(event_stream, aggregate_root_id)
+        store_date = datetime.datetime.now().isoformat()
+        remaining = len(event_stream)
+        batch = bytearray()
+        offsets = []
+
+        for domain_event_id, domain_event in zip(domain_event_ids, event_stream):
+            remaining -= 1
+            version = domain_event.get_aggregate_root_version()
+            if version is None:
+                version = len(positions) + len(offsets) + 1
+
+            payload = json.dumps([
+                domain_event_id,
+                aggregate_root_id,
+                version,
+                get_fully_qualified_path_name(domain_event),
+                self.encrypt(domain_event, domain_event.serialize(), aggregate_root_id),
+                store_date,
+                domain_event.get_event_date(),
+                aggregate_root_id,
+                domain_event.get_causation_id(),
+                domain_event.schema_version,
+                remaining,
+            ]).encode('utf-8')
+
+            offsets.append(self.__offset + len(batch))
+            batch += HEADER.pack(len(payload), zlib.crc32(payload))
+            batch += payload
+
+        self.__writer.write(batch)
+        self.__writer.flush()
+        if self.__fsync:
+            os.fsync(self.__writer.fileno())
+
+        self.__offset += len(batch)
+        for domain_event, offset in zip(event_stream, offsets):
+            self.__add_to_index(aggregate_root_id, self.__segment, offset)
+            domain_event.set_position(len(self.__log))
+
+        self.__unflushed_saves += 1
+        if self.__unflushed_saves >= self.__index_flush_interval:
+            self.flush_index()
+
+    def __segment_path(self, segment: int) -> str:
+        return os.path.join(self.__directory, SEGMENT_NAME.format(segment))
+
+    def __add_to_index(self, aggregate_root_id: str, segment: int, offset: int, flushed: bool = False):
+        self.__log.append((segment, offset))
+        self.__aggregates.setdefault(aggregate_root_id, []).append(len(self.__log))
+        if not flushed:
+            self.__unflushed_entries.append((segment, offset, aggregate_root_id))
+
+    def __roll_over(self):
+        """ closes the active segment and starts a new one """
+        self.__writer.close()
+        self.__segment += 1
+        self.__offset = 0
+        self.__writer = open(self.__segment_path(self.__segment), 'ab')
+
+    def __load_index(self) -> tuple:
+        """ replays the persisted index and returns the checkpoint up to where
+        the segments are indexed, a torn last line is cut off """
+        path = os.path.join(self.__directory, INDEX_NAME)
+        if not os.path.exists(path):
+            return 1, 0
+
+        checkpoint = (1, 0)
+        length = 0
+        with open(path, 'rb') as index_file:
+            for line in index_file:
+                try:
+                    flush = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                for segment, offset, aggregate_root_id in flush['entries']:
+                    self.__add_to_index(aggregate_root_id, segment, offset, flushed=True)
+                checkpoint = tuple(flush['checkpoint'])
+                length += len(line)
+
+        if length < os.path.getsize(path):
+            with open(path, 'r+b') as index_file:
+                index_file.truncate(length)
+        return checkpoint
+
+    def __recover(self):
+        """ indexes the records written after the checkpoint and cuts off a
+        torn batch at the end of the last segment """
+        segment = self.__segment
+        offset = self.__offset
+
+        while os.path.exists(self.__segment_path(segment)):
+            with open(self.__segment_path(segment), 'rb') as segment_file:
+                data = segment_file.read()
+
+            batch_start = offset
+            batch = []
+            while True:
+                if offset + HEADER.size > len(data):
+                    break
+                length, checksum = HEADER.unpack_from(data, offset)
+                payload = data[offset + HEADER.size:offset + HEADER.size + length]
+                if len(payload) != length or zlib.crc32(payload) != checksum:
+                    break
+
+                record = json.loads(payload.decode('utf-8'))
+                batch.append((record[1], offset))
+                offset += HEADER.size + length
+
+                if record[-1] == 0:
+                    for aggregate_root_id, record_offset in batch:
+                        self.__add_to_index(aggregate_root_id, segment, record_offset)
+                    batch = []
+                    batch_start = offset
+
+            if batch_start < len(data):
+                with open(self.__segment_path(segment), 'r+b') as segment_file:
+                    segment_file.truncate(batch_start)
+
+            self.__segment, self.__offset = segment, batch_start
+            if not os.path.exists(self.__segment_path(segment + 1)):
+                break
+            segment += 1
+            offset = 0
+
+    def __map(self, segment: int, end: int) -> mmap.mmap:
+        """ returns a memory map of a segment which covers offset end """
+        segment_map = self.__maps.get(segment)
+        if segment_map is None or len(segment_map) < end:
+            if segment_map is not None:
+                segment_map.close()
+            with open(self.__segment_path(segment), 'rb') as segment_file:
+                segment_map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__maps[segment] = segment_map
+        return segment_map
+
+    def __read(self, position: int) -> DomainEvent:
+        """ reads the record at a position and converts it to a DomainEvent """
+        segment, offset = self.__log[position - 1]
+        segment_map = self.__map(segment, offset + HEADER.size)
+        length, _ = HEADER.unpack_from(segment_map, offset)
+        start = offset + HEADER.size
+        segment_map = self.__map(segment, start + length)
+
+        record = json.loads(segment_map[start:start + length].decode('utf-8'))
+        domain_event_id, aggregate_root_id, aggregate_root_version, \
+            domain_event_name, domain_event_body, _, _, correlation_id, \
+            causation_id = record[:9]
+        schema_version = record[9] if len(record) > 10 else 1
+
+        event_class = self.__registry.resolve(domain_event_name)
+        upcaster = self.__upcasters.get_upcaster(
+            domain_event_name, schema_version, event_class.schema_version)
+        domain_event_body = self.decrypt(domain_event_body, aggregate_root_id, upcaster is None)
+        if upcaster is not None:
+            domain_event_body = upcaster(domain_event_body)
+
+        event = event_class.deserialize(domain_event_body)
+        event.set_event_id(domain_event_id)
+        event.set_causation_id(causation_id)
+        event.set_aggregate_root_version(aggregate_root_version)
+        event.set_correlation_id(correlation_id)
+        event.set_position(position)
+        return event
@@ -0,0 +1,203 @@
+""" An event store on top of the sqlite3 module without the ORM """
+import datetime
+import json
+import sqlite3
+from typing import Dict, Iterator, List
+
+from esframework import get_fully_qualified_path_name
+from esframework.domain import DomainEvent
+from esframework.exceptions import AggregateRootIdNotFoundError, AggregateRootOutOfSyncError
+from esframework.preprocessing.encryption import FieldEncryption
+from esframework.preprocessing.upcasting import UpcasterChain, upcaster_chain
+from esframework.registry import EventRegistry, event_registry
+from esframework.store import Store
+
+CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS event_store (
+        position INTEGER PRIMARY KEY AUTOINCREMENT,
+        domain_event_id VARCHAR(36) NOT NULL UNIQUE,
+        aggregate_root_id VARCHAR(36) NOT NULL,
+        aggregate_root_version INTEGER NOT NULL,
+        domain_event_name VARCHAR(255) NOT NULL,
+        domain_event_body JSON NOT NULL,
+        store_date VARCHAR(50) NOT NULL,
+        event_date VARCHAR(50) NOT NULL,
+        correlation_id VARCHAR(36) NOT NULL,
+        causation_id VARCHAR(36) NOT NULL,
+        event_metadata JSON NOT NULL,
+        schema_version INTEGER NOT NULL DEFAULT 1,
+        CONSTRAINT uix_aggregate_root_version UNIQUE (aggregate_root_id, aggregate_root_version)
+    )
+"""
+
+COLUMNS = "position, domain_event_id, aggregate_root_id, aggregate_root_version, " \
+          "domain_event_name, domain_event_body, correlation_id, causation_id, schema_version"
+
+INSERT_EVENT = "INSERT INTO event_store (" \
+               "domain_event_id, aggregate_root_id, aggregate_root_version, " \
+               "domain_event_name, domain_event_body, store_date, event_date, " \
+               "correlation_id, causation_id, event_metadata, schema_version" \
+               ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+SELECT_STREAM = "SELECT " + COLUMNS + " FROM event_store " \
+                "WHERE aggregate_root_id = ? AND aggregate_root_version >= ? " \
+                "ORDER BY aggregate_root_version"
+
+SELECT_ALL = "SELECT " + COLUMNS + " FROM event_store " \
+             "WHERE position > ? ORDER BY position LIMIT ?"
+
+
+class SqliteStore(Store):
+    """ A store using sqlite3 directly, rows are read as tuples and written
+    with prepared statements and executemany """
+
+    def __init__(self, database: str, journal_mode: str = 'WAL',
+                 synchronous: str = 'NORMAL', cache_size: int = -64000,
+                 registry: EventRegistry = None, upcasters: UpcasterChain = None,
+                 field_encryption: FieldEncryption = None):
+        """ database is a file name or ':memory:', cache_size follows the
+        sqlite pragma so a negative number is the size in KiB """
+        self.__connection = sqlite3.connect(database)
+        self.__connection.execute("PRAGMA journal_mode = {}".format(journal_mode))
+        self.__connection.execute("PRAGMA synchronous = {}".format(synchronous))
+        self.__connection.execute("PRAGMA cache_size = {}".format(int(cache_size)))
+        self.__connection.execute(CREATE_TABLE)
+        self.__add_schema_version_column()
+        self.__registry = registry if registry is not None else event_registry
+        self.__upcasters = upcasters if upcasters is not None else upcaster_chain
+        self.set_field_encryption(field_encryption)
+
+    def get_connection(self) -> sqlite3.Connection:
+        """ returns the underlying sqlite3 connection """
+        return self.__connection
+
+    def close(self):
+        """ closes the underlying sqlite3 connection """
+        self.__connection.close()
+
+    def load(self, aggregate_root_id: str) -> List[DomainEvent]:
+        """ load a stream of DomainEvents from sqlite """
+        return list(self.stream(aggregate_root_id))
+
+    def load_from(self, aggregate_root_id: str, after_version: int) -> List[DomainEvent]:
+        """ load the DomainEvents after a version from sqlite """
+        return list(self.stream(aggregate_root_id, after_version + 1))
+
+    def stream(self, aggregate_root_id: str, from_version: int = None,
+               batch_size: int = 1000) -> Iterator[DomainEvent]:
+        """ yields the DomainEvents of an aggregate root while fetching the
+        rows in batches of batch_size """
+        cursor = self.__connection.execute(
+            SELECT_STREAM, (aggregate_root_id, from_version or 0))
+
+        found = False
+        rows = cursor.fetchmany(batch_size)
+        while rows:
+            found = True
+            for row in rows:
+                yield self.convert_to_domain_event(row)
+            rows = cursor.fetchmany(batch_size)
+
+        if not found and from_version is None:
+            raise AggregateRootIdNotFoundError(
+                'Aggregate root id does not exist: {}'.format(
+                    aggregate_root_id),
+                )
+
+    def load_many(self, aggregate_root_ids: List[str]) -> Dict[str, List[DomainEvent]]:
+        """ loads the streams of multiple aggregate roots with a single query """
+        streams = {}  # streams: Dict[str, List[DomainEvent]]
+        aggregate_root_ids = list(set(aggregate_root_ids))
+        if not aggregate_root_ids:
+            return streams
+
+        cursor = self.__connection.execute(
+            "SELECT " + COLUMNS + " FROM event_store "
+            "WHERE aggregate_root_id IN ({}) "
+            "ORDER BY aggregate_root_id, aggregate_root_version".format(
+                ", ".join("?" * len(aggregate_root_ids))),
+            aggregate_root_ids)
+
+        for row in cursor:
+            streams.setdefault(row[2], []).append(self.convert_to_domain_event(row))
+
+        return streams
+
+    def read_all(self, after_position: int = 0, limit: int = 1000) -> List[DomainEvent]:
+        """ reads a page of DomainEvents of all aggregate roots ordered by
+        their position in the event store """
+        cursor = self.__connection.execute(SELECT_ALL, (after_position, limit))
+        return [self.convert_to_domain_event(row) for row in cursor]
+
+    def get_aggregate_root_ids(self) -> List[str]:
+        """ lists the distinct aggregate root ids in sqlite """
+        cursor = self.__connection.execute(
+            "SELECT DISTINCT aggregate_root_id FROM event_store ORDER BY aggregate_root_id")
+        return [row[0] for row in cursor]
+
+    def save(self, event_stream: List[DomainEvent], aggregate_root_id: str,
+             expected_version: int = None):
+        """ saves a stream of DomainEvents with executemany in a single
+        transaction """
+        if expected_version is not None and event_stream and \
+                event_stream[0].get_aggregate_root_version() != expected_version + 1:
+            raise AggregateRootOutOfSyncError(
+                "Event stream does not start after the expected version")
+
+        domain_event_ids = self.assign_causation_ids(event_stream)
+        self.assign_correlation_ids(event_stream, aggregate_root_id)
+        store_date = datetime.datetime.now().isoformat()
+        rows = [
+            (
+                domain_event_id,
+                aggregate_root_id,
+                domain_event.get_aggregate_root_version(),
+                get_fully_qualified_path_name(domain_event),
+                json.dumps(self.encrypt(domain_event, domain_event.serialize(), aggregate_root_id)),
+                store_date,
+                domain_event.get_event_date(),
+                aggregate_root_id,
+                domain_event.get_causation_id(),
+                '{}',
+                domain_event.schema_version,
+            )
+            for domain_event_id, domain_event in zip(domain_event_ids, event_stream)
+        ]
+
+        try:
+            with self.__connection:
+                self.__connection.executemany(INSERT_EVENT, rows)
+        except sqlite3.IntegrityError:
+            raise AggregateRootOutOfSyncError(
+                "Aggregate root in store is newer then current aggregate")
+
+    def __add_schema_version_column(self):
+        """ adds the schema_version column to event stores created before it
+        existed, their events are at schema version 1 """
+        columns = [row[1] for row in self.__connection.execute("PRAGMA table_info(event_store)")]
+        if 'schema_version' not in columns:
+            with self.__connection:
+                self.__connection.execute(
+                    "ALTER TABLE event_store ADD COLUMN schema_version INTEGER NOT NULL DEFAULT 1")
+
+    def convert_to_domain_event(self, row: tuple) -> DomainEvent:
+        """ converts a row to a DomainEvent, the columns are ordered like
+        COLUMNS """
+        position, domain_event_id, aggregate_root_id, aggregate_root_version, \
+            domain_event_name, domain_event_body, correlation_id, causation_id, \
+            schema_version = row
+
+        event_class = self.__registry.resolve(domain_event_name)
+        upcaster = self.__upcasters.get_upcaster(
+            domain_event_name, schema_version, event_class.schema_version)
+        event_data = self.decrypt(json.loads(domain_event_body), aggregate_root_id, upcaster is None)
+        if upcaster is not None:
+            event_data = upcaster(event_data)
+
+        event = event_class.deserialize(event_data)
+        event.set_event_id(domain_event_id)
+        event.set_causation_id(causation_id)
+        event.set_aggregate_root_version(aggregate_root_version)
+        event.set_correlation_id(correlation_id)
+        event.set_position(position)
+        return event
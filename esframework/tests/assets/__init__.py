@@ -26,7 +26,7 @@ class EventA(DomainEvent):
     @event_versioning('weak-schema')
     def deserialize(event_data: dict, schema_mapper: SchemaMapper=None):
         """ deserialize the event for building the aggregate root """
-        mapped_data = schema_mapper.map(event_data, EventA.__dict__)
+        mapped_data = schema_mapper.map(event_data, EventA)
         return EventA(
             mapped_data['aggregate_root_id'],
             mapped_data['an_event_property'])
@@ -195,6 +195,43 @@ class EventAV4(DomainEvent):
             event_data['an_event_property'])
 
 
+class EventWithPersonalData(DomainEvent):
+    """ Dummy event class with an encrypted field for testing """
+    __aggregate_root_id = None
+    __email = None
+
+    encrypted_fields = ('email',)
+
+    def __init__(self, aggregate_root_id, email):
+        super().__init__()
+        self.__aggregate_root_id = aggregate_root_id
+        self.__email = email
+
+    def get_aggregate_root_id(self):
+        """ returns the property aggregate_root_id of this event """
+        return self.__aggregate_root_id
+
+    def get_email(self):
+        """ Gets email of this event """
+        return self.__email
+
+    @staticmethod
+    @event_versioning('weak-schema')
+    def deserialize(event_data: dict, schema_mapper: SchemaMapper=None):
+        """ deserialize the event for building the aggregate root """
+        mapped_data = schema_mapper.map(event_data, EventWithPersonalData)
+        return EventWithPersonalData(
+            mapped_data['aggregate_root_id'],
+            mapped_data['email'])
+
+    def serialize(self):
+        """ Serialize the event for storing """
+        return {
+            'aggregate_root_id': self.__aggregate_root_id,
+            'email': self.__email,
+        }
+
+
 class MyTestAggregate(AggregateRoot):
     """ A test aggregate for unittesting """
 
@@ -229,3 +266,19 @@ class MyTestAggregate(AggregateRoot):
     def get_aggregate_root_id(self):
         """ Get the aggregate root id of this aggregate """
         return self.__aggregate_root_id
+
+
+def create_events(aggregate_root_id, properties, first_version=1):
+    """ creates versioned EventA events for an aggregate root, properties is
+    a list of event properties or a number of events with the properties
+    prop<version> """
+    if isinstance(properties, int):
+        properties = ['prop{}'.format(version)
+                      for version in range(first_version, first_version + properties)]
+
+    events = []
+    for version, an_event_property in enumerate(properties, first_version):
+        event = EventA(aggregate_root_id, an_event_property)
+        event.set_aggregate_root_version(version)
+        events.append(event)
+    return events
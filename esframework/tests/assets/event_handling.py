@@ -1,8 +1,10 @@
 """ assets needed for event handling """
+import asyncio
 from typing import List
 
-from esframework.domain import DomainEvent
+from esframework.domain import DomainEvent, handles
 from esframework.event_handling.event_listener import EventListener
+from esframework.tests.assets import EventA, EventB
 
 
 class SimpleEventListener(EventListener):
@@ -17,3 +19,57 @@ class SimpleEventListener(EventListener):
     def receive(self, domain_event: DomainEvent):
         self.__received_messages.append(domain_event)
 
+
+class EventAListener(EventListener):
+    """ an event listener only handling EventA """
+
+    def __init__(self):
+        self.__received_messages = []
+
+    def get_received_messages(self) -> List[DomainEvent]:
+        return self.__received_messages
+
+    def apply_event_a(self, domain_event: EventA):
+        self.__received_messages.append(domain_event)
+
+
+class EventBListener(EventListener):
+    """ an event listener declaring it handles EventB """
+
+    def __init__(self):
+        self.__received_messages = []
+
+    def get_received_messages(self) -> List[DomainEvent]:
+        return self.__received_messages
+
+    @handles(EventB)
+    def on_event_b(self, domain_event: EventB):
+        self.__received_messages.append(domain_event)
+
+
+class SlowAsyncEventListener(EventListener):
+    """ an event listener with a coroutine apply method """
+
+    def __init__(self, delay: float = 0):
+        self.__delay = delay
+        self.__received_messages = []
+
+    def get_received_messages(self) -> List[DomainEvent]:
+        return self.__received_messages
+
+    async def apply_event_a(self, domain_event: EventA):
+        await asyncio.sleep(self.__delay)
+        self.__received_messages.append(domain_event)
+
+
+class BatchEventListener(EventListener):
+    """ an event listener receiving the emitted events as batches """
+
+    def __init__(self):
+        self.__received_batches = []
+
+    def get_received_batches(self) -> List[List[DomainEvent]]:
+        return self.__received_batches
+
+    def receive_batch(self, event_stream: List[DomainEvent]):
+        self.__received_batches.append(list(event_stream))
@@ -0,0 +1,24 @@
+""" assets needed for projections """
+from esframework.projection import PartitionedProjection
+from esframework.tests.assets import EventA
+
+
+class PropertyCountProjection(PartitionedProjection):
+    """ counts the EventA events per aggregate root """
+
+    def __init__(self):
+        self.__counts = {}
+
+    def apply_event_a(self, domain_event: EventA):
+        aggregate_root_id = domain_event.get_aggregate_root_id()
+        self.__counts[aggregate_root_id] = self.__counts.get(aggregate_root_id, 0) + 1
+
+    def get_state(self) -> dict:
+        return self.__counts
+
+    @classmethod
+    def merge(cls, states: list) -> dict:
+        merged = {}
+        for state in states:
+            merged.update(state)
+        return merged
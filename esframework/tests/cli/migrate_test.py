@@ -0,0 +1,222 @@
+""" event migration tests """
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from esframework.cli.migrate import EventMigration, main
+from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
+from esframework.exceptions import UpcasterException
+from esframework.preprocessing.encryption import FieldEncryption, is_encrypted
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore
+from esframework.preprocessing.schema import get_schema_fingerprint
+from esframework.preprocessing.upcasting import UpcasterChain
+from esframework.store import SQLStore
+from esframework.tests.assets import EventA, EventB, EventWithPersonalData
+
+EVENT_NAME = 'esframework.tests.assets.EventA'
+
+
+def uppercase_property(event_data: dict) -> dict:
+    """ upcasts EventA from version 1 to 2 """
+    return {
+        'aggregate_root_id': event_data['aggregate_root_id'],
+        'an_event_property': event_data['an_event_property'].upper(),
+    }
+
+
+def lowercase_email(event_data: dict) -> dict:
+    """ upcasts EventWithPersonalData from version 1 to 2 """
+    event_data = event_data.copy()
+    event_data['email'] = event_data['email'].lower()
+    return event_data
+
+
+upcasters = UpcasterChain()
+upcasters.register(EVENT_NAME, 1, uppercase_property)
+
+personal_data_upcasters = UpcasterChain()
+personal_data_upcasters.register('esframework.tests.assets.EventWithPersonalData', 1, lowercase_email)
+
+
+class TestEventMigration(unittest.TestCase):
+
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__database_url = 'sqlite:///' + os.path.join(self.__directory.name, 'events.db')
+        self.__checkpoints = os.path.join(self.__directory.name, 'checkpoints.db')
+        engine = create_engine(self.__database_url)
+        SqlDomainRecord.metadata.create_all(engine)
+        self.__session = sessionmaker(bind=engine)()
+
+        store = SQLStore(self.__session)
+        for aggregate in range(6):
+            aggregate_root_id = 'aggregate-{}'.format(aggregate)
+            events = []
+            for version in range(1, 4):
+                event = EventA(aggregate_root_id, 'prop{}'.format(version))
+                event.set_aggregate_root_version(version)
+                events.append(event)
+            store.save(events, aggregate_root_id)
+
+    def tearDown(self):
+        self.__session.close()
+        self.__directory.cleanup()
+
+    def get_records(self) -> list:
+        self.__session.expire_all()
+        return self.__session.query(SqlDomainRecord).order_by(SqlDomainRecord.position).all()
+
+    def raise_schema_version(self):
+        """ makes EventA version 2, so the stored events are upcasted """
+        schema_version = mock.patch.object(EventA, 'schema_version', 2)
+        schema_version.start()
+        self.addCleanup(schema_version.stop)
+
+    def test_it_rewrites_the_bodies_to_the_latest_schema(self):
+        self.raise_schema_version()
+        migration = EventMigration(self.__database_url, page_size=4, upcasters=upcasters)
+
+        report = migration.run()
+
+        self.assertEqual(18, report.get_scanned())
+        self.assertEqual(18, report.get_changed())
+        for record in self.get_records():
+            self.assertEqual(2, record.schema_version)
+            self.assertTrue(record.domain_event_body['an_event_property'].startswith('PROP'))
+
+        self.assertEqual(0, migration.run().get_changed())
+
+    def test_it_only_counts_the_changes_on_a_dry_run(self):
+        self.raise_schema_version()
+        migration = EventMigration(self.__database_url, upcasters=upcasters, dry_run=True)
+
+        self.assertEqual(18, migration.run().get_changed())
+        self.assertEqual({1}, {record.schema_version for record in self.get_records()})
+
+    def test_it_resumes_from_its_checkpoint(self):
+        EventMigration(self.__database_url, page_size=5, upcasters=UpcasterChain(),
+                       checkpoint_database=self.__checkpoints).run()
+
+        self.raise_schema_version()
+        report = EventMigration(self.__database_url, upcasters=upcasters,
+                                checkpoint_database=self.__checkpoints).run()
+
+        self.assertEqual(0, report.get_scanned())
+
+    def test_it_migrates_aggregate_root_ranges_in_parallel(self):
+        self.raise_schema_version()
+        migration = EventMigration(self.__database_url, page_size=2, upcasters=upcasters)
+
+        ranges = migration.get_ranges(3)
+        report = migration.run(number_of_workers=3)
+
+        self.assertEqual([(None, 'aggregate-2'), ('aggregate-2', 'aggregate-4'), ('aggregate-4', None)],
+                         ranges)
+        self.assertEqual(18, report.get_changed())
+        self.assertEqual({2}, {record.schema_version for record in self.get_records()})
+
+    def test_it_can_apply_a_schema_mapper(self):
+        self.__session.query(SqlDomainRecord).update(
+            {'domain_event_body': {'aggregate_root_id': 'x', 'an_event_property': 'y', 'removed': 1}})
+        self.__session.commit()
+
+        report = EventMigration(self.__database_url, upcasters=UpcasterChain(),
+                                versioning_type='weak-schema').run()
+
+        self.assertEqual(18, report.get_changed())
+        self.assertEqual({'aggregate_root_id': 'x', 'an_event_property': 'y'},
+                         self.get_records()[0].domain_event_body)
+        self.assertEqual({get_schema_fingerprint(EventA)},
+                         {record.schema_fingerprint for record in self.get_records()})
+
+    def test_it_does_not_map_events_without_event_versioning(self):
+        event = EventB('aggregate-6', 'my_prop')
+        event.set_aggregate_root_version(1)
+        SQLStore(self.__session).save([event], 'aggregate-6')
+        self.__session.query(SqlDomainRecord) \
+            .filter(SqlDomainRecord.aggregate_root_id == 'aggregate-6') \
+            .update({'schema_fingerprint': None})
+        self.__session.commit()
+
+        report = EventMigration(self.__database_url, upcasters=UpcasterChain(),
+                                versioning_type='weak-schema').run()
+
+        self.assertEqual(19, report.get_scanned())
+        record = self.get_records()[-1]
+        self.assertEqual({'aggregate_root_id': 'aggregate-6', 'my_prop': 'my_prop'},
+                         record.domain_event_body)
+        self.assertIsNone(record.schema_fingerprint)
+
+    def test_it_can_report_the_schema_fingerprints(self):
+        self.__session.query(SqlDomainRecord).update({'schema_fingerprint': None})
+        self.__session.commit()
+
+        report = main([self.__database_url, '--report'])
+
+        self.assertEqual([(EVENT_NAME, None, 18, False)], report)
+
+    def test_it_can_be_run_from_the_command_line(self):
+        report = main([self.__database_url, '--dry-run', '--import', 'esframework.tests.assets'])
+
+        self.assertEqual(18, report.get_scanned())
+        self.assertEqual(0, report.get_changed())
+
+
+class TestEncryptedEventMigration(unittest.TestCase):
+
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__database_url = 'sqlite:///' + os.path.join(self.__directory.name, 'events.db')
+        engine = create_engine(self.__database_url)
+        SqlDomainRecord.metadata.create_all(engine)
+        self.__session = sessionmaker(bind=engine)()
+        self.__field_encryption = FieldEncryption(InMemoryKeyStore())
+
+        store = SQLStore(self.__session, field_encryption=self.__field_encryption)
+        for aggregate_root_id in ('aggregate-1', 'aggregate-2'):
+            event = EventWithPersonalData(aggregate_root_id, 'FOO@example.org')
+            event.set_aggregate_root_version(1)
+            store.save([event], aggregate_root_id)
+
+        schema_version = mock.patch.object(EventWithPersonalData, 'schema_version', 2)
+        schema_version.start()
+        self.addCleanup(schema_version.stop)
+
+    def tearDown(self):
+        self.__session.close()
+        self.__directory.cleanup()
+
+    def get_bodies(self) -> list:
+        self.__session.expire_all()
+        return [
+            (record.aggregate_root_id, record.domain_event_body)
+            for record in self.__session.query(SqlDomainRecord).order_by(SqlDomainRecord.position)
+        ]
+
+    def test_it_upcasts_decrypted_fields_and_encrypts_them_again(self):
+        report = EventMigration(self.__database_url, upcasters=personal_data_upcasters,
+                                field_encryption=self.__field_encryption).run()
+
+        self.assertEqual(2, report.get_changed())
+        for aggregate_root_id, domain_event_body in self.get_bodies():
+            self.assertTrue(is_encrypted(domain_event_body['email']))
+            self.assertEqual('foo@example.org', self.__field_encryption.decrypt(
+                domain_event_body, aggregate_root_id)['email'])
+
+    def test_it_leaves_forgotten_aggregate_roots_as_they_are(self):
+        bodies = self.get_bodies()
+        self.__field_encryption.forget('aggregate-1')
+
+        report = EventMigration(self.__database_url, upcasters=personal_data_upcasters,
+                                field_encryption=self.__field_encryption).run()
+
+        self.assertEqual(1, report.get_changed())
+        self.assertEqual(bodies[0], self.get_bodies()[0])
+
+    def test_it_needs_field_encryption_to_upcast_encrypted_fields(self):
+        with self.assertRaises(UpcasterException):
+            EventMigration(self.__database_url, upcasters=personal_data_upcasters).run()
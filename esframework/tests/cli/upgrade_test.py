@@ -0,0 +1,82 @@
+""" event store upgrade tests """
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from esframework.cli.upgrade import main, upgrade_event_store
+from esframework.store import SQLStore
+
+CREATE_OLD_TABLE = """
+    CREATE TABLE event_store (
+        {position}
+        domain_event_id VARCHAR(36) NOT NULL {key},
+        aggregate_root_id VARCHAR(36) NOT NULL,
+        aggregate_root_version INTEGER NOT NULL,
+        domain_event_name VARCHAR(255) NOT NULL,
+        domain_event_body JSON NOT NULL,
+        store_date VARCHAR(50) NOT NULL,
+        event_date VARCHAR(50) NOT NULL,
+        correlation_id VARCHAR(36) NOT NULL,
+        causation_id VARCHAR(36) NOT NULL,
+        event_metadata JSON NOT NULL
+    )
+"""
+
+INSERT_OLD_EVENT = "INSERT INTO event_store (domain_event_id, aggregate_root_id, " \
+                   "aggregate_root_version, domain_event_name, domain_event_body, store_date, " \
+                   "event_date, correlation_id, causation_id, event_metadata) VALUES " \
+                   "(?, 'aggregate', ?, 'esframework.tests.assets.EventA', ?, ?, ?, " \
+                   "'aggregate', 'cause', '{}')"
+
+
+class TestUpgradeEventStore(unittest.TestCase):
+
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__database_url = 'sqlite:///' + os.path.join(self.__directory.name, 'events.db')
+        self.__engine = create_engine(self.__database_url)
+
+    def tearDown(self):
+        self.__engine.dispose()
+        self.__directory.cleanup()
+
+    def create_old_event_store(self, with_position: bool = False):
+        if with_position:
+            self.__engine.execute(CREATE_OLD_TABLE.format(
+                position='position INTEGER PRIMARY KEY AUTOINCREMENT,', key='UNIQUE'))
+        else:
+            self.__engine.execute(CREATE_OLD_TABLE.format(position='', key='PRIMARY KEY'))
+        for version in (2, 1):
+            self.__engine.execute(
+                INSERT_OLD_EVENT, 'event-{}'.format(version), version,
+                '{{"aggregate_root_id": "aggregate", "an_event_property": "prop{}"}}'.format(version),
+                '2019-01-0{}'.format(version), '2019-01-0{}'.format(version))
+
+    def load(self) -> list:
+        session = sessionmaker(bind=self.__engine)()
+        event_stream = SQLStore(session).read_all()
+        session.close()
+        return event_stream
+
+    def test_it_adds_positions_to_an_event_store_without_them(self):
+        self.create_old_event_store()
+
+        self.assertEqual(['add position'], main([self.__database_url]))
+
+        event_stream = self.load()
+        self.assertEqual([1, 2], [event.get_position() for event in event_stream])
+        self.assertEqual(['prop1', 'prop2'], [event.get_an_event_property() for event in event_stream])
+
+    def test_it_adds_the_schema_columns(self):
+        self.create_old_event_store(with_position=True)
+
+        self.assertEqual(['add schema_version', 'add schema_fingerprint'],
+                         upgrade_event_store(self.__engine))
+        self.assertEqual(2, len(self.load()))
+
+    def test_it_creates_a_missing_event_store(self):
+        self.assertEqual(['create table'], upgrade_event_store(self.__engine))
+        self.assertEqual([], upgrade_event_store(self.__engine))
@@ -1,7 +1,9 @@
 """ Imports """
 import unittest
 
-from esframework.tests.assets import EventA, MyTestAggregate
+from esframework.domain import handles
+from esframework.exceptions import AggregateRootOutOfSyncError, SnapshotException, UnhandledEventException
+from esframework.tests.assets import EventA, EventAV2, EventB, MyTestAggregate
 
 
 class TestAggregateRoot(unittest.TestCase):
@@ -88,3 +90,107 @@ class TestAggregateRoot(unittest.TestCase):
 
         uncommitted_events = aggregate.get_uncommitted_events()
         self.assertEqual(uncommitted_events[0].get_aggregate_root_version(), 1)
+
+    def test_it_can_create_and_restore_a_snapshot(self):
+        """ test if the state of an aggregate survives a snapshot """
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggregate = MyTestAggregate()
+        aggregate.initialize_state([
+            EventA(aggregate_root_id, 'my_prop'),
+            EventA(aggregate_root_id, 'my_prop1'),
+        ])
+
+        snapshot = aggregate.create_snapshot()
+        self.assertEqual(2, snapshot.get_aggregate_root_version())
+
+        restored = MyTestAggregate()
+        restored.restore_snapshot(snapshot)
+        self.assertEqual(restored.get_aggregate_root_id(), aggregate_root_id)
+        self.assertEqual(restored.get_aggregate_root_version(), 2)
+        self.assertEqual(
+            restored.__dict__.get('_MyTestAggregate__an_event_property'),
+            'my_prop1')
+
+    def test_it_cannot_snapshot_uncommitted_events(self):
+        """ test if a snapshot only contains committed state """
+        aggregate = MyTestAggregate.event_a(
+            'AB9850E7-B590-4A65-B513-91ABD6DC6F40', 'event_a_property')
+
+        with self.assertRaises(SnapshotException) as ex:
+            aggregate.create_snapshot()
+        self.assertEqual(
+            str(ex.exception),
+            "Cannot snapshot an aggregate root with uncommitted events")
+
+    def test_it_can_catch_up_with_newer_events(self):
+        """ test if a loaded aggregate can apply the events after its version """
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggregate = MyTestAggregate()
+        aggregate.initialize_state([EventA(aggregate_root_id, 'my_prop')])
+
+        event2 = EventA(aggregate_root_id, 'my_prop1')
+        event2.set_aggregate_root_version(2)
+        event3 = EventA(aggregate_root_id, 'my_prop2')
+        event3.set_aggregate_root_version(3)
+        aggregate.catch_up([event2, event3])
+
+        self.assertEqual(aggregate.get_aggregate_root_version(), 3)
+        self.assertEqual(
+            aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'my_prop2')
+
+    def test_it_cannot_catch_up_with_a_gap_in_versions(self):
+        """ test if catching up detects missing events """
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggregate = MyTestAggregate()
+        aggregate.initialize_state([EventA(aggregate_root_id, 'my_prop')])
+
+        event = EventA(aggregate_root_id, 'my_prop2')
+        event.set_aggregate_root_version(3)
+
+        with self.assertRaises(AggregateRootOutOfSyncError) as ex:
+            aggregate.catch_up([event])
+        self.assertEqual(
+            str(ex.exception),
+            "Event version 3 does not follow aggregate root version 1")
+
+
+class EventASubclass(EventA):
+    """ An event extending EventA without own handler """
+
+
+class MyDecoratedTestAggregate(MyTestAggregate):
+    """ An aggregate with an explicitly declared handler """
+
+    @handles(EventB)
+    def on_event_b(self, event):
+        self.applied = event.get_my_prop()
+
+
+class TestAggregateRootDispatching(unittest.TestCase):
+
+    def test_it_can_apply_explicitly_declared_handlers(self):
+        aggregate = MyDecoratedTestAggregate()
+        aggregate.initialize_state([
+            EventA('897878D0-1230-408B-A980-7A9C24EBDEFA', 'my_prop'),
+            EventB('897878D0-1230-408B-A980-7A9C24EBDEFA', 'declared'),
+        ])
+
+        self.assertEqual('declared', aggregate.applied)
+        self.assertEqual(
+            MyDecoratedTestAggregate.on_event_b,
+            MyDecoratedTestAggregate.get_event_handler(EventB))
+
+    def test_it_can_apply_events_with_the_handler_of_their_parent(self):
+        aggregate = MyTestAggregate()
+        aggregate.initialize_state([
+            EventASubclass('897878D0-1230-408B-A980-7A9C24EBDEFA', 'my_prop'),
+        ])
+        self.assertEqual(
+            aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'my_prop')
+
+    def test_it_raises_on_events_without_handler(self):
+        with self.assertRaises(UnhandledEventException) as ex:
+            MyTestAggregate().apply_event(EventAV2('897878D0', 'my_prop', 'new'))
+        self.assertEqual(str(ex.exception), "MyTestAggregate cannot apply EventAV2")
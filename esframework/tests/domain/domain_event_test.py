@@ -22,6 +22,13 @@ class TestDomainEvent(unittest.TestCase):
             domain_event.set_aggregate_root_version(1)
         self.assertEqual(str(ex.exception), "Version can only be set once!")
 
+    def test_it_cannot_set_position_twice(self):
+        domain_event = EventA("0A919B3E-5BCB-41DC-B157-8A9E2A7198BE", "foo")
+        domain_event.set_position(1)
+        with self.assertRaises(DomainEventException) as ex:
+            domain_event.set_position(2)
+        self.assertEqual(str(ex.exception), "Position can only be set once!")
+
     def test_it_cannot_set_correlation_id_twice(self):
         domain_event = EventA("0A919B3E-5BCB-41DC-B157-8A9E2A7198BE", "foo")
         domain_event.set_correlation_id("6C28E7B7-61A1-432D-8778-DA94BE334969")
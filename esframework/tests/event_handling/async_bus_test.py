@@ -0,0 +1,176 @@
+import asyncio
+import unittest
+
+from esframework.event_handling.async_bus import AsyncBus
+from esframework.exceptions import EventBusException
+from esframework.tests.assets import EventA, EventB, create_events
+from esframework.tests.assets.event_handling import EventAListener, SimpleEventListener, \
+    SlowAsyncEventListener
+
+
+class FailingOnNoneListener(EventAListener):
+    """ fails on events without an event property """
+
+    def apply_event_a(self, domain_event: EventA):
+        if domain_event.get_an_event_property() is None:
+            raise ValueError("an event property is required")
+        super().apply_event_a(domain_event)
+
+
+class TestAsyncBus(unittest.TestCase):
+    """ testing the asyncio bus """
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_it_delivers_to_coroutine_listeners_in_order(self):
+        event_listener = SlowAsyncEventListener(delay=0.001)
+        event_bus = AsyncBus()
+        event_bus.subscribe(event_listener)
+        events = create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 5)
+
+        async def scenario():
+            event_bus.emit(events)
+            self.assertEqual(0, len(event_listener.get_received_messages()))
+            await event_bus.drain()
+
+        self.run_async(scenario())
+        self.assertEqual(events, event_listener.get_received_messages())
+
+    def test_it_only_queues_events_for_listeners_handling_them(self):
+        a_listener = EventAListener()
+        catch_all_listener = SimpleEventListener()
+        event_bus = AsyncBus()
+        event_bus.subscribe(a_listener)
+        event_bus.subscribe(catch_all_listener)
+
+        async def scenario():
+            event_bus.emit([EventB("EC407041-8454-44E2-873F-951B227B3BFB", "bar")])
+            await event_bus.drain()
+
+        self.run_async(scenario())
+        self.assertEqual(0, len(a_listener.get_received_messages()))
+        self.assertEqual(1, len(catch_all_listener.get_received_messages()))
+
+    def test_it_raises_when_the_queue_is_full_with_error_policy(self):
+        event_bus = AsyncBus(max_queue_size=2, backpressure='error')
+        event_bus.subscribe(SlowAsyncEventListener())
+
+        async def scenario():
+            event_bus.emit(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 3))
+
+        with self.assertRaises(EventBusException) as error:
+            self.run_async(scenario())
+
+        self.assertEqual("Event queue of listener is full", str(error.exception))
+
+    def test_it_queues_nothing_when_a_queue_is_full_with_error_policy(self):
+        first_listener = SlowAsyncEventListener()
+        second_listener = SlowAsyncEventListener()
+        event_bus = AsyncBus(max_queue_size=2, backpressure='error')
+        event_bus.subscribe(first_listener)
+        event_bus.subscribe(second_listener)
+
+        async def scenario():
+            event_bus.emit(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 1))
+            event_bus.unsubscribe(first_listener)
+            event_bus.subscribe(first_listener)
+            with self.assertRaises(EventBusException):
+                event_bus.emit(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 2))
+            return event_bus.get_queue_sizes()
+
+        queue_sizes = self.run_async(scenario())
+        self.assertEqual({first_listener: 0, second_listener: 1}, queue_sizes)
+
+    def test_emit_does_not_raise_when_the_queue_is_full_with_block_policy(self):
+        event_listener = SlowAsyncEventListener(delay=0.001)
+        event_bus = AsyncBus(max_queue_size=1)
+        event_bus.subscribe(event_listener)
+        events = create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 5)
+
+        async def scenario():
+            event_bus.emit(events[:3])
+            event_bus.emit(events[3:])
+            await event_bus.drain()
+
+        self.run_async(scenario())
+        self.assertEqual(events, event_listener.get_received_messages())
+
+    def test_it_drops_the_oldest_events_with_drop_oldest_policy(self):
+        event_listener = SlowAsyncEventListener()
+        event_bus = AsyncBus(max_queue_size=2, backpressure='drop-oldest')
+        event_bus.subscribe(event_listener)
+        events = create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 5)
+
+        async def scenario():
+            event_bus.emit(events)
+            await event_bus.drain()
+
+        self.run_async(scenario())
+        self.assertEqual(events[3:], event_listener.get_received_messages())
+        self.assertEqual(3, event_bus.get_dropped_events())
+
+    def test_publish_waits_for_room_with_block_policy(self):
+        event_listener = SlowAsyncEventListener(delay=0.001)
+        event_bus = AsyncBus(max_queue_size=1)
+        event_bus.subscribe(event_listener)
+        events = create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 4)
+
+        async def scenario():
+            await event_bus.publish(events)
+            await event_bus.drain()
+
+        self.run_async(scenario())
+        self.assertEqual(events, event_listener.get_received_messages())
+
+    def test_it_delivers_queued_events_on_shutdown(self):
+        event_listener = SlowAsyncEventListener(delay=0.001)
+        event_bus = AsyncBus()
+        event_bus.subscribe(event_listener)
+
+        async def scenario():
+            event_bus.emit(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 3))
+            await event_bus.shutdown()
+            event_bus.emit(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 1))
+
+        with self.assertRaises(EventBusException) as error:
+            self.run_async(scenario())
+
+        self.assertEqual(3, len(event_listener.get_received_messages()))
+        self.assertEqual("Cannot emit on a bus which is shut down", str(error.exception))
+
+    def test_a_failing_listener_does_not_stop_delivery(self):
+        failures = []
+        event_listener = FailingOnNoneListener()
+        event_bus = AsyncBus(error_handler=lambda *args: failures.append(args))
+        event_bus.subscribe(event_listener)
+
+        async def scenario():
+            event_bus.emit([EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", None)])
+            event_bus.emit(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 1))
+            await event_bus.drain()
+
+        self.run_async(scenario())
+        self.assertEqual(1, len(failures))
+        self.assertEqual(1, len(event_listener.get_received_messages()))
+
+    def test_it_rejects_an_unknown_backpressure_policy(self):
+        with self.assertRaises(EventBusException) as error:
+            AsyncBus(backpressure='wait')
+
+        self.assertEqual("Unknown backpressure policy: wait", str(error.exception))
+
+    def test_it_cannot_subscribe_to_non_event_listeners(self):
+        with self.assertRaises(EventBusException):
+            AsyncBus().subscribe(object())
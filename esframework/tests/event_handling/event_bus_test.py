@@ -2,8 +2,9 @@ import unittest
 
 from esframework.event_handling.event_bus import BasicBus
 from esframework.exceptions import EventBusException
-from esframework.tests.assets import EventA
-from esframework.tests.assets.event_handling import SimpleEventListener
+from esframework.tests.assets import EventA, EventB
+from esframework.tests.assets.event_handling import BatchEventListener, EventAListener, \
+    EventBListener, SimpleEventListener
 
 
 class TestBasicBus(unittest.TestCase):
@@ -91,3 +92,52 @@ class TestBasicBus(unittest.TestCase):
             str(ex.exception),
             "domain event must be of type DomainEvent")
 
+    def test_it_only_delivers_events_to_interested_listeners(self):
+        event_a_listener = EventAListener()
+        event_b_listener = EventBListener()
+        catch_all_listener = SimpleEventListener()
+        event_bus = BasicBus()
+        event_bus.subscribe(event_a_listener)
+        event_bus.subscribe(event_b_listener)
+        event_bus.subscribe(catch_all_listener)
+
+        event_bus.emit([
+            EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "foo"),
+            EventB("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "bar"),
+            EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "baz"),
+        ])
+
+        self.assertEqual(2, len(event_a_listener.get_received_messages()))
+        self.assertEqual(1, len(event_b_listener.get_received_messages()))
+        self.assertEqual(3, len(catch_all_listener.get_received_messages()))
+        self.assertEqual(2, len(event_bus.get_receivers(EventA)))
+
+    def test_it_updates_the_routes_when_unsubscribing(self):
+        event_a_listener = EventAListener()
+        event_bus = BasicBus()
+        event_bus.subscribe(event_a_listener)
+        self.assertEqual(1, len(event_bus.get_receivers(EventA)))
+
+        event_bus.unsubscribe(event_a_listener)
+        event_bus.emit([EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "foo")])
+
+        self.assertEqual([], event_bus.get_receivers(EventA))
+        self.assertEqual(0, len(event_a_listener.get_received_messages()))
+
+    def test_it_hands_batch_listeners_the_whole_stream(self):
+        batch_listener = BatchEventListener()
+        event_a_listener = EventAListener()
+        event_bus = BasicBus()
+        event_bus.subscribe(batch_listener)
+        event_bus.subscribe(event_a_listener)
+
+        event_bus.emit([
+            EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "foo"),
+            EventB("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "bar"),
+        ])
+        event_bus.emit([])
+
+        self.assertEqual(1, len(batch_listener.get_received_batches()))
+        self.assertEqual(2, len(batch_listener.get_received_batches()[0]))
+        self.assertEqual(1, len(event_a_listener.get_received_messages()))
+        self.assertEqual(1, len(event_bus.get_receivers(EventA)))
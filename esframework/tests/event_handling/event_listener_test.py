@@ -1,8 +1,12 @@
 """ event listener unit test file """
+import time
 import unittest
 
-from esframework.event_handling.event_listener import EventListener
+from esframework.event_handling.event_listener import BatchingEventListener, EventListener
 from esframework.exceptions import EventListenerException
+from esframework.tests.assets import EventA, EventB, create_events
+from esframework.tests.assets.event_handling import BatchEventListener, EventAListener, \
+    EventBListener
 
 
 class EventListenerTest(unittest.TestCase):
@@ -15,4 +19,73 @@ class EventListenerTest(unittest.TestCase):
             event_listener.receive(object())
         self.assertEqual(str(ex.exception), "Incoming event is not a domain event")
 
+    def test_it_applies_events_by_convention(self):
+        event_listener = EventAListener()
+        event_listener.receive(EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "foo"))
+        event_listener.receive(EventB("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "bar"))
+        self.assertEqual(1, len(event_listener.get_received_messages()))
 
+    def test_it_applies_explicitly_declared_events(self):
+        event_listener = EventBListener()
+        event_listener.receive(EventB("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "bar"))
+        self.assertEqual(1, len(event_listener.get_received_messages()))
+        self.assertIsNone(event_listener.get_receiver(EventA))
+        self.assertIsNotNone(event_listener.get_receiver(EventB))
+
+    def test_it_receives_a_batch_one_event_at_a_time_by_default(self):
+        event_listener = EventAListener()
+        event_listener.receive_batch([
+            EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "foo"),
+            EventB("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "bar"),
+        ])
+        self.assertEqual(1, len(event_listener.get_received_messages()))
+        self.assertIsNone(event_listener.get_batch_receiver())
+
+    def test_a_batch_listener_receives_single_events_as_a_batch(self):
+        event_listener = BatchEventListener()
+        receiver = event_listener.get_receiver(EventA)
+        receiver(EventA("792E4DDA-5AE2-4BF3-A834-62D09892DC62", "foo"))
+
+        self.assertEqual(1, len(event_listener.get_received_batches()))
+        self.assertIsNotNone(event_listener.get_batch_receiver())
+
+
+class BatchingEventListenerTest(unittest.TestCase):
+    """ testing the batching wrapper """
+
+    def test_it_flushes_when_the_batch_is_full(self):
+        event_listener = BatchEventListener()
+        batching_listener = BatchingEventListener(event_listener, max_batch_size=5)
+
+        batching_listener.receive_batch(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 3))
+        self.assertEqual(0, len(event_listener.get_received_batches()))
+
+        batching_listener.receive_batch(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 3))
+        self.assertEqual(1, len(event_listener.get_received_batches()))
+        self.assertEqual(6, len(event_listener.get_received_batches()[0]))
+        self.assertEqual(0, batching_listener.get_pending_events())
+
+    def test_it_flushes_after_the_time_window(self):
+        event_listener = BatchEventListener()
+        batching_listener = BatchingEventListener(event_listener, max_batch_size=100, max_wait=0.01)
+
+        batching_listener.receive_batch(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 2))
+        time.sleep(0.1)
+
+        self.assertEqual(1, len(event_listener.get_received_batches()))
+        self.assertEqual(2, len(event_listener.get_received_batches()[0]))
+
+    def test_it_can_be_flushed_explicitly(self):
+        event_listener = EventAListener()
+        batching_listener = BatchingEventListener(event_listener)
+
+        batching_listener.receive_batch(create_events("792E4DDA-5AE2-4BF3-A834-62D09892DC62", 2))
+        self.assertEqual(0, len(event_listener.get_received_messages()))
+
+        batching_listener.flush()
+        self.assertEqual(2, len(event_listener.get_received_messages()))
+
+    def test_it_can_only_batch_event_listeners(self):
+        with self.assertRaises(EventListenerException) as ex:
+            BatchingEventListener(object())
+        self.assertEqual(str(ex.exception), "Only classes based on EventListener can be batched")
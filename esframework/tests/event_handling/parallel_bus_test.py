@@ -0,0 +1,163 @@
+import threading
+import unittest
+
+from esframework.event_handling.event_listener import EventListener
+from esframework.event_handling.parallel_bus import ParallelBus
+from esframework.exceptions import EventBusException
+from esframework.tests.assets import EventA, EventB
+from esframework.tests.assets.event_handling import BatchEventListener, EventAListener
+
+
+def correlated(domain_event):
+    """ sets the correlation id of an event like the stores do on save """
+    domain_event.set_correlation_id(domain_event.get_aggregate_root_id())
+    return domain_event
+
+
+class RecordingListener(EventListener):
+    """ records the properties of EventA per aggregate root id """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = {}
+
+    def apply_event_a(self, domain_event: EventA):
+        with self.lock:
+            self.received.setdefault(domain_event.get_aggregate_root_id(), []).append(
+                domain_event.get_an_event_property())
+
+
+class BlockingListener(EventListener):
+    """ blocks delivery until it is released """
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def apply_event_a(self, domain_event: EventA):
+        self.release.wait(5)
+
+
+class FailingListener(EventListener):
+    """ fails on every EventA """
+
+    def apply_event_a(self, domain_event: EventA):
+        raise ValueError("cannot apply {}".format(domain_event))
+
+
+class TestParallelBus(unittest.TestCase):
+    """ testing the thread pool bus """
+
+    def setUp(self):
+        self.event_bus = ParallelBus(number_of_lanes=4)
+
+    def tearDown(self):
+        self.event_bus.shutdown()
+
+    def test_it_keeps_the_order_per_aggregate_root(self):
+        event_listener = RecordingListener()
+        self.event_bus.subscribe(event_listener)
+        aggregate_root_ids = ['aggregate-{}'.format(index) for index in range(10)]
+
+        for version in range(50):
+            self.event_bus.emit([
+                correlated(EventA(aggregate_root_id, version))
+                for aggregate_root_id in aggregate_root_ids
+            ])
+        self.event_bus.drain()
+
+        self.assertEqual(set(aggregate_root_ids), set(event_listener.received.keys()))
+        for properties in event_listener.received.values():
+            self.assertEqual(list(range(50)), properties)
+
+    def test_it_routes_an_aggregate_root_to_a_single_lane(self):
+        lane = self.event_bus.get_lane('792E4DDA-5AE2-4BF3-A834-62D09892DC62')
+
+        self.assertEqual(lane, self.event_bus.get_lane('792E4DDA-5AE2-4BF3-A834-62D09892DC62'))
+        self.assertIn(lane, range(4))
+
+    def test_it_reports_the_queue_depth_per_lane(self):
+        event_listener = BlockingListener()
+        self.event_bus.subscribe(event_listener)
+        aggregate_root_id = '792E4DDA-5AE2-4BF3-A834-62D09892DC62'
+        lane = self.event_bus.get_lane(aggregate_root_id)
+
+        self.event_bus.emit([
+            correlated(EventA(aggregate_root_id, 'foo')),
+            correlated(EventA(aggregate_root_id, 'bar')),
+        ])
+        self.assertEqual(2, self.event_bus.get_queue_depths()[lane])
+
+        event_listener.release.set()
+        self.event_bus.drain()
+        self.assertEqual([0, 0, 0, 0], self.event_bus.get_queue_depths())
+
+    def test_it_only_delivers_to_listeners_handling_the_event(self):
+        event_listener = EventAListener()
+        self.event_bus.subscribe(event_listener)
+
+        self.event_bus.emit([correlated(EventB('792E4DDA-5AE2-4BF3-A834-62D09892DC62', 'foo'))])
+        self.event_bus.drain()
+
+        self.assertEqual(0, len(event_listener.get_received_messages()))
+        self.assertEqual([0, 0, 0, 0], self.event_bus.get_queue_depths())
+
+    def test_it_hands_batch_listeners_the_events_per_lane(self):
+        event_listener = BatchEventListener()
+        self.event_bus.subscribe(event_listener)
+        aggregate_root_id = '792E4DDA-5AE2-4BF3-A834-62D09892DC62'
+
+        self.event_bus.emit([
+            correlated(EventA(aggregate_root_id, 'foo')),
+            correlated(EventB(aggregate_root_id, 'bar')),
+        ])
+        self.event_bus.drain()
+
+        self.assertEqual(1, len(event_listener.get_received_batches()))
+        self.assertEqual(2, len(event_listener.get_received_batches()[0]))
+
+    def test_a_failing_listener_is_reported_to_the_error_handler(self):
+        failures = []
+        event_listener = EventAListener()
+        event_bus = ParallelBus(error_handler=lambda *args: failures.append(args))
+        event_bus.subscribe(FailingListener())
+        event_bus.subscribe(event_listener)
+
+        event_bus.emit([correlated(EventA('792E4DDA-5AE2-4BF3-A834-62D09892DC62', 'foo'))])
+        event_bus.shutdown()
+
+        self.assertEqual(1, len(failures))
+        self.assertIsInstance(failures[0][2], ValueError)
+        self.assertEqual(1, len(event_listener.get_received_messages()))
+
+    def test_it_cannot_emit_after_shutdown(self):
+        self.event_bus.shutdown()
+
+        with self.assertRaises(EventBusException) as error:
+            self.event_bus.emit([correlated(EventA('792E4DDA-5AE2-4BF3-A834-62D09892DC62', 'foo'))])
+
+        self.assertEqual("Cannot emit on a bus which is shut down", str(error.exception))
+
+    def test_it_emits_nothing_when_an_event_has_no_partition_key(self):
+        listener = RecordingListener()
+        self.event_bus.subscribe(listener)
+
+        with self.assertRaises(EventBusException):
+            self.event_bus.emit([
+                correlated(EventA('792E4DDA-5AE2-4BF3-A834-62D09892DC62', 'foo')),
+                EventA('792E4DDA-5AE2-4BF3-A834-62D09892DC62', 'bar'),
+            ])
+        self.event_bus.drain()
+        self.assertEqual({}, listener.received)
+
+    def test_it_can_route_by_another_partition_key(self):
+        listener = RecordingListener()
+        event_bus = ParallelBus(partition_key=lambda domain_event: domain_event.get_aggregate_root_id())
+        event_bus.subscribe(listener)
+
+        event_bus.emit([EventA('792E4DDA-5AE2-4BF3-A834-62D09892DC62', 'foo')])
+        event_bus.shutdown()
+        self.assertEqual({'792E4DDA-5AE2-4BF3-A834-62D09892DC62': ['foo']}, listener.received)
+
+    def test_it_needs_a_lane(self):
+        with self.assertRaises(EventBusException):
+            ParallelBus(number_of_lanes=0)
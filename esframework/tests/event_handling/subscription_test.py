@@ -0,0 +1,147 @@
+""" catch up subscription unit test file """
+import os
+import tempfile
+import unittest
+
+from esframework.event_handling.checkpoint import InMemoryCheckpointStore, SqliteCheckpointStore
+from esframework.event_handling.event_bus import BasicBus
+from esframework.event_handling.subscription import CatchUpSubscription
+from esframework.store import InMemoryStore
+from esframework.store.sqlite import SqliteStore
+from esframework.tests.assets import create_events
+from esframework.tests.assets.event_handling import BatchEventListener, EventAListener
+
+
+def get_properties(events) -> list:
+    return [event.get_an_event_property() for event in events]
+
+
+class TestCatchUpSubscription(unittest.TestCase):
+    """ testing catch up subscriptions """
+
+    def setUp(self):
+        self.__store = InMemoryStore()
+        self.__checkpoint_store = InMemoryCheckpointStore()
+
+    def test_it_catches_up_in_pages_and_commits_its_checkpoint(self):
+        self.__store.save(create_events('aggregate-1', 5), 'aggregate-1')
+        self.__store.save(create_events('aggregate-2', 2), 'aggregate-2')
+        event_listener = BatchEventListener()
+        subscription = CatchUpSubscription(
+            'projection', self.__store, event_listener, self.__checkpoint_store, page_size=3)
+
+        self.assertEqual(7, subscription.catch_up())
+        self.assertEqual([3, 3, 1], [len(batch) for batch in event_listener.get_received_batches()])
+        self.assertEqual(7, subscription.get_position())
+        self.assertEqual(7, self.__checkpoint_store.load('projection'))
+        self.assertEqual(0, subscription.catch_up())
+
+    def test_it_continues_from_its_checkpoint(self):
+        self.__store.save(create_events('aggregate-1', 5), 'aggregate-1')
+        self.__checkpoint_store.save('projection', 3)
+        event_listener = EventAListener()
+        subscription = CatchUpSubscription(
+            'projection', self.__store, event_listener, self.__checkpoint_store)
+
+        subscription.catch_up()
+
+        self.assertEqual(['prop4', 'prop5'], get_properties(event_listener.get_received_messages()))
+
+    def test_it_commits_the_checkpoint_per_interval(self):
+        self.__store.save(create_events('aggregate-1', 10), 'aggregate-1')
+        checkpoints = []
+
+        class RecordingCheckpointStore(InMemoryCheckpointStore):
+            def save(self, subscription_name, position):
+                checkpoints.append(position)
+                super().save(subscription_name, position)
+
+        subscription = CatchUpSubscription(
+            'projection', self.__store, EventAListener(), RecordingCheckpointStore(),
+            page_size=2, checkpoint_interval=4)
+        subscription.catch_up()
+
+        self.assertEqual([4, 8, 10], checkpoints)
+
+    def test_it_switches_to_live_events_after_catching_up(self):
+        event_bus = BasicBus()
+        self.__store.save(create_events('aggregate-1', 2), 'aggregate-1')
+        event_listener = EventAListener()
+        subscription = CatchUpSubscription(
+            'projection', self.__store, event_listener, self.__checkpoint_store)
+
+        self.assertEqual(2, subscription.start(event_bus))
+
+        live_events = create_events('aggregate-1', 2, 3)
+        self.__store.save(live_events, 'aggregate-1')
+        event_bus.emit(live_events)
+        event_bus.emit(live_events)
+
+        self.assertEqual(['prop1', 'prop2', 'prop3', 'prop4'],
+                         get_properties(event_listener.get_received_messages()))
+
+        subscription.stop(event_bus)
+        self.assertEqual(4, self.__checkpoint_store.load('projection'))
+        self.assertEqual([], event_bus.get_event_listeners())
+
+    def test_it_reads_the_store_when_live_events_have_a_gap(self):
+        event_bus = BasicBus()
+        event_listener = EventAListener()
+        subscription = CatchUpSubscription(
+            'projection', self.__store, event_listener, self.__checkpoint_store)
+        subscription.start(event_bus)
+
+        missed_events = create_events('aggregate-1', 2)
+        self.__store.save(missed_events, 'aggregate-1')
+        live_events = create_events('aggregate-1', 1, 3)
+        self.__store.save(live_events, 'aggregate-1')
+        event_bus.emit(live_events)
+
+        self.assertEqual(['prop1', 'prop2', 'prop3'],
+                         get_properties(event_listener.get_received_messages()))
+
+    def test_it_can_be_reset_for_a_rebuild(self):
+        self.__store.save(create_events('aggregate-1', 3), 'aggregate-1')
+        event_listener = EventAListener()
+        subscription = CatchUpSubscription(
+            'projection', self.__store, event_listener, self.__checkpoint_store)
+        subscription.catch_up()
+
+        subscription.reset()
+        subscription.catch_up()
+
+        self.assertEqual(6, len(event_listener.get_received_messages()))
+
+    def test_it_follows_a_store_without_positions_on_save(self):
+        store = SqliteStore(':memory:')
+        event_bus = BasicBus()
+        event_listener = EventAListener()
+        subscription = CatchUpSubscription(
+            'projection', store, event_listener, self.__checkpoint_store)
+        subscription.start(event_bus)
+
+        live_events = create_events('aggregate-1', 2)
+        store.save(live_events, 'aggregate-1')
+        event_bus.emit(live_events)
+        store.close()
+
+        self.assertEqual(['prop1', 'prop2'], get_properties(event_listener.get_received_messages()))
+        self.assertEqual(2, subscription.get_position())
+
+
+class TestSqliteCheckpointStore(unittest.TestCase):
+    """ testing the sqlite checkpoint store """
+
+    def test_it_can_store_and_reload_checkpoints(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'checkpoints.db')
+            checkpoint_store = SqliteCheckpointStore(database)
+            self.assertEqual(0, checkpoint_store.load('projection'))
+
+            checkpoint_store.save('projection', 10)
+            checkpoint_store.save('projection', 20)
+            checkpoint_store.close()
+
+            checkpoint_store = SqliteCheckpointStore(database)
+            self.assertEqual(20, checkpoint_store.load('projection'))
+            checkpoint_store.close()
@@ -2,7 +2,7 @@
 import unittest
 
 from esframework.exceptions import EncryptionCodecError
-from esframework.preprocessing.encryption import EncryptingCodec
+from esframework.preprocessing.encryption import AESGCMCodec, EncryptingCodec
 
 
 class TestEncryptionCodec(unittest.TestCase):
@@ -45,3 +45,56 @@ class TestEncryptionCodec(unittest.TestCase):
             codec.decrypt('NK53WRO3t+a7QKEl8Um+7j6Hmd/5ZH7sgtVSYp6gL+g='),
             'foobarbaz'
         )
+
+
+class TestAESGCMCodec(unittest.TestCase):
+    """ AESGCMCodec tests """
+
+    def setUp(self):
+        self.__encryption_key = "5BnzddAoY36fAxnAyQQvJn3Ag5VqPAML"
+        self.__codec = AESGCMCodec(encryption_key=self.__encryption_key)
+
+    def test_it_can_encrypt_with_a_known_nonce(self):
+        self.assertEqual(
+            '00000000000000000000000003a7ee5aba0090d4ccf6d8dd4f2410f301134131a518469308',
+            self.__codec.encrypt("foobarbaz", nonce=bytes(12)).hex()
+        )
+
+    def test_it_can_decrypt_bytes_and_memoryviews(self):
+        encrypted = self.__codec.encrypt(b"foobarbaz")
+
+        self.assertEqual(b"foobarbaz", self.__codec.decrypt(encrypted))
+        self.assertEqual(b"foobarbaz", self.__codec.decrypt(memoryview(encrypted)))
+        self.assertEqual(b"foobarbaz", self.__codec.decrypt(self.__codec.encrypt(memoryview(b"foobarbaz"))))
+
+    def test_it_uses_a_new_nonce_for_every_message(self):
+        self.assertNotEqual(self.__codec.encrypt("foobarbaz"), self.__codec.encrypt("foobarbaz"))
+
+    def test_it_rejects_tampered_data(self):
+        encrypted = bytearray(self.__codec.encrypt("foobarbaz"))
+        encrypted[14] ^= 1
+
+        with self.assertRaises(EncryptionCodecError) as ex:
+            self.__codec.decrypt(encrypted)
+        self.assertEqual(str(ex.exception), "Encrypted data could not be authenticated")
+
+    def test_it_authenticates_the_associated_data(self):
+        encrypted = self.__codec.encrypt("foobarbaz", associated_data=b"aggregate-1")
+
+        self.assertEqual(b"foobarbaz", self.__codec.decrypt(encrypted, associated_data=b"aggregate-1"))
+        with self.assertRaises(EncryptionCodecError):
+            self.__codec.decrypt(encrypted, associated_data=b"aggregate-2")
+
+    def test_it_accepts_text_and_bytes_like_messages(self):
+        messages = [b"foo", "bar", memoryview(b"baz")]
+
+        encrypted = [self.__codec.encrypt(message) for message in messages]
+
+        self.assertEqual(3, len(set(message[:AESGCMCodec.NONCE_SIZE] for message in encrypted)))
+        self.assertEqual([b"foo", b"bar", b"baz"], [self.__codec.decrypt(message) for message in encrypted])
+
+    def test_it_must_have_an_encryption_key_of_32_chars(self):
+        with self.assertRaises(EncryptionCodecError) as ex:
+            AESGCMCodec(encryption_key=b"AAAA")
+        self.assertEqual(
+            str(ex.exception), "Encryption key does not have the correct length of 32 characters.")
@@ -0,0 +1,119 @@
+""" Test for field encryption """
+import os
+import tempfile
+import unittest
+
+from esframework.exceptions import EncryptionCodecError
+from esframework.preprocessing.encryption import (
+    EncryptedBody, FieldEncryption, is_encrypted)
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore, SqliteKeyStore
+
+
+class CountingKeyStore(InMemoryKeyStore):
+    """ key store counting the keys loaded from it """
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = 0
+
+    def load(self, aggregate_root_id: str) -> bytes:
+        self.loaded += 1
+        return super().load(aggregate_root_id)
+
+
+class TestFieldEncryption(unittest.TestCase):
+    """ FieldEncryption tests """
+
+    def setUp(self):
+        self.__key_store = CountingKeyStore()
+        self.__field_encryption = FieldEncryption(self.__key_store)
+        self.__event_body = {'aggregate_root_id': 'A', 'email': 'foo@example.org', 'age': 42}
+
+    def test_it_only_encrypts_the_given_fields(self):
+        event_body = self.__field_encryption.encrypt(self.__event_body, ['email', 'age'], 'A')
+
+        self.assertEqual('A', event_body['aggregate_root_id'])
+        self.assertTrue(is_encrypted(event_body['email']))
+        self.assertTrue(is_encrypted(event_body['age']))
+        self.assertEqual('foo@example.org', self.__event_body['email'])
+
+    def test_it_can_decrypt_fields(self):
+        event_body = self.__field_encryption.encrypt(self.__event_body, ['email', 'age'], 'A')
+
+        decrypted_body = self.__field_encryption.decrypt(event_body, 'A')
+        self.assertIsInstance(decrypted_body, EncryptedBody)
+        self.assertEqual(self.__event_body, dict(decrypted_body))
+
+    def test_it_returns_bodies_without_encrypted_fields_as_is(self):
+        self.assertIs(self.__event_body, self.__field_encryption.decrypt(self.__event_body, 'A'))
+        self.assertIs(self.__event_body, self.__field_encryption.encrypt(self.__event_body, ['name'], 'A'))
+
+    def test_it_decrypts_fields_when_they_are_read(self):
+        event_body = FieldEncryption(self.__key_store).encrypt(self.__event_body, ['email'], 'A')
+        self.__key_store.loaded = 0
+
+        decrypted_body = self.__field_encryption.decrypt(event_body, 'A')
+        self.assertEqual('A', decrypted_body['aggregate_root_id'])
+        self.assertEqual(0, self.__key_store.loaded)
+
+        self.assertEqual('foo@example.org', decrypted_body['email'])
+        self.assertEqual('foo@example.org', decrypted_body['email'])
+        self.assertEqual(1, self.__key_store.loaded)
+
+    def test_it_keeps_the_codecs_of_the_least_recently_used_aggregate_roots(self):
+        field_encryption = FieldEncryption(self.__key_store, cache_size=1)
+        event_body_a = field_encryption.encrypt(self.__event_body, ['email'], 'A')
+        event_body_b = field_encryption.encrypt(self.__event_body, ['email'], 'B')
+        self.__key_store.loaded = 0
+
+        field_encryption.decrypt(event_body_b, 'B')['email']
+        self.assertEqual(0, self.__key_store.loaded)
+        field_encryption.decrypt(event_body_a, 'A')['email']
+        self.assertEqual(1, self.__key_store.loaded)
+        field_encryption.decrypt(event_body_b, 'B')['email']
+        self.assertEqual(2, self.__key_store.loaded)
+
+    def test_it_reads_fields_of_forgotten_aggregate_roots_as_none(self):
+        event_body = self.__field_encryption.encrypt(self.__event_body, ['email'], 'A')
+        self.__field_encryption.forget('A')
+
+        decrypted_body = self.__field_encryption.decrypt(event_body, 'A')
+        self.assertIsNone(decrypted_body['email'])
+        self.assertEqual(42, decrypted_body['age'])
+
+    def test_it_authenticates_the_aggregate_root_and_field(self):
+        event_body = self.__field_encryption.encrypt(self.__event_body, ['email', 'age'], 'A')
+        event_body['age'] = event_body['email']
+
+        with self.assertRaises(EncryptionCodecError):
+            self.__field_encryption.decrypt(event_body, 'A')['age']
+
+    def test_it_needs_a_positive_cache_size(self):
+        with self.assertRaises(ValueError):
+            FieldEncryption(self.__key_store, cache_size=0)
+
+
+class TestSqliteKeyStore(unittest.TestCase):
+    """ SqliteKeyStore tests """
+
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__database = os.path.join(self.__directory.name, 'keys.db')
+
+    def tearDown(self):
+        self.__directory.cleanup()
+
+    def test_it_can_create_load_and_delete_keys(self):
+        key_store = SqliteKeyStore(self.__database)
+        self.assertIsNone(key_store.load('A'))
+
+        encryption_key = key_store.create('A')
+        self.assertEqual(32, len(encryption_key))
+        self.assertEqual(encryption_key, key_store.create('A'))
+        key_store.close()
+
+        key_store = SqliteKeyStore(self.__database)
+        self.assertEqual(encryption_key, key_store.load('A'))
+        key_store.delete('A')
+        self.assertIsNone(key_store.load('A'))
+        key_store.close()
@@ -1,7 +1,10 @@
 """ testing the event versioning decorator """
 import unittest
 
-from esframework.tests.assets import EventA
+from esframework.exceptions import SchemaMapperException
+from esframework.preprocessing.schema import (
+    SchemaMapperFactory, event_versioning, get_schema_fingerprint, is_schema_versioned)
+from esframework.tests.assets import EventA, EventAV2, EventAV3, EventAV4
 
 
 class TestProcessWeakSchema(unittest.TestCase):
@@ -13,3 +16,29 @@ class TestProcessWeakSchema(unittest.TestCase):
             'an_event_property': 'foobar'
         }
         self.assertEqual('x', event.deserialize(serialized).get_aggregate_root_id())
+
+    def test_it_resolves_the_mapper_when_decorating(self):
+        with self.assertRaises(SchemaMapperException) as ex:
+            event_versioning('strong-schema')
+        self.assertEqual(str(ex.exception), 'Versioning type does not exist')
+
+    def test_it_can_deserialize_with_another_schema_mapper(self):
+        serialized = {
+            'aggregate_root_id': 'x',
+            'an_event_property': 'foobar',
+            'removed_property': 'foo'
+        }
+        mapper = SchemaMapperFactory.factory('passthrough')
+
+        self.assertEqual('foobar', EventA.deserialize(serialized, schema_mapper=mapper).get_an_event_property())
+        self.assertIs(serialized, mapper.map(serialized, EventA))
+        self.assertTrue(is_schema_versioned(EventA))
+        self.assertFalse(is_schema_versioned(EventAV2))
+
+    def test_it_fingerprints_the_schema_of_an_event_class(self):
+        fingerprint = get_schema_fingerprint(EventA)
+
+        self.assertEqual(40, len(fingerprint))
+        self.assertEqual(fingerprint, get_schema_fingerprint(EventA))
+        self.assertNotEqual(fingerprint, get_schema_fingerprint(EventAV2))
+        self.assertNotEqual(get_schema_fingerprint(EventAV3), get_schema_fingerprint(EventAV4))
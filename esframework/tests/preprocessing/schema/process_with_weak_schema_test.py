@@ -167,3 +167,54 @@ class TestProcessWeakSchema(unittest.TestCase):
 
         output = processor.map(serialized_data, EventAV3.__dict__)
         self.assertDictEqual(expected_output_data, output)
+
+    def test_it_compiles_the_plan_of_an_event_class_once(self):
+        processor = WeakSchemaMapper()
+
+        plan = processor.get_plan(EventAV3)
+
+        self.assertIs(plan, processor.get_plan(EventAV3))
+        self.assertIsNot(plan, processor.get_plan(EventAV4))
+        self.assertEqual({'aggregate_root_id', 'an_event_property', 'new_property', 'new_dict_prop'},
+                         plan.keys)
+
+    def test_it_maps_schemas_with_the_same_keys_to_their_own_defaults(self):
+        processor = WeakSchemaMapper()
+
+        self.assertEqual({'x': 'd1'}, processor.map({}, {'x': 'd1'}, cleaning=False))
+        self.assertEqual({'x': 'd2'}, processor.map({}, {'x': 'd2'}, cleaning=False))
+
+        first_event = type('SameNamedEvent', (object,), {'_SameNamedEvent__x': 'd1'})
+        second_event = type('SameNamedEvent', (object,), {'_SameNamedEvent__x': 'd2'})
+        self.assertEqual({'x': 'd1'}, processor.map({}, first_event))
+        self.assertEqual({'x': 'd2'}, processor.map({}, second_event))
+
+    def test_it_returns_data_matching_the_schema_as_is(self):
+        processor = WeakSchemaMapper()
+        serialized_data = {
+            'aggregate_root_id': '61C99C6A-D7E8-4C2F-8290-97B3CFB360B6',
+            'an_event_property': 'foo',
+            'new_property': 'bar',
+            'new_dict_prop': {
+                'some_key_one': 'dict_value_one',
+                'some_key_two': 'dict_value_two'
+            }
+        }
+
+        self.assertIs(serialized_data, processor.map(serialized_data, EventAV3.__dict__))
+
+        serialized_data['new_dict_prop'] = {'some_key_one': 'dict_value_one'}
+        output = processor.map(serialized_data, EventAV3.__dict__)
+        self.assertIsNot(serialized_data, output)
+        self.assertEqual('dict_value_two', output['new_dict_prop']['some_key_two'])
+
+    def test_it_can_map_with_the_event_class(self):
+        processor = WeakSchemaMapper()
+        serialized_data = {
+            'aggregate_root_id': '61C99C6A-D7E8-4C2F-8290-97B3CFB360B6',
+            'an_event_property': 'foo',
+        }
+
+        output = processor.map(serialized_data, EventAV2)
+        self.assertEqual('My default value', output['new_property'])
+        self.assertIs(processor.get_plan(EventAV2), processor.get_plan(EventAV2))
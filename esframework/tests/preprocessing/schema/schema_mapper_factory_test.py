@@ -7,6 +7,9 @@ from esframework.preprocessing.schema import SchemaMapperFactory, WeakSchemaMapp
 
 class TestProcessWeakSchema(unittest.TestCase):
 
+    def tearDown(self):
+        SchemaMapperFactory.unregister('custom-schema')
+
     def test_it_can_return_weak_schema_mapper(self):
         mapper = SchemaMapperFactory.factory('weak-schema')
         self.assertIsInstance(mapper, WeakSchemaMapper)
@@ -15,3 +18,25 @@ class TestProcessWeakSchema(unittest.TestCase):
         with self.assertRaises(SchemaMapperException) as ex:
             SchemaMapperFactory.factory('strong-schema')
         self.assertEqual(str(ex.exception),'Versioning type does not exist')
+
+    def test_it_returns_a_shared_mapper(self):
+        self.assertIs(SchemaMapperFactory.factory('weak-schema'),
+                      SchemaMapperFactory.factory('weak-schema'))
+
+    def test_it_can_register_a_versioning_type(self):
+        mapper = WeakSchemaMapper()
+        SchemaMapperFactory.register('custom-schema', mapper)
+
+        self.assertIs(mapper, SchemaMapperFactory.factory('custom-schema'))
+
+    def test_it_can_unregister_a_versioning_type(self):
+        SchemaMapperFactory.register('custom-schema', WeakSchemaMapper())
+        SchemaMapperFactory.unregister('custom-schema')
+
+        with self.assertRaises(SchemaMapperException):
+            SchemaMapperFactory.factory('custom-schema')
+
+    def test_it_can_only_register_schema_mappers(self):
+        with self.assertRaises(SchemaMapperException) as ex:
+            SchemaMapperFactory.register('custom-schema', object())
+        self.assertEqual(str(ex.exception), 'Mapper must be based on SchemaMapper')
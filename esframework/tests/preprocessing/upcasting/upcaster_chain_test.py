@@ -0,0 +1,76 @@
+""" upcaster chain tests """
+import unittest
+
+from esframework.exceptions import UpcasterException
+from esframework.preprocessing.upcasting import UpcasterChain
+
+EVENT_NAME = 'esframework.tests.assets.PersonRegistered'
+
+
+def merge_names(event_data: dict) -> dict:
+    """ version 1 had a first and last name, version 2 a full name """
+    return {
+        'aggregate_root_id': event_data['aggregate_root_id'],
+        'full_name': '{} {}'.format(event_data['first_name'], event_data['last_name']),
+    }
+
+
+def rename_full_name(event_data: dict) -> dict:
+    """ version 3 renamed the full name to name """
+    return {
+        'aggregate_root_id': event_data['aggregate_root_id'],
+        'name': event_data['full_name'],
+    }
+
+
+class TestUpcasterChain(unittest.TestCase):
+
+    def setUp(self):
+        self.chain = UpcasterChain()
+        self.chain.register(EVENT_NAME, 1, merge_names)
+        self.chain.register(EVENT_NAME, 2)(rename_full_name)
+
+    def test_it_upcasts_to_the_latest_version(self):
+        event_data = {'aggregate_root_id': 'x', 'first_name': 'Ada', 'last_name': 'Lovelace'}
+
+        self.assertEqual({'aggregate_root_id': 'x', 'name': 'Ada Lovelace'},
+                         self.chain.upcast(EVENT_NAME, 1, event_data, 3))
+        self.assertEqual({'aggregate_root_id': 'x', 'name': 'Ada Lovelace'},
+                         self.chain.upcast(EVENT_NAME, 2, merge_names(event_data), 3))
+        self.assertEqual({'aggregate_root_id': 'x', 'full_name': 'Ada Lovelace'},
+                         self.chain.upcast(EVENT_NAME, 1, event_data, 2))
+
+    def test_it_composes_an_upcaster_once_per_version(self):
+        upcaster = self.chain.get_upcaster(EVENT_NAME, 1, 3)
+
+        self.assertIs(upcaster, self.chain.get_upcaster(EVENT_NAME, 1, 3))
+        self.assertIs(rename_full_name, self.chain.get_upcaster(EVENT_NAME, 2, 3))
+
+    def test_it_skips_events_at_the_latest_version(self):
+        event_data = {'aggregate_root_id': 'x', 'name': 'Ada Lovelace'}
+
+        self.assertIsNone(self.chain.get_upcaster(EVENT_NAME, 3, 3))
+        self.assertIsNone(self.chain.get_upcaster('esframework.tests.assets.EventA', 1, 1))
+        self.assertIs(event_data, self.chain.upcast(EVENT_NAME, 3, event_data, 3))
+
+    def test_it_cannot_register_two_upcasters_from_a_version(self):
+        with self.assertRaises(UpcasterException) as ex:
+            self.chain.register(EVENT_NAME, 1, merge_names)
+        self.assertEqual(str(ex.exception), EVENT_NAME + ' already has an upcaster from version 1')
+
+    def test_it_raises_on_a_missing_version(self):
+        self.chain.register(EVENT_NAME, 4, rename_full_name)
+
+        with self.assertRaises(UpcasterException) as ex:
+            self.chain.get_upcaster(EVENT_NAME, 1, 5)
+        self.assertEqual(str(ex.exception), EVENT_NAME + ' has no upcaster from version 3')
+
+    def test_it_raises_when_the_chain_does_not_reach_the_target_version(self):
+        with self.assertRaises(UpcasterException) as ex:
+            self.chain.get_upcaster(EVENT_NAME, 1, 4)
+        self.assertEqual(str(ex.exception), EVENT_NAME + ' has no upcaster from version 3')
+
+    def test_it_raises_on_a_body_newer_than_the_target_version(self):
+        with self.assertRaises(UpcasterException) as ex:
+            self.chain.get_upcaster(EVENT_NAME, 3, 2)
+        self.assertEqual(str(ex.exception), EVENT_NAME + ' is stored at version 3 which is newer than version 2')
@@ -0,0 +1,85 @@
+""" parallel projection rebuild unit test file """
+import functools
+import os
+import tempfile
+import unittest
+
+from esframework.exceptions import ProjectionException
+from esframework.projection import ParallelRebuild, get_partition, rebuild_partition
+from esframework.store import InMemoryStore
+from esframework.store.file import FileStore
+from esframework.store.sqlite import SqliteStore
+from esframework.tests.assets import EventA
+from esframework.tests.assets.event_handling import EventAListener
+from esframework.tests.assets.projection import PropertyCountProjection
+
+
+class ClosableStore(InMemoryStore):
+    """ in memory store recording that it is closed """
+
+    closed = 0
+
+    def close(self):
+        ClosableStore.closed += 1
+
+
+class TestParallelRebuild(unittest.TestCase):
+    """ testing the parallel rebuild of projections """
+
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__database = os.path.join(self.__directory.name, 'events.db')
+
+    def tearDown(self):
+        self.__directory.cleanup()
+
+    def test_it_rebuilds_and_merges_the_partitions(self):
+        store = SqliteStore(self.__database)
+        expected = {}
+        for aggregate in range(20):
+            aggregate_root_id = 'aggregate-{}'.format(aggregate)
+            events = []
+            for version in range(1, aggregate % 5 + 2):
+                event = EventA(aggregate_root_id, 'prop{}'.format(version))
+                event.set_aggregate_root_version(version)
+                events.append(event)
+            store.save(events, aggregate_root_id, 0)
+            expected[aggregate_root_id] = len(events)
+        store.close()
+
+        rebuild = ParallelRebuild(
+            functools.partial(SqliteStore, self.__database), PropertyCountProjection,
+            number_of_workers=3, batch_size=4)
+
+        self.assertEqual(expected, rebuild.run())
+
+        reports = rebuild.get_reports()
+        self.assertEqual([0, 1, 2], [report.get_partition() for report in reports])
+        self.assertEqual(20, sum(report.get_aggregate_roots() for report in reports))
+        self.assertEqual(sum(expected.values()), sum(report.get_events() for report in reports))
+
+    def test_it_partitions_an_aggregate_root_consistently(self):
+        partition = get_partition('aggregate-1', 4)
+
+        self.assertEqual(partition, get_partition('aggregate-1', 4))
+        self.assertIn(partition, range(4))
+
+    def test_it_only_rebuilds_partitioned_projections(self):
+        with self.assertRaises(ProjectionException) as error:
+            ParallelRebuild(functools.partial(SqliteStore, self.__database), EventAListener)
+
+        self.assertEqual("Projection class must be based on PartitionedProjection",
+                         str(error.exception))
+
+    def test_it_closes_the_store_of_a_partition(self):
+        ClosableStore.closed = 0
+        rebuild_partition(ClosableStore, PropertyCountProjection, 0, ['unknown'], 10)
+
+        self.assertEqual(1, ClosableStore.closed)
+
+    def test_it_cannot_rebuild_from_a_file_store(self):
+        rebuild = ParallelRebuild(
+            functools.partial(FileStore, self.__directory.name), PropertyCountProjection)
+
+        with self.assertRaises(ProjectionException):
+            rebuild.run()
@@ -0,0 +1 @@
+""" autoload for registry tests """
@@ -0,0 +1,38 @@
+""" Tests for the event registry """
+import unittest
+
+from esframework.registry import EventRegistry
+from esframework.tests.assets import EventA, EventB
+
+
+class TestEventRegistry(unittest.TestCase):
+    """ Testing the EventRegistry """
+
+    def test_it_can_resolve_an_unregistered_name(self):
+        registry = EventRegistry()
+        self.assertFalse(registry.is_registered('esframework.tests.assets.EventA'))
+        self.assertIs(EventA, registry.resolve('esframework.tests.assets.EventA'))
+        self.assertTrue(registry.is_registered('esframework.tests.assets.EventA'))
+
+    def test_it_can_register_a_class(self):
+        registry = EventRegistry()
+        registry.register(EventA)
+        self.assertTrue(registry.is_registered('esframework.tests.assets.EventA'))
+        self.assertIs(EventA, registry.resolve('esframework.tests.assets.EventA'))
+
+    def test_it_can_register_a_class_under_a_name(self):
+        registry = EventRegistry()
+        registry.register(EventB, 'my_events.EventB')
+        self.assertIs(EventB, registry.resolve('my_events.EventB'))
+
+    def test_it_can_alias_a_moved_class(self):
+        registry = EventRegistry()
+        registry.alias('old_module.EventA', EventA)
+        registry.alias('older_module.EventA', 'esframework.tests.assets.EventA')
+        self.assertIs(EventA, registry.resolve('old_module.EventA'))
+        self.assertIs(EventA, registry.resolve('older_module.EventA'))
+
+    def test_it_raises_on_unknown_names(self):
+        registry = EventRegistry()
+        with self.assertRaises(ImportError):
+            registry.resolve('esframework.tests.assets.EventZ')
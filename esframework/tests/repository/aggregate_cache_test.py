@@ -0,0 +1,74 @@
+""" tests for the aggregate cache """
+import unittest
+
+from esframework.exceptions import RepositoryException
+from esframework.repository.cache import AggregateCache
+from esframework.tests.assets import MyTestAggregate
+
+
+class AggregateCacheTest(unittest.TestCase):
+
+    def test_it_counts_hits_and_misses(self):
+        cache = AggregateCache(max_items=2)
+        aggregate = MyTestAggregate()
+        cache.put('a', aggregate)
+
+        self.assertIs(aggregate, cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get_hits())
+        self.assertEqual(1, cache.get_misses())
+
+    def test_it_evicts_the_least_recently_used_aggregate(self):
+        cache = AggregateCache(max_items=2)
+        cache.put('a', MyTestAggregate())
+        cache.put('b', MyTestAggregate())
+        cache.get('a')
+        cache.put('c', MyTestAggregate())
+
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertEqual(1, cache.get_evictions())
+
+    def test_it_can_be_bounded_by_estimated_bytes(self):
+        cache = AggregateCache(max_bytes=250, size_estimator=lambda aggregate: 100)
+        cache.put('a', MyTestAggregate())
+        cache.put('b', MyTestAggregate())
+        cache.put('c', MyTestAggregate())
+
+        self.assertEqual(2, len(cache))
+        self.assertEqual(200, cache.get_size_in_bytes())
+        self.assertEqual(1, cache.get_evictions())
+
+    def test_it_only_estimates_sizes_when_bounded_by_bytes(self):
+        estimated = []
+        cache = AggregateCache(max_items=2, size_estimator=estimated.append)
+        cache.put('a', MyTestAggregate())
+
+        self.assertEqual([], estimated)
+        self.assertEqual(0, cache.get_size_in_bytes())
+
+    def test_it_keeps_the_estimate_of_an_unchanged_aggregate(self):
+        estimated = []
+
+        def size_estimator(aggregate):
+            estimated.append(aggregate)
+            return 100
+
+        cache = AggregateCache(max_bytes=250, size_estimator=size_estimator)
+        aggregate = MyTestAggregate()
+        cache.put('a', aggregate)
+        cache.put('a', aggregate)
+        self.assertEqual(1, len(estimated))
+        self.assertEqual(100, cache.get_size_in_bytes())
+
+        aggregate.event_b('a', 'prop')
+        aggregate.mark_events_committed()
+        cache.put('a', aggregate)
+        self.assertEqual(2, len(estimated))
+        self.assertEqual(100, cache.get_size_in_bytes())
+
+    def test_it_needs_a_bound(self):
+        with self.assertRaises(RepositoryException) as ex:
+            AggregateCache()
+        self.assertEqual(str(ex.exception), "Aggregate cache needs max_items or max_bytes")
@@ -1,12 +1,31 @@
 """ imports """
+import datetime
 import unittest
 from pytest import raises
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 
+from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
+from esframework.domain import Snapshot
 from esframework.event_handling.event_bus import BasicBus
-from esframework.exceptions import AggregateRootOutOfSyncError, RepositoryException
+from esframework.exceptions import AggregateRootIdNotFoundError, AggregateRootOutOfSyncError, RepositoryException
+from esframework.preprocessing.encryption import FieldEncryption
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore
 from esframework.repository import DefaultRepository
-from esframework.store import InMemoryStore
-from esframework.tests.assets import EventA, MyTestAggregate
+from esframework.repository.cache import AggregateCache
+from esframework.snapshotting import EveryNEventsPolicy, InMemorySnapshotStore, SQLSnapshotStore
+from esframework.store import InMemoryStore, SQLStore
+from esframework.store.sqlite import SqliteStore
+from esframework.tests.assets import EventA, EventWithPersonalData, MyTestAggregate, create_events
+
+
+class UnserializableAggregate(MyTestAggregate):
+    """ aggregate root with a snapshot state which cannot be stored as json """
+
+    def get_snapshot_state(self) -> dict:
+        state = super().get_snapshot_state()
+        state['loaded_at'] = datetime.datetime.now()
+        return state
 
 
 class DefaultRepositoryTest(unittest.TestCase):
@@ -92,3 +111,292 @@ class DefaultRepositoryTest(unittest.TestCase):
                 object()
             )
         self.assertEqual(str(ex.exception), "Eventbus parameter is not of type EventBus!")
+
+    def test_it_can_load_from_a_snapshot_and_the_events_after_it(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        store = InMemoryStore()
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop1'),
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop2'),
+        ], aggregate_id)
+
+        snapshot_store = InMemorySnapshotStore()
+        snapshot_store.save(Snapshot(aggregate_id, 2, {
+            '_MyTestAggregate__aggregate_root_id': aggregate_id,
+            '_MyTestAggregate__an_event_property': 'from_snapshot'
+        }))
+
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus(),
+            snapshot_store
+        )
+
+        aggregate = repository.load(aggregate_root_id=aggregate_id)
+        self.assertEqual(2, aggregate.get_aggregate_root_version())
+        self.assertEqual(
+            aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'from_snapshot')
+
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop3'),
+        ], aggregate_id)
+
+        aggregate = repository.load(aggregate_root_id=aggregate_id)
+        self.assertEqual(3, aggregate.get_aggregate_root_version())
+        self.assertEqual(
+            aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'prop3')
+
+    def test_it_takes_a_snapshot_according_to_the_policy(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        store = InMemoryStore()
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop1'),
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop2'),
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop3'),
+        ], aggregate_id)
+
+        snapshot_store = InMemorySnapshotStore()
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus(),
+            snapshot_store,
+            EveryNEventsPolicy(3)
+        )
+
+        repository.load(aggregate_root_id=aggregate_id)
+        snapshot = snapshot_store.load(aggregate_id)
+        self.assertEqual(3, snapshot.get_aggregate_root_version())
+
+        aggregate = repository.load(aggregate_root_id=aggregate_id)
+        self.assertEqual(
+            aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'prop3')
+
+    def test_it_returns_the_aggregate_when_its_snapshot_cannot_be_saved(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        engine = create_engine('sqlite://')
+        SqlDomainRecord.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        store = SQLStore(session)
+        store.save(create_events(aggregate_id, ['prop1']), aggregate_id)
+
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.UnserializableAggregate',
+            store,
+            BasicBus(),
+            SQLSnapshotStore(session),
+            EveryNEventsPolicy(1)
+        )
+
+        with self.assertLogs('esframework.repository', 'ERROR'):
+            aggregate = repository.load(aggregate_root_id=aggregate_id)
+        self.assertEqual(1, aggregate.get_aggregate_root_version())
+        self.assertEqual(1, len(store.load(aggregate_id)))
+        session.close()
+
+    def test_it_cannot_accept_a_snapshot_policy_without_snapshot_store(self):
+        with self.assertRaises(RepositoryException) as ex:
+            DefaultRepository(
+                'esframework.tests.repository.repository_test.MyTestAggregate',
+                InMemoryStore(),
+                BasicBus(),
+                snapshot_policy=EveryNEventsPolicy(3)
+            )
+        self.assertEqual(str(ex.exception), "Snapshot policy requires a snapshot store!")
+
+    def test_it_can_refresh_a_loaded_aggregate(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        store = InMemoryStore()
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop1'),
+        ], aggregate_id)
+
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus()
+        )
+
+        aggregate = repository.load(aggregate_root_id=aggregate_id)
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop2'),
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop3'),
+        ], aggregate_id)
+
+        self.assertIs(aggregate, repository.refresh(aggregate))
+        self.assertEqual(3, aggregate.get_aggregate_root_version())
+        self.assertEqual(
+            aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'prop3')
+
+    def test_it_can_load_many_aggregates(self):
+        aggregate_id_1 = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        aggregate_id_2 = '3D1F7B7E-9C44-4D8C-9E0C-6C3C4C7E5B21'
+        store = InMemoryStore()
+        store.save([
+            EventA(aggregate_root_id=aggregate_id_1, an_event_property='prop1'),
+        ], aggregate_id_1)
+        store.save([
+            EventA(aggregate_root_id=aggregate_id_2, an_event_property='prop1'),
+            EventA(aggregate_root_id=aggregate_id_2, an_event_property='prop2'),
+        ], aggregate_id_2)
+
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus()
+        )
+
+        aggregates = repository.load_many([aggregate_id_1, aggregate_id_2])
+        self.assertEqual(1, aggregates[aggregate_id_1].get_aggregate_root_version())
+        self.assertEqual(2, aggregates[aggregate_id_2].get_aggregate_root_version())
+        self.assertEqual(
+            aggregates[aggregate_id_2].__dict__.get('_MyTestAggregate__an_event_property'),
+            'prop2')
+
+        with self.assertRaises(AggregateRootIdNotFoundError) as ex:
+            repository.load_many([aggregate_id_1, 'unknown'])
+        self.assertEqual(str(ex.exception), "Aggregate root id does not exist: unknown")
+
+    def test_it_advances_the_version_of_a_saved_aggregate(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            InMemoryStore(),
+            BasicBus()
+        )
+
+        aggregate = MyTestAggregate.event_a(
+            aggregate_root_id=aggregate_id, an_event_property='prop1')
+        repository.save(aggregate)
+        self.assertEqual(1, aggregate.get_aggregate_root_version())
+
+        aggregate.event_b(aggregate_id, 'prop2')
+        repository.save(aggregate)
+        self.assertEqual(2, aggregate.get_aggregate_root_version())
+        self.assertEqual(2, repository.load(aggregate_id).get_aggregate_root_version())
+
+    def test_it_can_serve_aggregates_from_the_cache(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        store = InMemoryStore()
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop1'),
+        ], aggregate_id)
+
+        cache = AggregateCache(max_items=10)
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus(),
+            aggregate_cache=cache
+        )
+
+        aggregate = repository.load(aggregate_id)
+        self.assertIs(aggregate, repository.load(aggregate_id))
+
+        aggregate.event_b(aggregate_id, 'prop2')
+        repository.save(aggregate)
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop3'),
+        ], aggregate_id, 2)
+
+        cached_aggregate = repository.load(aggregate_id)
+        self.assertIs(aggregate, cached_aggregate)
+        self.assertEqual(3, cached_aggregate.get_aggregate_root_version())
+        self.assertEqual(
+            cached_aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'prop3')
+        self.assertEqual(2, cache.get_hits())
+        self.assertEqual(1, cache.get_misses())
+
+    def test_it_does_not_serve_changed_but_unsaved_aggregates_from_the_cache(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        store = InMemoryStore()
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop1'),
+        ], aggregate_id)
+
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus(),
+            aggregate_cache=AggregateCache(max_items=10)
+        )
+
+        aggregate = repository.load(aggregate_id)
+        aggregate.event_b(aggregate_id, 'unsaved')
+
+        reloaded_aggregate = repository.load(aggregate_id)
+        self.assertIsNot(aggregate, reloaded_aggregate)
+        self.assertEqual(
+            reloaded_aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'prop1')
+
+    def test_it_evicts_an_aggregate_from_the_cache_when_its_save_fails(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        store = InMemoryStore()
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop1'),
+        ], aggregate_id)
+
+        cache = AggregateCache(max_items=10)
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus(),
+            aggregate_cache=cache
+        )
+
+        aggregate = repository.load(aggregate_id)
+        store.save([
+            EventA(aggregate_root_id=aggregate_id, an_event_property='prop2'),
+        ], aggregate_id, 1)
+        aggregate.event_b(aggregate_id, 'conflict')
+        with raises(AggregateRootOutOfSyncError):
+            repository.save(aggregate)
+
+        self.assertEqual(0, len(cache))
+        reloaded_aggregate = repository.load(aggregate_id)
+        self.assertIsNot(aggregate, reloaded_aggregate)
+        self.assertEqual(
+            reloaded_aggregate.__dict__.get('_MyTestAggregate__an_event_property'),
+            'prop2')
+
+    def test_it_can_forget_an_aggregate(self):
+        aggregate_id = 'AB9850E7-B590-4A65-B513-91ABD6DC6F40'
+        key_store = InMemoryKeyStore()
+        store = SqliteStore(':memory:', field_encryption=FieldEncryption(key_store))
+        store.save(create_events(aggregate_id, ['prop1']), aggregate_id)
+
+        cache = AggregateCache(max_items=10)
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            store,
+            BasicBus(),
+            aggregate_cache=cache
+        )
+        repository.load(aggregate_id)
+        personal_data = EventWithPersonalData(aggregate_id, 'foo@example.org')
+        personal_data.set_aggregate_root_version(2)
+        store.save([personal_data], aggregate_id, 1)
+        self.assertEqual('foo@example.org', store.load(aggregate_id)[1].get_email())
+
+        repository.forget(aggregate_id)
+
+        self.assertEqual(0, len(cache))
+        self.assertIsNone(key_store.load(aggregate_id))
+        self.assertIsNone(store.load(aggregate_id)[1].get_email())
+        store.close()
+
+    def test_it_cannot_forget_without_field_encryption(self):
+        repository = DefaultRepository(
+            'esframework.tests.repository.repository_test.MyTestAggregate',
+            InMemoryStore(),
+            BasicBus()
+        )
+        with raises(RepositoryException):
+            repository.forget('AB9850E7-B590-4A65-B513-91ABD6DC6F40')
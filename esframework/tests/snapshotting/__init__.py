@@ -0,0 +1 @@
+""" autoload for snapshotting tests """
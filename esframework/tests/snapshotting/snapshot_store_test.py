@@ -0,0 +1,106 @@
+""" Tests for snapshot stores and policies """
+import datetime
+import unittest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from esframework.config import ESConfig
+from esframework.data_sources.sqlalchemy.models import SqlSnapshotRecord
+from esframework.domain import Snapshot
+from esframework.exceptions import SnapshotException
+from esframework.preprocessing.encryption import FieldEncryption, is_encrypted
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore
+from esframework.snapshotting import (
+    EveryNEventsPolicy, InMemorySnapshotStore, ReplayDurationPolicy, SQLSnapshotStore)
+from esframework.tests.assets import MyTestAggregate
+
+
+class TestInMemorySnapshotStore(unittest.TestCase):
+    """ Test class for testing the InMemorySnapshotStore """
+
+    def test_it_returns_none_without_snapshot(self):
+        store = InMemorySnapshotStore()
+        self.assertIsNone(store.load('897878D0-1230-408B-A980-7A9C24EBDEFA'))
+
+    def test_it_can_store_and_load_the_latest_snapshot(self):
+        store = InMemorySnapshotStore()
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+
+        store.save(Snapshot(aggregate_root_id, 10, {'foo': 'bar'}))
+        store.save(Snapshot(aggregate_root_id, 20, {'foo': 'baz'}))
+        store.save(Snapshot(aggregate_root_id, 15, {'foo': 'old'}))
+
+        snapshot = store.load(aggregate_root_id)
+        self.assertEqual(20, snapshot.get_aggregate_root_version())
+        self.assertEqual({'foo': 'baz'}, snapshot.get_state())
+
+
+class TestSQLSnapshotStore(unittest.TestCase):
+    """ Test class for testing the SQLSnapshotStore """
+
+    def setUp(self):
+        es_config = ESConfig()
+        es_config.load('./config/esframework.ini')
+        engine = create_engine(es_config.get('esframework.storage', 'host'))
+        self.__session = sessionmaker(bind=engine)()
+        SqlSnapshotRecord.metadata.create_all(engine)
+
+    def test_it_returns_none_without_snapshot(self):
+        store = SQLSnapshotStore(self.__session)
+        self.assertIsNone(store.load('897878D0-1230-408B-A980-7A9C24EBDEFA'))
+
+    def test_it_can_store_and_load_the_latest_snapshot(self):
+        store = SQLSnapshotStore(self.__session)
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+
+        store.save(Snapshot(aggregate_root_id, 10, {'foo': 'bar'}))
+        store.save(Snapshot(aggregate_root_id, 20, {'foo': ['baz']}))
+
+        snapshot = store.load(aggregate_root_id)
+        self.assertEqual(aggregate_root_id, snapshot.get_aggregate_root_id())
+        self.assertEqual(20, snapshot.get_aggregate_root_version())
+        self.assertEqual({'foo': ['baz']}, snapshot.get_state())
+
+    def test_it_rolls_back_a_snapshot_which_cannot_be_saved(self):
+        store = SQLSnapshotStore(self.__session)
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+
+        with self.assertRaises(Exception):
+            store.save(Snapshot(aggregate_root_id, 10, {'loaded_at': datetime.datetime.now()}))
+
+        self.assertIsNone(store.load(aggregate_root_id))
+
+    def test_it_can_encrypt_snapshots(self):
+        field_encryption = FieldEncryption(InMemoryKeyStore())
+        store = SQLSnapshotStore(self.__session, field_encryption)
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+
+        store.save(Snapshot(aggregate_root_id, 10, {'email': 'foo@example.org'}))
+        self.assertTrue(is_encrypted(self.__session.query(SqlSnapshotRecord).one().snapshot_state))
+        self.assertEqual({'email': 'foo@example.org'}, store.load(aggregate_root_id).get_state())
+
+        with self.assertRaises(SnapshotException):
+            SQLSnapshotStore(self.__session).load(aggregate_root_id)
+
+        field_encryption.forget(aggregate_root_id)
+        self.assertIsNone(store.load(aggregate_root_id))
+
+
+class TestSnapshotPolicies(unittest.TestCase):
+    """ Test class for the snapshot policies """
+
+    def test_it_can_snapshot_every_n_events(self):
+        policy = EveryNEventsPolicy(10)
+        self.assertFalse(policy.should_snapshot(MyTestAggregate(), 9, 0.0))
+        self.assertTrue(policy.should_snapshot(MyTestAggregate(), 10, 0.0))
+
+    def test_it_can_snapshot_on_replay_duration(self):
+        policy = ReplayDurationPolicy(50)
+        self.assertFalse(policy.should_snapshot(MyTestAggregate(), 10, 0.049))
+        self.assertTrue(policy.should_snapshot(MyTestAggregate(), 10, 0.05))
+        self.assertFalse(policy.should_snapshot(MyTestAggregate(), 0, 0.05))
+
+    def test_it_needs_a_positive_number_of_events(self):
+        with self.assertRaises(SnapshotException) as ex:
+            EveryNEventsPolicy(0)
+        self.assertEqual(str(ex.exception), "Number of events must be at least 1")
@@ -0,0 +1,194 @@
+""" Imports """
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from esframework.exceptions import AggregateRootIdNotFoundError, AggregateRootOutOfSyncError, DomainEventException
+from esframework.preprocessing.encryption import FieldEncryption
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore
+from esframework.preprocessing.upcasting import UpcasterChain
+from esframework.store.file import FileStore
+from esframework.tests.assets import EventA, EventWithPersonalData, create_events
+
+
+class TestFileStore(unittest.TestCase):
+    """ testing the FileStore """
+
+    def setUp(self):
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__path = self.__directory.name
+
+    def tearDown(self):
+        self.__directory.cleanup()
+
+    def test_it_can_store_and_load_multiple_events(self):
+        store = FileStore(self.__path)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        store.save(create_events(aggregate_root_id, ['a', 'b', 'c']), aggregate_root_id)
+
+        stored_eventstream = store.load(aggregate_root_id)
+        self.assertEqual(['a', 'b', 'c'], [event.get_an_event_property() for event in stored_eventstream])
+        self.assertEqual(
+            stored_eventstream[0].get_event_id(),
+            stored_eventstream[1].get_causation_id())
+        self.assertEqual(['c'], [event.get_an_event_property()
+                                 for event in store.load_from(aggregate_root_id, 2)])
+        store.close()
+
+    def test_it_throws_when_id_doesnt_exists(self):
+        store = FileStore(self.__path)
+        with self.assertRaises(AggregateRootIdNotFoundError):
+            store.load('108AEB44-7842-4F36-A113-60A3786670C2')
+        store.close()
+
+    def test_it_rejects_a_stream_with_an_outdated_expected_version(self):
+        store = FileStore(self.__path)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        store.save(create_events(aggregate_root_id, ['a', 'b']), aggregate_root_id, 0)
+
+        with self.assertRaises(AggregateRootOutOfSyncError):
+            store.save(create_events(aggregate_root_id, ['c'], 2), aggregate_root_id, 1)
+        store.close()
+
+    def test_it_can_read_all_and_load_many(self):
+        store = FileStore(self.__path)
+        aggr_root_id_1 = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggr_root_id_2 = '108AEB44-7842-4F36-A113-60A3786670C2'
+        store.save(create_events(aggr_root_id_1, ['a']), aggr_root_id_1)
+        store.save(create_events(aggr_root_id_2, ['b', 'c']), aggr_root_id_2)
+
+        self.assertEqual(['a', 'b'], [event.get_an_event_property() for event in store.read_all(0, 2)])
+        self.assertEqual(['c'], [event.get_an_event_property() for event in store.read_all(2, 2)])
+        self.assertEqual(2, len(store.load_many([aggr_root_id_2, 'unknown'])[aggr_root_id_2]))
+        self.assertEqual([aggr_root_id_1, aggr_root_id_2], store.get_aggregate_root_ids())
+        store.close()
+
+    def test_it_rolls_over_to_new_segments(self):
+        store = FileStore(self.__path, max_segment_size=200)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        for version in range(1, 6):
+            store.save(create_events(aggregate_root_id, ['prop'], version), aggregate_root_id)
+        store.close()
+
+        segments = [name for name in os.listdir(self.__path) if name.startswith('segment-')]
+        self.assertGreater(len(segments), 1)
+
+        store = FileStore(self.__path, max_segment_size=200)
+        self.assertEqual(5, len(store.load(aggregate_root_id)))
+        store.close()
+
+    def test_it_rejects_events_with_a_position_before_writing_them(self):
+        store = FileStore(self.__path)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        stored_events = create_events(aggregate_root_id, ['a'])
+        store.save(stored_events, aggregate_root_id)
+
+        with self.assertRaises(DomainEventException):
+            store.save(create_events(aggregate_root_id, ['b'], 2) + stored_events, aggregate_root_id)
+        store.close()
+
+        store = FileStore(self.__path)
+        self.assertEqual(['a'], [event.get_an_event_property() for event in store.read_all()])
+        store.close()
+
+    def test_it_recovers_records_written_after_the_index(self):
+        store = FileStore(self.__path, index_flush_interval=1)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        store.save(create_events(aggregate_root_id, ['a']), aggregate_root_id)
+        store = FileStore(self.__path)
+        store.save(create_events(aggregate_root_id, ['b', 'c'], 2), aggregate_root_id)
+
+        store = FileStore(self.__path)
+        self.assertEqual(['a', 'b', 'c'], [event.get_an_event_property()
+                                           for event in store.load(aggregate_root_id)])
+        store.close()
+
+    def test_it_appends_to_the_index_on_every_flush(self):
+        store = FileStore(self.__path, index_flush_interval=1)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        store.save(create_events(aggregate_root_id, ['a', 'b']), aggregate_root_id)
+        index = os.path.join(self.__path, 'index.log')
+        with open(index, 'rb') as index_file:
+            first_flush = index_file.read()
+
+        store.save(create_events(aggregate_root_id, ['c'], 3), aggregate_root_id)
+        store.close()
+        with open(index, 'rb') as index_file:
+            flushes = index_file.read()
+
+        self.assertTrue(flushes.startswith(first_flush))
+        self.assertEqual(2, flushes.count(b'\n'))
+
+    def test_it_cuts_off_a_torn_index_flush(self):
+        store = FileStore(self.__path, index_flush_interval=1)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        store.save(create_events(aggregate_root_id, ['a']), aggregate_root_id)
+        store.save(create_events(aggregate_root_id, ['b', 'c'], 2), aggregate_root_id)
+        store.close()
+
+        index = os.path.join(self.__path, 'index.log')
+        with open(index, 'r+b') as index_file:
+            index_file.truncate(os.path.getsize(index) - 10)
+
+        store = FileStore(self.__path)
+        self.assertEqual(['a', 'b', 'c'], [event.get_an_event_property()
+                                           for event in store.load(aggregate_root_id)])
+        self.assertEqual([1, 2, 3], [event.get_position() for event in store.read_all()])
+        store.close()
+
+        store = FileStore(self.__path)
+        self.assertEqual(3, len(store.read_all()))
+        store.close()
+
+    def test_it_cuts_off_a_torn_batch(self):
+        store = FileStore(self.__path)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        store.save(create_events(aggregate_root_id, ['a']), aggregate_root_id)
+        store.save(create_events(aggregate_root_id, ['b', 'c'], 2), aggregate_root_id)
+        store.close()
+        os.remove(os.path.join(self.__path, 'index.log'))
+
+        segment = os.path.join(self.__path, 'segment-000001.log')
+        with open(segment, 'r+b') as segment_file:
+            segment_file.truncate(os.path.getsize(segment) - 10)
+
+        store = FileStore(self.__path)
+        self.assertEqual(['a'], [event.get_an_event_property()
+                                 for event in store.load(aggregate_root_id)])
+
+        store.save(create_events(aggregate_root_id, ['d'], 2), aggregate_root_id, 1)
+        self.assertEqual(['a', 'd'], [event.get_an_event_property()
+                                      for event in store.load(aggregate_root_id)])
+        store.close()
+
+    def test_it_upcasts_stored_bodies_before_deserializing(self):
+        upcasters = UpcasterChain()
+        upcasters.register('esframework.tests.assets.EventA', 1, lambda event_data: {
+            'aggregate_root_id': event_data['aggregate_root_id'],
+            'an_event_property': event_data['an_event_property'].upper(),
+        })
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        store = FileStore(self.__path)
+        store.save(create_events(aggregate_root_id, ['a', 'b']), aggregate_root_id)
+        store.close()
+
+        with mock.patch.object(EventA, 'schema_version', 2):
+            store = FileStore(self.__path, upcasters=upcasters)
+            stored_eventstream = store.load(aggregate_root_id)
+            store.close()
+
+        self.assertEqual(['A', 'B'], [event.get_an_event_property() for event in stored_eventstream])
+
+    def test_it_can_encrypt_fields(self):
+        store = FileStore(self.__path, field_encryption=FieldEncryption(InMemoryKeyStore()))
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        event = EventWithPersonalData(aggregate_root_id, 'foo@example.org')
+        event.set_aggregate_root_version(1)
+        store.save([event], aggregate_root_id)
+        self.assertEqual('foo@example.org', store.load(aggregate_root_id)[0].get_email())
+        store.close()
+
+        for segment in os.listdir(self.__path):
+            with open(os.path.join(self.__path, segment), 'rb') as segment_file:
+                self.assertNotIn(b'foo@example.org', segment_file.read())
@@ -0,0 +1,182 @@
+""" Imports """
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from esframework.exceptions import AggregateRootIdNotFoundError, AggregateRootOutOfSyncError
+from esframework.preprocessing.encryption import FieldEncryption
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore
+from esframework.preprocessing.upcasting import UpcasterChain
+from esframework.store.sqlite import CREATE_TABLE, SqliteStore
+from esframework.tests.assets import EventA, EventWithPersonalData, create_events
+
+
+class TestSqliteStore(unittest.TestCase):
+    """ testing the SqliteStore """
+
+    def setUp(self):
+        self.__store = SqliteStore(':memory:')
+
+    def tearDown(self):
+        self.__store.close()
+
+    def test_it_can_store_and_load_multiple_events(self):
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        self.__store.save(
+            create_events(aggregate_root_id, ['my_prop', 'my_prop1', 'my_prop2']),
+            aggregate_root_id)
+
+        stored_eventstream = self.__store.load(aggregate_root_id)
+        self.assertEqual(3, len(stored_eventstream))
+        self.assertEqual('my_prop2', stored_eventstream[2].get_an_event_property())
+        self.assertEqual(
+            stored_eventstream[0].get_event_id(),
+            stored_eventstream[1].get_causation_id())
+        self.assertEqual(aggregate_root_id, stored_eventstream[2].get_correlation_id())
+
+    def test_it_throws_when_id_doesnt_exists(self):
+        with self.assertRaises(AggregateRootIdNotFoundError) as ex:
+            self.__store.load('108AEB44-7842-4F36-A113-60A3786670C2')
+        self.assertEqual(
+            "Aggregate root id does not exist: 108AEB44-7842-4F36-A113-60A3786670C2",
+            str(ex.exception))
+
+    def test_it_can_stream_and_load_from_a_version(self):
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        self.__store.save(
+            create_events(aggregate_root_id, ['a', 'b', 'c', 'd', 'e']),
+            aggregate_root_id)
+
+        self.assertEqual(
+            [3, 4, 5],
+            [event.get_aggregate_root_version()
+             for event in self.__store.stream(aggregate_root_id, 3, batch_size=2)])
+        self.assertEqual(
+            ['d', 'e'],
+            [event.get_an_event_property()
+             for event in self.__store.load_from(aggregate_root_id, 3)])
+
+    def test_it_rejects_a_stream_with_an_outdated_expected_version(self):
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        self.__store.save(create_events(aggregate_root_id, ['a', 'b']), aggregate_root_id, 0)
+
+        with self.assertRaises(AggregateRootOutOfSyncError):
+            self.__store.save(
+                create_events(aggregate_root_id, ['c'], first_version=2),
+                aggregate_root_id, 1)
+        self.assertEqual(2, len(self.__store.load(aggregate_root_id)))
+
+    def test_it_can_load_many_streams_and_read_all(self):
+        aggr_root_id_1 = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggr_root_id_2 = '108AEB44-7842-4F36-A113-60A3786670C2'
+        self.__store.save(create_events(aggr_root_id_1, ['a']), aggr_root_id_1)
+        self.__store.save(create_events(aggr_root_id_2, ['b', 'c']), aggr_root_id_2)
+
+        streams = self.__store.load_many([aggr_root_id_1, aggr_root_id_2])
+        self.assertEqual(1, len(streams[aggr_root_id_1]))
+        self.assertEqual(2, len(streams[aggr_root_id_2]))
+        self.assertEqual([aggr_root_id_2, aggr_root_id_1], self.__store.get_aggregate_root_ids())
+
+        first_page = self.__store.read_all(0, 2)
+        self.assertEqual(['a', 'b'], [event.get_an_event_property() for event in first_page])
+        self.assertEqual(
+            ['c'],
+            [event.get_an_event_property()
+             for event in self.__store.read_all(first_page[-1].get_position(), 2)])
+
+    def test_it_can_reopen_a_database_file(self):
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'events.db')
+
+            store = SqliteStore(database)
+            store.save(create_events(aggregate_root_id, ['a', 'b']), aggregate_root_id)
+            store.close()
+
+            store = SqliteStore(database)
+            self.assertEqual(2, len(store.load(aggregate_root_id)))
+            self.assertEqual(
+                'wal', store.get_connection().execute("PRAGMA journal_mode").fetchone()[0])
+            store.close()
+
+    def test_it_upcasts_stored_bodies_before_deserializing(self):
+        upcasters = UpcasterChain()
+        upcasters.register('esframework.tests.assets.EventA', 1, lambda event_data: {
+            'aggregate_root_id': event_data['aggregate_root_id'],
+            'an_event_property': event_data['an_event_property'].upper(),
+        })
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'events.db')
+            store = SqliteStore(database)
+            store.save(create_events(aggregate_root_id, ['a', 'b']), aggregate_root_id)
+            store.close()
+
+            with mock.patch.object(EventA, 'schema_version', 2):
+                store = SqliteStore(database, upcasters=upcasters)
+                stored_eventstream = store.load(aggregate_root_id)
+                store.close()
+
+        self.assertEqual(['A', 'B'], [event.get_an_event_property() for event in stored_eventstream])
+
+    def test_it_adds_the_schema_version_to_an_existing_event_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'events.db')
+            connection = sqlite3.connect(database)
+            connection.execute(CREATE_TABLE.replace(
+                "schema_version INTEGER NOT NULL DEFAULT 1,", ""))
+            connection.close()
+
+            store = SqliteStore(database)
+            columns = [row[1] for row in store.get_connection().execute(
+                "PRAGMA table_info(event_store)")]
+            store.close()
+
+        self.assertIn('schema_version', columns)
+
+    def test_it_can_encrypt_fields(self):
+        field_encryption = FieldEncryption(InMemoryKeyStore())
+        store = SqliteStore(':memory:', field_encryption=field_encryption)
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        event = EventWithPersonalData(aggregate_root_id, 'foo@example.org')
+        event.set_aggregate_root_version(1)
+        store.save([event], aggregate_root_id)
+
+        domain_event_body = store.get_connection().execute(
+            "SELECT domain_event_body FROM event_store").fetchone()[0]
+        self.assertNotIn('foo@example.org', domain_event_body)
+        self.assertEqual('foo@example.org', store.load(aggregate_root_id)[0].get_email())
+
+        field_encryption.forget(aggregate_root_id)
+        self.assertIsNone(store.load(aggregate_root_id)[0].get_email())
+        store.close()
+
+    def test_it_decrypts_fields_before_upcasting(self):
+        def lower_email(event_data):
+            event_data = event_data.copy()
+            event_data['email'] = event_data['email'].lower()
+            return event_data
+
+        upcasters = UpcasterChain()
+        upcasters.register('esframework.tests.assets.EventWithPersonalData', 1, lower_email)
+        field_encryption = FieldEncryption(InMemoryKeyStore())
+        aggregate_root_id = '52B6A306-540C-4796-92E4-A10520EA3ED7'
+        event = EventWithPersonalData(aggregate_root_id, 'FOO@example.org')
+        event.set_aggregate_root_version(1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'events.db')
+            store = SqliteStore(database, field_encryption=field_encryption)
+            store.save([event], aggregate_root_id)
+            store.close()
+
+            with mock.patch.object(EventWithPersonalData, 'schema_version', 2):
+                store = SqliteStore(database, upcasters=upcasters, field_encryption=field_encryption)
+                stored_eventstream = store.load(aggregate_root_id)
+                store.close()
+
+        self.assertEqual('foo@example.org', stored_eventstream[0].get_email())
@@ -1,19 +1,35 @@
 """ Imports """
 import unittest
+from unittest import mock
 from pytest import raises
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from esframework.config import ESConfig
 from esframework.data_sources.sqlalchemy.models import SqlDomainRecord
-from esframework.exceptions import AggregateRootIdNotFoundError
+from esframework.exceptions import (
+    AggregateRootIdNotFoundError, AggregateRootOutOfSyncError, DomainEventException, UpcasterException)
+from esframework.preprocessing.encryption import FieldEncryption, is_encrypted
+from esframework.preprocessing.encryption.keystore import InMemoryKeyStore
+from esframework.preprocessing.schema import get_schema_fingerprint
+from esframework.preprocessing.upcasting import UpcasterChain
+from esframework.registry import EventRegistry
 from esframework.store import (InMemoryStore, SQLStore)
-from esframework.tests.assets import EventA
+from esframework.tests.assets import EventA, EventWithPersonalData
 
 
 class TestInMemoryStore(unittest.TestCase):
     """ Test class for testing the InMemoryStore """
 
+    def test_it_sets_the_correlation_id_on_save(self):
+        """ test if InMemoryStore correlates saved events with their aggregate root """
+        store = InMemoryStore()
+        aggregate_root_id = 'C4C0A2B8-8B2C-4F0B-9F4C-1D1B3E0C2A71'
+        event_a = EventA(aggregate_root_id, 'my_prop')
+        store.save([event_a], aggregate_root_id)
+
+        self.assertEqual(aggregate_root_id, event_a.get_correlation_id())
+
     def test_it_can_store_and_load_an_event(self):
         """ test if InMemoryStore can actually store an event """
         store = InMemoryStore()
@@ -82,6 +98,114 @@ class TestInMemoryStore(unittest.TestCase):
             "Aggregate root id does not exist: 108AEB44-7842-4F36-A113-60A3786670C2",
             str(ex.exception))
 
+    def test_it_can_load_the_events_after_a_version(self):
+        """ test if InMemoryStore can load only the tail of a stream """
+        store = InMemoryStore()
+
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        eventstream = [
+            EventA(aggregate_root_id, 'my_prop'),
+            EventA(aggregate_root_id, 'my_prop1'),
+            EventA(aggregate_root_id, 'my_prop2'),
+        ]
+        store.save(eventstream, aggregate_root_id)
+
+        self.assertEqual(eventstream[1:], store.load_from(aggregate_root_id, 1))
+        self.assertEqual([], store.load_from(aggregate_root_id, 3))
+
+    def test_it_rejects_a_stream_with_an_outdated_expected_version(self):
+        """ test if InMemoryStore detects concurrent writes """
+        store = InMemoryStore()
+
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        store.save([EventA(aggregate_root_id, 'my_prop')], aggregate_root_id, 0)
+        store.save([EventA(aggregate_root_id, 'my_prop1')], aggregate_root_id, 1)
+
+        with self.assertRaises(AggregateRootOutOfSyncError) as ex:
+            store.save([EventA(aggregate_root_id, 'my_prop2')], aggregate_root_id, 1)
+        self.assertEqual(
+            "Aggregate root in store is newer then current aggregate",
+            str(ex.exception))
+        self.assertEqual(2, len(store.load(aggregate_root_id)))
+
+    def test_it_can_stream_events(self):
+        """ test if InMemoryStore can yield a stream from a version """
+        store = InMemoryStore()
+
+        aggregate_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        eventstream = [
+            EventA(aggregate_root_id, 'my_prop'),
+            EventA(aggregate_root_id, 'my_prop1'),
+            EventA(aggregate_root_id, 'my_prop2'),
+        ]
+        store.save(eventstream, aggregate_root_id)
+
+        self.assertEqual(eventstream, list(store.stream(aggregate_root_id)))
+        self.assertEqual(eventstream[2:], list(store.stream(aggregate_root_id, 3)))
+        with self.assertRaises(AggregateRootIdNotFoundError):
+            list(store.stream('108AEB44-7842-4F36-A113-60A3786670C2'))
+
+    def test_it_can_read_all_events_in_stored_order(self):
+        """ test if InMemoryStore can page through the global event log """
+        store = InMemoryStore()
+
+        aggr_root_id_1 = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggr_root_id_2 = '108AEB44-7842-4F36-A113-60A3786670C2'
+        store.save([EventA(aggr_root_id_1, 'my_prop')], aggr_root_id_1)
+        store.save([EventA(aggr_root_id_2, 'my_prop1')], aggr_root_id_2)
+        store.save([EventA(aggr_root_id_1, 'my_prop2')], aggr_root_id_1)
+
+        first_page = store.read_all(0, 2)
+        self.assertEqual([1, 2], [event.get_position() for event in first_page])
+        self.assertEqual(
+            [aggr_root_id_1, aggr_root_id_2],
+            [event.get_aggregate_root_id() for event in first_page])
+
+        second_page = store.read_all(first_page[-1].get_position(), 2)
+        self.assertEqual(['my_prop2'], [event.get_an_event_property() for event in second_page])
+        self.assertEqual([], store.read_all(3, 2))
+
+    def test_it_rejects_events_with_a_position_before_storing_them(self):
+        """ test if InMemoryStore stores nothing of a stream with events which
+        were already stored """
+        store = InMemoryStore()
+
+        aggr_root_id = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        stored_event = EventA(aggr_root_id, 'my_prop')
+        store.save([stored_event], aggr_root_id)
+
+        with raises(DomainEventException):
+            store.save([EventA(aggr_root_id, 'my_prop2'), stored_event], aggr_root_id)
+
+        self.assertEqual(1, len(store.load(aggr_root_id)))
+        self.assertEqual(1, len(store.read_all()))
+
+    def test_it_cannot_encrypt_fields(self):
+        """ test if InMemoryStore rejects field encryption """
+        store = InMemoryStore()
+
+        with raises(ValueError):
+            store.set_field_encryption(FieldEncryption(InMemoryKeyStore()))
+        self.assertIsNone(store.get_field_encryption())
+
+    def test_it_can_load_many_streams(self):
+        """ test if InMemoryStore can load multiple streams at once """
+        store = InMemoryStore()
+
+        aggr_root_id_1 = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggr_root_id_2 = '108AEB44-7842-4F36-A113-60A3786670C2'
+        store.save([EventA(aggr_root_id_1, 'my_prop')], aggr_root_id_1)
+        store.save([
+            EventA(aggr_root_id_2, 'my_prop1'),
+            EventA(aggr_root_id_2, 'my_prop2'),
+        ], aggr_root_id_2)
+
+        streams = store.load_many([aggr_root_id_1, aggr_root_id_2, 'unknown'])
+        self.assertEqual({aggr_root_id_1, aggr_root_id_2}, set(streams.keys()))
+        self.assertEqual([aggr_root_id_1, aggr_root_id_2], store.get_aggregate_root_ids())
+        self.assertEqual(1, len(streams[aggr_root_id_1]))
+        self.assertEqual(2, len(streams[aggr_root_id_2]))
+
 
 class TestSqlStore(unittest.TestCase):
     """ testing the SqlStore """
@@ -255,3 +379,288 @@ class TestSqlStore(unittest.TestCase):
             aggr_root,
             stored_eventstream[4].get_correlation_id()
         )
+
+    def test_it_saves_a_stream_atomically(self):
+        """ test if SQLStore does not store a partial stream on failure """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        event1 = EventA(aggregate_root_id, 'my_prop')
+        event1.set_aggregate_root_version(1)
+        event2 = EventA(aggregate_root_id, object())
+        event2.set_aggregate_root_version(2)
+
+        with self.assertRaises(Exception):
+            store.save([event1, event2], aggregate_root_id)
+
+        with self.assertRaises(AggregateRootIdNotFoundError):
+            store.load(aggregate_root_id)
+
+    def test_it_can_save_a_stream_in_multiple_inserts(self):
+        """ test if SQLStore can split a large stream over insert statements """
+        store = SQLStore(self.__session, insert_batch_size=2)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        eventstream = []
+        for version in range(1, 6):
+            event = EventA(aggregate_root_id, 'my_prop{}'.format(version))
+            event.set_aggregate_root_version(version)
+            eventstream.append(event)
+
+        store.save(eventstream, aggregate_root_id)
+        stored_eventstream = store.load(aggregate_root_id)
+
+        self.assertEqual(5, len(stored_eventstream))
+        self.assertEqual(
+            'my_prop5', stored_eventstream[4].get_an_event_property())
+
+    def test_it_saves_a_stream_in_multiple_inserts_atomically(self):
+        """ test if SQLStore stores nothing of a split stream when a later
+        insert fails """
+        store = SQLStore(self.__session, insert_batch_size=2)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        eventstream = []
+        for version in range(1, 6):
+            event = EventA(aggregate_root_id, 'my_prop{}'.format(version))
+            event.set_aggregate_root_version(version)
+            eventstream.append(event)
+
+        conflicting_event = EventA(aggregate_root_id, 'conflict')
+        conflicting_event.set_aggregate_root_version(4)
+        store.save([conflicting_event], aggregate_root_id)
+
+        with raises(AggregateRootOutOfSyncError):
+            store.save(eventstream, aggregate_root_id)
+
+        stored_eventstream = store.load(aggregate_root_id)
+        self.assertEqual(['conflict'], [event.get_an_event_property() for event in stored_eventstream])
+
+    def test_it_can_load_the_events_after_a_version(self):
+        """ test if SQLStore can load only the tail of a stream """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        eventstream = []
+        for version in range(1, 6):
+            event = EventA(aggregate_root_id, 'my_prop{}'.format(version))
+            event.set_aggregate_root_version(version)
+            eventstream.append(event)
+        store.save(eventstream, aggregate_root_id)
+
+        tail = store.load_from(aggregate_root_id, 3)
+        self.assertEqual(
+            [4, 5], [event.get_aggregate_root_version() for event in tail])
+        self.assertEqual([], store.load_from(aggregate_root_id, 5))
+
+    def test_it_rejects_a_stream_with_an_outdated_expected_version(self):
+        """ test if SQLStore detects concurrent writes with the unique index """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        event1 = EventA(aggregate_root_id, 'my_prop')
+        event1.set_aggregate_root_version(1)
+        event2 = EventA(aggregate_root_id, 'my_prop1')
+        event2.set_aggregate_root_version(2)
+        store.save([event1, event2], aggregate_root_id, 0)
+
+        conflicting_event = EventA(aggregate_root_id, 'my_prop2')
+        conflicting_event.set_aggregate_root_version(2)
+
+        with self.assertRaises(AggregateRootOutOfSyncError) as ex:
+            store.save([conflicting_event], aggregate_root_id, 1)
+        self.assertEqual(
+            "Aggregate root in store is newer then current aggregate",
+            str(ex.exception))
+        self.assertEqual(2, len(store.load(aggregate_root_id)))
+
+    def test_it_rejects_a_stream_not_starting_after_the_expected_version(self):
+        """ test if SQLStore validates the versions of the stream """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        event = EventA(aggregate_root_id, 'my_prop')
+        event.set_aggregate_root_version(3)
+
+        with self.assertRaises(AggregateRootOutOfSyncError) as ex:
+            store.save([event], aggregate_root_id, 1)
+        self.assertEqual(
+            "Event stream does not start after the expected version",
+            str(ex.exception))
+
+    def test_it_can_resolve_renamed_events_with_a_registry(self):
+        """ test if SQLStore resolves stored event names with its registry """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        event = EventA(aggregate_root_id, 'my_prop')
+        event.set_aggregate_root_version(1)
+        store.save([event], aggregate_root_id)
+        self.__session.query(SqlDomainRecord).update(
+            {'domain_event_name': 'my_old_module.EventA'})
+
+        registry = EventRegistry()
+        registry.alias('my_old_module.EventA', EventA)
+        stored_eventstream = SQLStore(self.__session, registry=registry).load(aggregate_root_id)
+
+        self.assertIsInstance(stored_eventstream[0], EventA)
+
+    def test_it_upcasts_stored_bodies_before_deserializing(self):
+        """ test if SQLStore upcasts bodies stored with an older schema version """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        event = EventA(aggregate_root_id, 'my_prop')
+        event.set_aggregate_root_version(1)
+        store.save([event], aggregate_root_id)
+        self.assertEqual(1, self.__session.query(SqlDomainRecord).one().schema_version)
+
+        upcasters = UpcasterChain()
+        upcasters.register('esframework.tests.assets.EventA', 1, lambda event_data: {
+            'aggregate_root_id': event_data['aggregate_root_id'],
+            'an_event_property': event_data['an_event_property'].upper(),
+        })
+        with mock.patch.object(EventA, 'schema_version', 2):
+            stored_eventstream = SQLStore(self.__session, upcasters=upcasters).load(aggregate_root_id)
+            self.assertEqual('MY_PROP', stored_eventstream[0].get_an_event_property())
+
+            with self.assertRaises(UpcasterException):
+                SQLStore(self.__session, upcasters=UpcasterChain()).load(aggregate_root_id)
+
+    def test_it_skips_mapping_for_bodies_with_the_current_fingerprint(self):
+        """ test if SQLStore deserializes bodies stored with the current schema
+        without mapping them """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        event = EventA(aggregate_root_id, 'my_prop')
+        event.set_aggregate_root_version(1)
+        store.save([event], aggregate_root_id)
+        self.assertEqual(get_schema_fingerprint(EventA),
+                         self.__session.query(SqlDomainRecord).one().schema_fingerprint)
+
+        self.__session.query(SqlDomainRecord).update(
+            {'domain_event_body': {'aggregate_root_id': aggregate_root_id}})
+        with self.assertRaises(KeyError):
+            store.load(aggregate_root_id)
+
+        self.__session.query(SqlDomainRecord).update({'schema_fingerprint': None})
+        self.assertIsNone(store.load(aggregate_root_id)[0].get_an_event_property())
+
+    def test_it_encrypts_the_encrypted_fields_of_events(self):
+        """ test if SQLStore stores encrypted fields as cipher text and
+        decrypts them when loading """
+        field_encryption = FieldEncryption(InMemoryKeyStore())
+        store = SQLStore(self.__session, field_encryption=field_encryption)
+
+        aggregate_root_id = '6C7E0C0B-0A55-4D47-9C3C-4D5C5A3E1F21'
+        event = EventWithPersonalData(aggregate_root_id, 'foo@example.org')
+        event.set_aggregate_root_version(1)
+        store.save([event], aggregate_root_id)
+
+        domain_event_body = self.__session.query(SqlDomainRecord).one().domain_event_body
+        self.assertEqual(aggregate_root_id, domain_event_body['aggregate_root_id'])
+        self.assertTrue(is_encrypted(domain_event_body['email']))
+        self.assertEqual('foo@example.org', store.load(aggregate_root_id)[0].get_email())
+
+        field_encryption.forget(aggregate_root_id)
+        self.assertIsNone(store.load(aggregate_root_id)[0].get_email())
+
+    def test_it_reports_the_schema_fingerprint_distribution(self):
+        """ test if SQLStore counts the events per schema fingerprint """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        eventstream = []
+        for version in range(1, 4):
+            event = EventA(aggregate_root_id, 'my_prop{}'.format(version))
+            event.set_aggregate_root_version(version)
+            eventstream.append(event)
+        store.save(eventstream, aggregate_root_id)
+        self.__session.query(SqlDomainRecord) \
+            .filter(SqlDomainRecord.aggregate_root_version == 1) \
+            .update({'schema_fingerprint': None})
+
+        self.assertEqual([
+            ('esframework.tests.assets.EventA', None, 1, False),
+            ('esframework.tests.assets.EventA', get_schema_fingerprint(EventA), 2, True),
+        ], store.get_schema_fingerprint_report())
+
+    def test_it_can_stream_events_in_batches(self):
+        """ test if SQLStore yields events lazily in version order """
+        store = SQLStore(self.__session)
+
+        aggregate_root_id = '0F1E1F35-3E80-4F4B-8A0B-5B2E2B9D6C11'
+        eventstream = []
+        for version in range(1, 8):
+            event = EventA(aggregate_root_id, 'my_prop{}'.format(version))
+            event.set_aggregate_root_version(version)
+            eventstream.append(event)
+        store.save(eventstream, aggregate_root_id)
+
+        stream = store.stream(aggregate_root_id, batch_size=2)
+        self.assertEqual(1, next(stream).get_aggregate_root_version())
+        self.assertEqual(
+            [2, 3, 4, 5, 6, 7],
+            [event.get_aggregate_root_version() for event in stream])
+
+        self.assertEqual(
+            [6, 7],
+            [event.get_aggregate_root_version()
+             for event in store.stream(aggregate_root_id, 6, batch_size=2)])
+
+    def test_it_throws_when_streaming_an_unknown_id(self):
+        """ test if SQLStore throws when streaming a non existing stream """
+        store = SQLStore(self.__session)
+
+        with self.assertRaises(AggregateRootIdNotFoundError):
+            list(store.stream('108AEB44-7842-4F36-A113-60A3786670C2'))
+
+    def test_it_can_read_all_events_in_stored_order(self):
+        """ test if SQLStore can page through the global event log """
+        store = SQLStore(self.__session)
+
+        aggr_root_id_1 = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggr_root_id_2 = '108AEB44-7842-4F36-A113-60A3786670C2'
+        for aggregate_root_id, version, prop in [
+                (aggr_root_id_1, 1, 'my_prop'),
+                (aggr_root_id_2, 1, 'my_prop1'),
+                (aggr_root_id_1, 2, 'my_prop2')]:
+            event = EventA(aggregate_root_id, prop)
+            event.set_aggregate_root_version(version)
+            store.save([event], aggregate_root_id)
+
+        first_page = store.read_all(0, 2)
+        self.assertEqual(
+            ['my_prop', 'my_prop1'],
+            [event.get_an_event_property() for event in first_page])
+
+        second_page = store.read_all(first_page[-1].get_position(), 2)
+        self.assertEqual(['my_prop2'], [event.get_an_event_property() for event in second_page])
+        self.assertGreater(second_page[0].get_position(), first_page[-1].get_position())
+        self.assertEqual([], store.read_all(second_page[-1].get_position(), 2))
+
+    def test_it_can_load_many_streams(self):
+        """ test if SQLStore can load multiple streams with one query """
+        store = SQLStore(self.__session)
+
+        aggr_root_id_1 = '897878D0-1230-408B-A980-7A9C24EBDEFA'
+        aggr_root_id_2 = '108AEB44-7842-4F36-A113-60A3786670C2'
+        for aggregate_root_id, version, prop in [
+                (aggr_root_id_2, 1, 'my_prop'),
+                (aggr_root_id_1, 1, 'my_prop1'),
+                (aggr_root_id_2, 2, 'my_prop2')]:
+            event = EventA(aggregate_root_id, prop)
+            event.set_aggregate_root_version(version)
+            store.save([event], aggregate_root_id)
+
+        streams = store.load_many([aggr_root_id_1, aggr_root_id_2, 'unknown'])
+        self.assertEqual({aggr_root_id_1, aggr_root_id_2}, set(streams.keys()))
+        self.assertEqual([aggr_root_id_2, aggr_root_id_1], store.get_aggregate_root_ids())
+        self.assertEqual(
+            ['my_prop1'],
+            [event.get_an_event_property() for event in streams[aggr_root_id_1]])
+        self.assertEqual(
+            ['my_prop', 'my_prop2'],
+            [event.get_an_event_property() for event in streams[aggr_root_id_2]])
+        self.assertEqual({}, store.load_many([]))
@@ -66,7 +66,9 @@ setup(
     # executes the function `main` from this package when invoked:
     entry_points={  # Optional
         'console_scripts': [
-            'esframework.sql.add_store=esframework.cli.sql:create_event_store'
+            'esframework.sql.add_store=esframework.cli.sql:create_event_store',
+            'esframework.sql.migrate=esframework.cli.migrate:main',
+            'esframework.sql.upgrade=esframework.cli.upgrade:main'
         ],
     },
     project_urls={  # Optional